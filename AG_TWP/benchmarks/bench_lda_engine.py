@@ -0,0 +1,70 @@
+"""
+Benchmark: evaluate_features (sklearn) vs BatchedLDAEvaluator (NumPy).
+
+Uso (desde AG_TWP/):
+    python -m benchmarks.bench_lda_engine --pop-size 200 --n-features 80
+"""
+import argparse
+import time
+import warnings
+
+import numpy as np
+
+from modules.genetic_algorithm.genetic_algorithm import evaluate_features, K_FOLDS
+from modules.genetic_algorithm.lda_engine import BatchedLDAEvaluator
+
+
+def make_synthetic_problem(n_trials=60, n_features=80, pop_size=200, seed=0):
+    """Genera energías TWP sintéticas (60 trials, 2 clases) y una población aleatoria."""
+    rng = np.random.RandomState(seed)
+    X = np.abs(rng.randn(n_trials, n_features)) * 1e3
+    Y = np.hstack((np.ones(n_trials // 2), np.zeros(n_trials - n_trials // 2)))
+    X[Y == 1, :n_features // 8] *= 1.5
+    density = rng.rand(pop_size, 1)
+    population = (rng.rand(pop_size, n_features) < density).astype(int)
+    return X, Y, population
+
+
+def run_benchmark(n_trials=60, n_features=80, pop_size=200, lambda_penalty=0.5, seed=0):
+    X, Y, population = make_synthetic_problem(n_trials, n_features, pop_size, seed)
+
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        start = time.perf_counter()
+        reference = [evaluate_features(list(ind), X, Y, n_features, lambda_penalty, K_FOLDS)[0]
+                     for ind in population]
+        t_sklearn = time.perf_counter() - start
+
+    start = time.perf_counter()
+    engine = BatchedLDAEvaluator(X, Y, k_folds=K_FOLDS)
+    t_setup = time.perf_counter() - start
+    start = time.perf_counter()
+    batched = [fit[0] for fit in engine.evaluate_population(population, n_features, lambda_penalty)]
+    t_numpy = time.perf_counter() - start
+
+    max_diff = float(np.max(np.abs(np.array(reference) - np.array(batched))))
+    return {
+        'pop_size': pop_size,
+        'n_features': n_features,
+        'sklearn_s': t_sklearn,
+        'numpy_setup_s': t_setup,
+        'numpy_s': t_numpy,
+        'speedup': t_sklearn / (t_setup + t_numpy),
+        'max_abs_diff': max_diff,
+    }
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--n-trials', type=int, default=60)
+    parser.add_argument('--n-features', type=int, default=80)
+    parser.add_argument('--pop-size', type=int, default=200)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    result = run_benchmark(args.n_trials, args.n_features, args.pop_size, seed=args.seed)
+    print(f"Población: {result['pop_size']} individuos × {result['n_features']} bits")
+    print(f"  sklearn (por individuo): {result['sklearn_s']:8.3f} s")
+    print(f"  NumPy (setup + lote):    {result['numpy_setup_s'] + result['numpy_s']:8.3f} s")
+    print(f"  Speedup:                 {result['speedup']:8.1f}x")
+    print(f"  Máx. |Δ fitness|:        {result['max_abs_diff']:.2e}")
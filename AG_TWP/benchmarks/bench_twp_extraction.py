@@ -0,0 +1,67 @@
+"""
+Benchmark: extracción TWP por trial/canal (pywt.WaveletPacket) vs vectorizada.
+
+Uso (desde AG_TWP/):
+    python -m benchmarks.bench_twp_extraction --wavelet db4 --level 4
+"""
+import argparse
+import time
+
+import numpy as np
+
+from benchmarks.synthetic import make_synthetic_epochs
+from modules.feature_extraction.feature_extraction import (
+    get_twp_feature_vectors,
+    _get_twp_feature_vectors_loop
+)
+
+
+def _best_time(func, repeats):
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = func()
+        times.append(time.perf_counter() - start)
+    return min(times), result
+
+
+def run_benchmark(wavelet='db4', level=4, n_samples=625, n_channels=5, n_trials=60,
+                  normalize=False, log_transform=False, repeats=3, seed=0):
+    data = make_synthetic_epochs(n_samples, n_channels, n_trials, seed)
+    kwargs = dict(wavelet=wavelet, level=level, normalize=normalize, log_transform=log_transform)
+
+    t_loop, reference = _best_time(lambda: _get_twp_feature_vectors_loop(data, **kwargs), repeats)
+    t_batched, batched = _best_time(lambda: get_twp_feature_vectors(data, **kwargs), repeats)
+
+    return {
+        'wavelet': wavelet,
+        'level': level,
+        'shape': data.shape,
+        'loop_s': t_loop,
+        'batched_s': t_batched,
+        'loop_trials_per_s': n_trials / t_loop,
+        'batched_trials_per_s': n_trials / t_batched,
+        'speedup': t_loop / t_batched,
+        'identical': bool(np.array_equal(reference, batched)),
+    }
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--wavelet', default='db4')
+    parser.add_argument('--level', type=int, default=4)
+    parser.add_argument('--n-samples', type=int, default=625)
+    parser.add_argument('--n-channels', type=int, default=5)
+    parser.add_argument('--n-trials', type=int, default=60)
+    parser.add_argument('--normalize', action='store_true')
+    parser.add_argument('--log-transform', action='store_true')
+    parser.add_argument('--repeats', type=int, default=3)
+    args = parser.parse_args()
+
+    result = run_benchmark(args.wavelet, args.level, args.n_samples, args.n_channels,
+                           args.n_trials, args.normalize, args.log_transform, args.repeats)
+    print(f"TWP {result['wavelet']} nivel {result['level']} | datos {result['shape']}")
+    print(f"  Por trial/canal: {result['loop_trials_per_s']:10.1f} trials/s")
+    print(f"  Vectorizada:     {result['batched_trials_per_s']:10.1f} trials/s")
+    print(f"  Speedup:         {result['speedup']:10.1f}x")
+    print(f"  Bit a bit igual: {result['identical']}")
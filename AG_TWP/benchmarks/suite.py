@@ -0,0 +1,270 @@
+"""
+Suite de benchmarks: extracción TWP, fitness, generaciones del AG y pipeline completo.
+
+Uso (desde AG_TWP/):
+    python -m benchmarks.suite --output bench.json
+    python -m benchmarks.suite --quick --baseline bench_base.json --tolerance 0.15
+    python -m benchmarks.suite --save-baseline bench_base.json
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import warnings
+
+import numpy as np
+import scipy
+import sklearn
+
+from benchmarks.synthetic import make_synthetic_dataset, make_synthetic_epochs
+from modules.feature_extraction.feature_extraction import get_twp_feature_vectors
+from modules.genetic_algorithm.genetic_algorithm import (
+    evaluate_features,
+    run_genetic_algorithm,
+    K_FOLDS
+)
+from modules.pipeline.runner import run_batch
+
+SUITE_VERSION = 1
+DEFAULT_WAVELETS = ['db4', 'coif3', 'sym4', 'bior3.3']
+DEFAULT_LEVELS = [1, 2, 3, 4]
+DEFAULT_POP_SIZES = [50, 100, 200]
+
+
+def _measure(func, repeats, warmup=1):
+    """Tiempos de func() (s): se descartan las corridas de calentamiento."""
+    for _ in range(warmup):
+        func()
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return {'median_s': float(np.median(times)), 'min_s': float(np.min(times)),
+            'max_s': float(np.max(times)), 'repeats': repeats}
+
+
+def bench_twp(data, wavelets, levels, repeats):
+    """get_twp_feature_vectors por wavelet/nivel (trials/s)."""
+    results = {}
+    n_trials = data.shape[2]
+    for wavelet in wavelets:
+        for level in levels:
+            stats = _measure(lambda: get_twp_feature_vectors(data, wavelet, level), repeats)
+            stats['trials_per_s'] = n_trials / stats['median_s']
+            results[f'twp/{wavelet}/level{level}'] = stats
+    return results
+
+
+def bench_evaluate_features(X, Y, n_selected_list, repeats, seed):
+    """Una llamada a evaluate_features (LDA + CV) con distintos tamaños de subconjunto."""
+    rng = np.random.RandomState(seed)
+    n_features = X.shape[1]
+    results = {}
+    for n_selected in n_selected_list:
+        individual = np.zeros(n_features, dtype=int)
+        individual[rng.choice(n_features, min(n_selected, n_features), replace=False)] = 1
+        individual = list(individual)
+        stats = _measure(lambda: evaluate_features(individual, X, Y, n_features, 0.5, K_FOLDS),
+                         repeats)
+        stats['calls_per_s'] = 1 / stats['median_s']
+        results[f'evaluate_features/n{n_selected}'] = stats
+    return results
+
+
+def bench_ga_generation(X, Y, pop_sizes, engines, repeats, seed):
+    """
+    Una generación de run_genetic_algorithm (evaluación de la población inicial)
+    sin caché, para cada tamaño de población y motor.
+    """
+    results = {}
+    for engine in engines:
+        for pop_size in pop_sizes:
+            run = lambda: run_genetic_algorithm(X, Y, pop_size=pop_size, num_generations=1,
+                                                cache_size=0, seed=seed, engine=engine,
+                                                verbose=False)
+            stats = _measure(run, repeats, warmup=0)
+            stats['individuals_per_s'] = pop_size / stats['median_s']
+            results[f'ga_generation/{engine}/pop{pop_size}'] = stats
+    return results
+
+
+def bench_pipeline(n_subjects, n_samples, n_channels, n_trials, level, pop_size,
+                   num_generations, repeats, seed):
+    """Pipeline completo por sujeto (run_batch en serie) sobre sujetos sintéticos."""
+    dict_cal, dict_ter = make_synthetic_dataset(n_subjects, n_samples, n_channels,
+                                                n_trials, seed)
+
+    def run():
+        with contextlib.redirect_stdout(io.StringIO()):
+            rows = run_batch(dict_cal, dict_ter, wavelet='db4', level=level,
+                             pop_size=pop_size, num_generations=num_generations,
+                             early_stopping_patience=num_generations, seed=seed,
+                             engine='numpy', n_jobs=1)
+        failed = [row['error'] for row in rows if row['estado'] != 'ok']
+        if failed:
+            raise RuntimeError(f"Falló el benchmark del pipeline: {failed[0]}")
+
+    stats = _measure(run, repeats, warmup=0)
+    stats['subjects_per_s'] = n_subjects / stats['median_s']
+    return {f'pipeline/{n_subjects}x{n_channels}ch/level{level}': stats}
+
+
+def _git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_suite(n_samples=625, n_channels=5, n_trials=60, n_subjects=2, wavelets=None,
+              levels=None, pop_sizes=None, engines=('sklearn', 'numpy'), repeats=5,
+              seed=0, quick=False):
+    """
+    Ejecuta todos los benchmarks con datos sintéticos y semillas fijas.
+
+    Args:
+        n_samples, n_channels, n_trials: Forma de las épocas de cada sujeto
+        n_subjects: Sujetos del benchmark de pipeline completo
+        wavelets, levels: Grilla de extracción TWP
+        pop_sizes: Tamaños de población para la generación del AG
+        engines: Motores de fitness a medir ('sklearn', 'numpy')
+        repeats: Repeticiones por caso (se reportan mediana, mínimo y máximo)
+        seed: Semilla de datos y AG
+        quick: Grilla y repeticiones reducidas (para CI / comprobaciones rápidas)
+
+    Returns:
+        dict: {'meta': ..., 'results': {caso: estadísticas}}
+    """
+    if quick:
+        wavelets = wavelets or ['db4']
+        levels = levels or [3]
+        pop_sizes = pop_sizes or [50]
+        repeats = min(repeats, 3)
+    wavelets = wavelets or DEFAULT_WAVELETS
+    levels = levels or DEFAULT_LEVELS
+    pop_sizes = pop_sizes or DEFAULT_POP_SIZES
+
+    subject = make_synthetic_dataset(1, n_samples, n_channels, n_trials, seed)[0]['subject_1']
+    data = subject['mi_rest']
+    Y = np.hstack((np.ones(n_trials // 2), np.zeros(n_trials - n_trials // 2)))
+    X = get_twp_feature_vectors(data, 'db4', 3)
+
+    results = {}
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        results.update(bench_twp(make_synthetic_epochs(n_samples, n_channels, n_trials, seed),
+                                 wavelets, levels, repeats))
+        results.update(bench_evaluate_features(X, Y, [1, 5, X.shape[1] // 2], repeats, seed))
+        results.update(bench_ga_generation(X, Y, pop_sizes, engines,
+                                           max(1, repeats // 2), seed))
+        results.update(bench_pipeline(n_subjects, n_samples, n_channels, n_trials, 3,
+                                      pop_size=20 if quick else 50,
+                                      num_generations=3 if quick else 10,
+                                      repeats=1 if quick else max(1, repeats // 2), seed=seed))
+
+    meta = {
+        'suite_version': SUITE_VERSION,
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'commit': _git_commit(),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'scipy': scipy.__version__,
+        'sklearn': sklearn.__version__,
+        'machine': platform.machine(),
+        'cpu_count': os.cpu_count(),
+        'params': dict(n_samples=n_samples, n_channels=n_channels, n_trials=n_trials,
+                       n_subjects=n_subjects, wavelets=wavelets, levels=levels,
+                       pop_sizes=pop_sizes, engines=list(engines), repeats=repeats,
+                       seed=seed, quick=quick),
+    }
+    return {'meta': meta, 'results': results}
+
+
+def compare_to_baseline(report, baseline, tolerance=0.10, metric='min_s'):
+    """
+    Compara los tiempos de cada caso con un reporte base.
+
+    Args:
+        report, baseline: Reportes de run_suite
+        tolerance: Aumento relativo del tiempo tolerado (0.10 = 10 %)
+        metric: Estadístico comparado; 'min_s' es el menos sensible al ruido
+                de la máquina, 'median_s' incluye la variabilidad típica
+
+    Returns:
+        list: Filas {caso, base_s, actual_s, ratio, estado} para los casos comunes;
+              estado es 'regresion', 'mejora' o 'ok'
+    """
+    rows = []
+    for case, stats in report['results'].items():
+        if case not in baseline['results']:
+            continue
+        base = baseline['results'][case][metric]
+        ratio = stats[metric] / base
+        if ratio > 1 + tolerance:
+            status = 'regresion'
+        elif ratio < 1 / (1 + tolerance):
+            status = 'mejora'
+        else:
+            status = 'ok'
+        rows.append({'caso': case, 'base_s': base, 'actual_s': stats[metric],
+                     'ratio': ratio, 'estado': status})
+    return rows
+
+
+def _print_report(report):
+    for case, stats in report['results'].items():
+        rate = next(((k, v) for k, v in stats.items() if k.endswith('_per_s')), None)
+        rate_text = f"{rate[1]:12.1f} {rate[0]}" if rate else ''
+        print(f"  {case:40s} {stats['median_s'] * 1e3:10.3f} ms  {rate_text}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--n-samples', type=int, default=625)
+    parser.add_argument('--n-channels', type=int, default=5)
+    parser.add_argument('--n-trials', type=int, default=60)
+    parser.add_argument('--n-subjects', type=int, default=2)
+    parser.add_argument('--wavelets', nargs='+')
+    parser.add_argument('--levels', type=int, nargs='+')
+    parser.add_argument('--pop-sizes', type=int, nargs='+')
+    parser.add_argument('--engines', nargs='+', default=['sklearn', 'numpy'],
+                        choices=['sklearn', 'numpy'])
+    parser.add_argument('--repeats', type=int, default=5)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--quick', action='store_true')
+    parser.add_argument('--output', help='Guardar el reporte JSON')
+    parser.add_argument('--save-baseline', help='Guardar el reporte como base de comparación')
+    parser.add_argument('--baseline', help='Reporte base con el que comparar')
+    parser.add_argument('--tolerance', type=float, default=0.10)
+    parser.add_argument('--metric', choices=['min_s', 'median_s'], default='min_s')
+    args = parser.parse_args()
+
+    report = run_suite(args.n_samples, args.n_channels, args.n_trials, args.n_subjects,
+                       args.wavelets, args.levels, args.pop_sizes, args.engines,
+                       args.repeats, args.seed, args.quick)
+    _print_report(report)
+
+    for path in (args.output, args.save_baseline):
+        if path:
+            with open(path, 'w') as f:
+                json.dump(report, f, indent=2)
+            print(f"💾 Reporte guardado en {path}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if baseline['meta']['params'] != report['meta']['params']:
+            print("⚠️  La base se generó con otros parámetros; solo se comparan los casos comunes")
+        comparison = compare_to_baseline(report, baseline, args.tolerance, args.metric)
+        for row in comparison:
+            print(f"  {row['estado']:10s} {row['caso']:40s} x{row['ratio']:.2f}")
+        regressions = [row for row in comparison if row['estado'] == 'regresion']
+        print(f"{len(regressions)} regresiones (tolerancia {args.tolerance:.0%})")
+        sys.exit(1 if regressions else 0)
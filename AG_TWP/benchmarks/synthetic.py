@@ -0,0 +1,55 @@
+"""
+Datos EEG sintéticos con la forma de create_mat_files, reproducibles por semilla.
+"""
+import numpy as np
+
+FS = 250  # Hz, como los archivos IM-tention
+
+
+def make_synthetic_epochs(n_samples=625, n_channels=5, n_trials=60, seed=0):
+    """Genera un bloque (n_samples, n_channels, n_trials) con la forma de create_mat_files."""
+    rng = np.random.RandomState(seed)
+    return rng.randn(n_samples, n_channels, n_trials) * 50
+
+
+def make_synthetic_subject(n_samples=625, n_channels=5, n_trials=60, seed=0, fs=FS):
+    """
+    Un sujeto sintético: calibración 'mi_rest' y terapia 'mi' con sus etiquetas.
+
+    Los trials de MI tienen menos potencia en 8-12 Hz (desincronización mu) en
+    los canales impares, así el AG y el LDA tienen algo que encontrar.
+
+    Returns:
+        dict: {'calibration': {'mi_rest'}, 'therapy': {'mi', 'target'}, 'y_calibration'}
+    """
+    rng = np.random.RandomState(seed)
+    t = np.arange(n_samples) / fs
+
+    def epochs(mi_mask):
+        noise = rng.randn(n_samples, n_channels, len(mi_mask)) * 20
+        phase = rng.uniform(0, 2 * np.pi, (1, n_channels, len(mi_mask)))
+        amplitude = np.where(mi_mask, 15.0, 40.0)[None, None, :]
+        amplitude = np.broadcast_to(amplitude, (1, n_channels, len(mi_mask))).copy()
+        amplitude[:, ::2, :] = 40.0
+        mu = amplitude * np.sin(2 * np.pi * 10 * t[:, None, None] + phase)
+        return noise + mu
+
+    n_class = n_trials // 2
+    y_calibration = np.hstack((np.ones(n_class, dtype=np.int8),
+                               np.zeros(n_trials - n_class, dtype=np.int8)))
+    targets = rng.randint(0, 2, n_trials)
+    return {
+        'calibration': {'mi_rest': epochs(y_calibration == 1)},
+        'therapy': {'mi': epochs(targets == 1), 'target': targets},
+        'y_calibration': y_calibration,
+    }
+
+
+def make_synthetic_dataset(n_subjects=8, n_samples=625, n_channels=5, n_trials=60, seed=0):
+    """Diccionarios de calibración y terapia como los de create_mat_files (subject_1, ...)."""
+    dict_cal, dict_ter = {}, {}
+    for i in range(n_subjects):
+        subject = make_synthetic_subject(n_samples, n_channels, n_trials, seed + i)
+        dict_cal[f'subject_{i + 1}'] = subject['calibration']
+        dict_ter[f'subject_{i + 1}'] = subject['therapy']
+    return dict_cal, dict_ter
@@ -0,0 +1,229 @@
+import os
+import csv
+import json
+import time
+import hashlib
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+from sklearn.discriminant_analysis import LinearDiscriminantAnalysis
+
+from modules.feature_extraction.feature_extraction import get_twp_feature_vectors
+from modules.genetic_algorithm.genetic_algorithm import (
+    run_genetic_algorithm,
+    dataset_fingerprint,
+    _init_evaluation_worker,
+    _WORKER_DATA
+)
+from modules.training.training import train_clf_and_get_metrics
+from modules.evaluation.evaluation import evaluate_clf_and_get_metrics
+
+# ============================================================================
+# VALIDACIÓN LEAVE-ONE-SUBJECT-OUT (LOSO) PARALELA
+# ============================================================================
+# - Las características TWP de cada sujeto se extraen UNA sola vez y se guardan
+#   en una única matriz (n_trials_totales, n_features); groups indica el sujeto
+#   de cada fila.
+# - Cada fold es solo un par de arrays de índices sobre esa matriz: los procesos
+#   reciben la matriz una vez (inicializador) y cada tarea envía únicamente los
+#   índices. El bloque de test es contiguo y se toma como vista; el de
+#   entrenamiento (el resto de los sujetos) no lo es y se copia una vez por fold
+#   dentro del proceso, sin pasar por pickle.
+# - Cada fold terminado se escribe en output_dir/fold_<sujeto>_<id>.json y se agrega
+#   a resultados_loso.csv; al repetir la llamada los folds hechos se reutilizan.
+
+LOSO_CSV = 'resultados_loso.csv'
+
+
+def calibration_labels(n_trials):
+    """Etiquetas de 'mi_rest' (create_mat_files, joined=True): primero MI (1), luego reposo (0)."""
+    n_class = n_trials // 2
+    return np.hstack((np.ones(n_class, dtype=np.int8),
+                      np.zeros(n_trials - n_class, dtype=np.int8)))
+
+
+def build_loso_dataset(subject_data, data_key='mi_rest', wavelet='db4', level=1,
+                       normalize=False, log_transform=False):
+    """
+    Extrae las características TWP de todos los sujetos en una sola matriz.
+
+    Args:
+        subject_data: Diccionario de create_mat_files (o un TrialStore)
+        data_key: Matriz de cada sujeto ('mi_rest' o 'mi')
+        wavelet, level, normalize, log_transform: ver get_twp_feature_vectors
+
+    Returns:
+        X: Matriz (n_trials_totales, n_features)
+        Y: Etiquetas; 'mi_rest' usa calibration_labels y el resto la clave 'target'
+        groups: Array con el nombre del sujeto de cada fila
+    """
+    blocks, labels, groups = [], [], []
+    for subject in subject_data:
+        entry = subject_data[subject]
+        data = np.asarray(entry[data_key])
+        blocks.append(get_twp_feature_vectors(data, wavelet=wavelet, level=level,
+                                              normalize=normalize, log_transform=log_transform))
+        if data_key == 'mi_rest':
+            labels.append(calibration_labels(data.shape[2]))
+        elif 'target' in entry:
+            labels.append(np.asarray(entry['target']))
+        else:
+            raise ValueError(f"No hay etiquetas ('target') para '{data_key}' en {subject}")
+        groups.extend([subject] * data.shape[2])
+    return np.vstack(blocks), np.concatenate(labels), np.array(groups)
+
+
+def loso_folds(groups):
+    """
+    Índices de entrenamiento/test de cada fold.
+
+    Returns:
+        list: (sujeto_test, train_idx, test_idx) en el orden de aparición de los sujetos
+    """
+    subjects = list(dict.fromkeys(groups))
+    folds = []
+    for subject in subjects:
+        test_mask = groups == subject
+        folds.append((subject, np.flatnonzero(~test_mask), np.flatnonzero(test_mask)))
+    return folds
+
+
+def _fold_rows(X, index):
+    """Filas de un fold: vista si son contiguas (bloque de test), copia si no."""
+    if len(index) and index[-1] - index[0] + 1 == len(index):
+        return X[index[0]:index[-1] + 1]
+    return X[index]
+
+
+def _fold_id(subject, fingerprint, params, seed):
+    payload = json.dumps({'subject': subject, 'data': fingerprint, 'params': params,
+                          'seed': seed}, sort_keys=True, default=str)
+    return hashlib.sha1(payload.encode()).hexdigest()[:16]
+
+
+def _run_loso_fold(subject, train_idx, test_idx, params, seed, X=None, Y=None):
+    """AG + LDA entrenados sin el sujeto de test y evaluados en él."""
+    if X is None:
+        X, Y = _WORKER_DATA['X'], _WORKER_DATA['Y']
+    start = time.perf_counter()
+    # Copia (indexado avanzado): el AG y el LDA final la reutilizan durante todo el fold
+    X_train, Y_train = X[train_idx], Y[train_idx]
+    X_test, Y_test = _fold_rows(X, test_idx), _fold_rows(Y, test_idx)
+
+    best_ind, log = run_genetic_algorithm(X_train, Y_train, seed=seed, verbose=False, **params)
+    selected = [i for i, bit in enumerate(best_ind) if bit == 1]
+    if not selected:
+        # Mismo criterio que el notebook: primeras 5 características
+        selected = list(range(min(5, X.shape[1])))
+
+    clf = LinearDiscriminantAnalysis(shrinkage='auto', solver='eigen')
+    clf, metrics_train = train_clf_and_get_metrics(X_train[:, selected], Y_train, clf)
+    metrics_test = evaluate_clf_and_get_metrics(X_test[:, selected], clf, Y_test)
+
+    return {
+        'sujeto_test': subject,
+        'seed': seed,
+        'n_train': len(train_idx),
+        'n_test': len(test_idx),
+        'n_features_totales': X.shape[1],
+        'n_features_seleccionadas': len(selected),
+        'fitness_ag': float(best_ind.fitness.values[0]),
+        'generations': log[0]['gen'],
+        'acc_entrenamiento': float(metrics_train.acc),
+        'tpr_entrenamiento': float(metrics_train.tpr),
+        'acc_test': float(metrics_test.acc),
+        'tpr_test': float(metrics_test.tpr),
+        'selected_indices': ' '.join(map(str, selected)),
+        'elapsed_s': time.perf_counter() - start,
+    }
+
+
+def run_loso(subject_data, data_key='mi_rest', wavelet='db4', level=1, pop_size=100,
+             num_generations=100, lambda_penalty=None, early_stopping_patience=15,
+             n_jobs=None, output_dir=None, seed=None, engine='sklearn',
+             normalize=False, log_transform=False):
+    """
+    Validación leave-one-subject-out del pipeline TWP + AG + LDA, con folds en paralelo.
+
+    Args:
+        subject_data: Diccionario de create_mat_files (o un TrialStore)
+        data_key: Matriz de cada sujeto ('mi_rest' o 'mi')
+        wavelet, level, normalize, log_transform: ver get_twp_feature_vectors
+        pop_size, num_generations, lambda_penalty, early_stopping_patience, engine:
+            ver run_genetic_algorithm
+        n_jobs: Procesos (None = todos los núcleos, 1 = en serie)
+        output_dir: Carpeta de resultados por fold (None = solo en memoria)
+        seed: Semilla base; el fold k usa seed + k (None = aleatoria)
+
+    Returns:
+        list: Una fila (dict) por sujeto de test, en el orden de subject_data
+    """
+    X, Y, groups = build_loso_dataset(subject_data, data_key, wavelet, level,
+                                      normalize, log_transform)
+    folds = loso_folds(groups)
+    params = dict(pop_size=pop_size, num_generations=num_generations,
+                  lambda_penalty=lambda_penalty,
+                  early_stopping_patience=early_stopping_patience, engine=engine)
+    seeds = [None if seed is None else seed + k for k in range(len(folds))]
+
+    rows = [None] * len(folds)
+    paths = [None] * len(folds)
+    if output_dir is not None:
+        os.makedirs(output_dir, exist_ok=True)
+        fingerprint = dataset_fingerprint(X, Y)
+        config = dict(params, data_key=data_key, wavelet=wavelet, level=level,
+                      normalize=normalize, log_transform=log_transform)
+        for k, (subject, _, _) in enumerate(folds):
+            paths[k] = os.path.join(output_dir, f"fold_{subject}_"
+                                    f"{_fold_id(subject, fingerprint, config, seeds[k])}.json")
+            if os.path.exists(paths[k]):
+                with open(paths[k]) as f:
+                    rows[k] = json.load(f)
+    pending = [k for k, row in enumerate(rows) if row is None]
+    print(f"🧪 LOSO: {len(folds)} folds, matriz {X.shape} "
+          f"({len(folds) - len(pending)} recuperados de disco)")
+
+    csv_path = None if output_dir is None else os.path.join(output_dir, LOSO_CSV)
+    if csv_path is not None:
+        # Se reescribe con los folds recuperados y luego se agrega cada fold nuevo
+        open(csv_path, 'w').close()
+        for row in rows:
+            if row is not None:
+                _append_csv(csv_path, row)
+
+    def save(k, row):
+        rows[k] = row
+        print(f"   Sujeto {row['sujeto_test']} (test): {row['acc_test']:.2f}%")
+        if paths[k] is not None:
+            with open(paths[k] + '.tmp', 'w') as f:
+                json.dump(row, f)
+            os.replace(paths[k] + '.tmp', paths[k])
+            _append_csv(csv_path, row)
+
+    if n_jobs == 1 or len(pending) <= 1:
+        for k in pending:
+            subject, train_idx, test_idx = folds[k]
+            save(k, _run_loso_fold(subject, train_idx, test_idx, params, seeds[k], X, Y))
+    else:
+        if n_jobs is None or n_jobs < 1:
+            n_jobs = os.cpu_count() or 1
+        with ProcessPoolExecutor(max_workers=min(n_jobs, len(pending)),
+                                 initializer=_init_evaluation_worker,
+                                 initargs=(X, Y, 1)) as pool:
+            futures = {pool.submit(_run_loso_fold, *folds[k], params, seeds[k]): k
+                       for k in pending}
+            for future in as_completed(futures):
+                save(futures[future], future.result())
+
+    print(f"\nPromedio LOSO-CV: {np.mean([row['acc_test'] for row in rows]):.2f}%")
+    return rows
+
+
+def _append_csv(csv_path, row):
+    """Agrega una fila al CSV (con encabezado si el archivo está vacío)."""
+    write_header = not os.path.exists(csv_path) or os.path.getsize(csv_path) == 0
+    with open(csv_path, 'a', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=list(row.keys()))
+        if write_header:
+            writer.writeheader()
+        writer.writerow(row)
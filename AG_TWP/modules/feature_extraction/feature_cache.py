@@ -0,0 +1,237 @@
+import hashlib
+import inspect
+import json
+import os
+import numpy as np
+
+from modules.feature_extraction.feature_extraction import get_twp_feature_vectors
+from modules.preprocessing.file_creation import create_mat_files
+
+# ============================================================================
+# CACHÉ EN DISCO DE MATRICES TWP (DIRECCIONADA POR CONTENIDO)
+# ============================================================================
+# Cada entrada se guarda como <clave>.npy + <clave>.json en cache_dir.
+# La clave es el sha256 de:
+#   - hash del archivo .mat de origen
+#   - opciones de create_mat_files (filter, filtfilt, scaled, ventanas, ...)
+#   - (wavelet, level, normalize, log_transform) y la matriz usada ('mi_rest', 'mi', ...)
+# Las matrices se cargan con mmap_mode='r'. Cuando el tamaño total supera
+# max_bytes se eliminan las entradas usadas hace más tiempo (LRU por mtime).
+
+DEFAULT_CACHE_DIR = os.path.join('.', 'cache', 'twp_features')
+DEFAULT_MAX_BYTES = 1024 ** 3  # 1 GB
+
+# Argumentos de create_mat_files que no cambian el resultado
+_NOT_PREPROCESSING = ('file_path', 'n_jobs', 'executor')
+
+# Hash de archivos ya leídos: (ruta, tamaño, mtime) -> sha256
+_file_hashes = {}
+
+
+def file_sha256(path):
+    """
+    Hash sha256 del contenido de un archivo (memorizado por ruta, tamaño y mtime).
+
+    Args:
+        path (str): ruta al archivo
+
+    Returns:
+        str: hash hexadecimal
+    """
+    stat = os.stat(path)
+    memo_key = (os.path.abspath(path), stat.st_size, stat.st_mtime_ns)
+    if memo_key not in _file_hashes:
+        hasher = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 20), b''):
+                hasher.update(block)
+        _file_hashes[memo_key] = hasher.hexdigest()
+    return _file_hashes[memo_key]
+
+
+def preprocessing_config(**options):
+    """
+    Opciones de create_mat_files completadas con sus valores por defecto.
+
+    Así una llamada con filtfilt=True y otra con todas las opciones explícitas
+    producen la misma clave de caché.
+
+    Args:
+        **options: argumentos pasados a create_mat_files (sin file_path)
+
+    Returns:
+        dict: todas las opciones de preprocesamiento
+    """
+    params = inspect.signature(create_mat_files).parameters
+    unknown = set(options) - set(params)
+    for name in _NOT_PREPROCESSING:
+        options.pop(name, None)
+    if unknown:
+        raise ValueError(f"Opciones de create_mat_files desconocidas: {sorted(unknown)}")
+    config = {name: p.default for name, p in params.items() if name not in _NOT_PREPROCESSING}
+    config.update(options)
+    return config
+
+
+class TWPFeatureCache:
+    """
+    Caché en disco de matrices de características TWP.
+
+    Args:
+        cache_dir (str): carpeta donde se guardan las entradas
+        max_bytes (int): tamaño máximo total de los .npy antes de desalojar
+    """
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, max_bytes=DEFAULT_MAX_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def make_key(self, source_file, preprocessing, wavelet, level,
+                 normalize=False, log_transform=False, data_key='mi_rest'):
+        """
+        Clave de una matriz de características.
+
+        Args:
+            source_file (str): archivo .mat de origen del sujeto
+            preprocessing (dict): opciones de create_mat_files (ver preprocessing_config)
+            wavelet, level, normalize, log_transform: parámetros de get_twp_feature_vectors
+            data_key (str): matriz del sujeto usada ('mi_rest', 'mi', 'rest')
+
+        Returns:
+            str: clave hexadecimal
+        """
+        description = {
+            'source_sha256': file_sha256(source_file),
+            'preprocessing': preprocessing_config(**preprocessing),
+            'data_key': data_key,
+            'twp': [wavelet, int(level), bool(normalize), bool(log_transform)],
+        }
+        payload = json.dumps(description, sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    def _paths(self, key):
+        base = os.path.join(self.cache_dir, key)
+        return base + '.npy', base + '.json'
+
+    def get(self, key):
+        """Devuelve la matriz memory-mapped (solo lectura) o None si no existe."""
+        npy_path, _ = self._paths(key)
+        if not os.path.exists(npy_path):
+            return None
+        os.utime(npy_path)  # marcar como usada recientemente
+        return np.load(npy_path, mmap_mode='r')
+
+    def put(self, key, features, metadata=None):
+        """Guarda una matriz (escritura atómica) y aplica el límite de tamaño."""
+        npy_path, json_path = self._paths(key)
+        tmp_path = npy_path + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            np.save(f, np.asarray(features))
+        os.replace(tmp_path, npy_path)
+        with open(json_path, 'w') as f:
+            json.dump(metadata or {}, f, default=str)
+        self._evict()
+
+    def get_or_compute(self, key, compute, metadata=None):
+        """Carga la entrada o la calcula con compute(), la guarda y la devuelve."""
+        features = self.get(key)
+        if features is None:
+            features = compute()
+            self.put(key, features, metadata)
+            # Si la entrada entra en el límite se devuelve ya memory-mapped
+            cached = self.get(key)
+            if cached is not None:
+                features = cached
+        return features
+
+    def feature_vectors(self, data_per_subject, source_file, preprocessing,
+                        wavelet='coif3', level=3, normalize=False,
+                        log_transform=False, data_key='mi_rest'):
+        """
+        get_twp_feature_vectors con caché en disco.
+
+        Args:
+            data_per_subject (array): Matriz (n_samples, n_channels, n_trials) del sujeto
+            source_file (str): archivo .mat del que salió data_per_subject
+                               ('subject_n' de create_mat_files es getSubjectFiles(...)[n-1])
+            preprocessing (dict): opciones de create_mat_files usadas para generarlo
+            wavelet, level, normalize, log_transform: ver get_twp_feature_vectors
+            data_key (str): matriz del sujeto usada ('mi_rest', 'mi', 'rest')
+
+        Returns:
+            array: Matriz (n_trials, n_features_twp), memory-mapped de solo lectura
+        """
+        key = self.make_key(source_file, preprocessing, wavelet, level,
+                            normalize, log_transform, data_key)
+        metadata = {
+            'source_file': os.path.abspath(source_file),
+            'preprocessing': preprocessing_config(**preprocessing),
+            'data_key': data_key,
+            'twp': [wavelet, level, normalize, log_transform],
+        }
+        return self.get_or_compute(
+            key,
+            lambda: get_twp_feature_vectors(data_per_subject, wavelet=wavelet, level=level,
+                                            normalize=normalize, log_transform=log_transform),
+            metadata)
+
+    def entries(self):
+        """Lista de (clave, bytes, último uso) de las entradas guardadas."""
+        result = []
+        for name in os.listdir(self.cache_dir):
+            if name.endswith('.npy'):
+                stat = os.stat(os.path.join(self.cache_dir, name))
+                result.append((name[:-4], stat.st_size, stat.st_mtime))
+        return result
+
+    def invalidate(self, key=None, source_file=None):
+        """
+        Elimina entradas de la caché.
+
+        Args:
+            key (str): elimina esa entrada
+            source_file (str): elimina todas las entradas generadas desde ese archivo
+                               (sin importar si su contenido cambió desde entonces)
+            Sin argumentos se vacía la caché completa.
+
+        Returns:
+            int: número de entradas eliminadas
+        """
+        if key is not None:
+            keys = [key]
+        elif source_file is not None:
+            source_file = os.path.abspath(source_file)
+            keys = [k for k, _, _ in self.entries()
+                    if self._metadata(k).get('source_file') == source_file]
+        else:
+            keys = [k for k, _, _ in self.entries()]
+
+        removed = 0
+        for k in keys:
+            for path in self._paths(k):
+                if os.path.exists(path):
+                    os.remove(path)
+                    removed += path.endswith('.npy')
+        return removed
+
+    def clear(self):
+        return self.invalidate()
+
+    def _metadata(self, key):
+        _, json_path = self._paths(key)
+        try:
+            with open(json_path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _evict(self):
+        entries = sorted(self.entries(), key=lambda entry: entry[2])
+        total = sum(size for _, size, _ in entries)
+        for key, size, _ in entries:
+            if total <= self.max_bytes:
+                break
+            self.invalidate(key=key)
+            total -= size
+
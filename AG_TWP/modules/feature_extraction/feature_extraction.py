@@ -1,9 +1,16 @@
 import numpy as np
+from functools import lru_cache
 from scipy.signal import welch
 import pywt
+from modules.profiling.profiling import timed
 
 factor_escala = 22369.62  # n_muestras/mV
 
+def _n_trials(data_per_subject, *args, **kwargs):
+    return np.shape(data_per_subject)[2]
+
+
+@timed('twp.extract', items=_n_trials)
 def get_twp_feature_vectors(data_per_subject, wavelet='coif3', level=3, 
                            normalize=False, log_transform=False):
     """
@@ -29,6 +36,355 @@ def get_twp_feature_vectors(data_per_subject, wavelet='coif3', level=3,
         >>> print(features.shape)  # (60, 40) = 60 trials × (5 channels × 8 nodes)
     """
     
+    energies = twp_node_energies(data_per_subject, wavelet=wavelet, level=level)
+    return _energies_to_feature_vectors(energies, normalize, log_transform)
+
+# ============================================================================
+# DESCOMPOSICIÓN WAVELET PACKET VECTORIZADA
+# ============================================================================
+def twp_node_energies(data_per_subject, wavelet='coif3', level=3):
+    """
+    Energía de cada nodo del nivel `level` para todos los trials y canales a la vez.
+    
+    En lugar de construir un pywt.WaveletPacket por (trial, canal), aplica el
+    banco de filtros nivel por nivel sobre el bloque completo (eje temporal),
+    manteniendo los nodos en orden 'natural' (el mismo de wp.get_level).
+    
+    Args:
+        data_per_subject (array): Matriz con forma (n_samples, n_channels, n_trials)
+        wavelet (str): Tipo de wavelet
+        level (int): Nivel de descomposición
+    
+    Returns:
+        array: Energías con forma (n_trials, n_channels, 2^level)
+    """
+    for current_level, coeffs in _wavelet_packet_levels(data_per_subject, wavelet, level):
+        if current_level == level:
+            return _node_energies(coeffs)
+
+
+def _wavelet_packet_levels(data_per_subject, wavelet, max_level):
+    """Genera (nivel, coeficientes) para los niveles 0..max_level de un solo árbol."""
+    # (n_nodes=1, n_trials, n_channels, n_samples): eje temporal contiguo
+    coeffs = np.ascontiguousarray(np.transpose(data_per_subject, (2, 1, 0)))[np.newaxis]
+    yield 0, coeffs
+    for current_level in range(1, max_level + 1):
+        coeffs = _wavelet_packet_step(coeffs, wavelet)
+        yield current_level, coeffs
+
+
+def _node_energies(coeffs):
+    """(n_nodes, n_trials, n_channels, n_coef) -> energías (n_trials, n_channels, n_nodes)."""
+    # Suma de cuadrados sobre el eje temporal (contiguo, igual que node.data)
+    energies = np.sum(np.square(coeffs), axis=-1)
+    return np.ascontiguousarray(np.moveaxis(energies, 0, -1))
+
+
+def _wavelet_packet_step(coeffs, wavelet):
+    """Descompone todos los nodos de un nivel: (n_nodes, ...) -> (2*n_nodes, ...)."""
+    approx, detail = pywt.dwt(coeffs, wavelet, mode='symmetric', axis=-1)
+    # Hijos de cada nodo intercalados [a, d] -> orden natural
+    children = np.stack((approx, detail), axis=1)
+    return children.reshape((-1,) + approx.shape[1:])
+
+
+# ============================================================================
+# TWP MULTINIVEL: UN SOLO ÁRBOL PARA TODOS LOS NIVELES
+# ============================================================================
+def twp_multilevel_node_energies(data_per_subject, wavelet='coif3', max_level=4):
+    """
+    Energías de todos los nodos de todos los niveles con una sola descomposición.
+    
+    Los nodos de un nivel intermedio del árbol de profundidad max_level son los
+    mismos que los del nivel más profundo de un árbol de esa profundidad, por lo
+    que las energías coinciden bit a bit con twp_node_energies(..., level=l).
+    
+    Args:
+        data_per_subject (array): Matriz con forma (n_samples, n_channels, n_trials)
+        wavelet (str): Tipo de wavelet
+        max_level (int): Nivel más profundo a calcular
+    
+    Returns:
+        dict: {nivel: energías (n_trials, n_channels, 2^nivel)} para niveles 0..max_level
+    """
+    return {current_level: _node_energies(coeffs)
+            for current_level, coeffs in _wavelet_packet_levels(data_per_subject, wavelet, max_level)}
+
+
+def get_twp_multilevel_feature_vectors(data_per_subject, wavelet='coif3', max_level=4, 
+                                       levels=None, normalize=False, log_transform=False):
+    """
+    Vectores de características TWP para varios niveles desde un único árbol.
+    
+    Args:
+        data_per_subject (array): Matriz con forma (n_samples, n_channels, n_trials)
+        wavelet (str): Tipo de wavelet
+        max_level (int): Profundidad del árbol
+        levels (list): Niveles a devolver (default: 1..max_level)
+        normalize, log_transform: ver get_twp_feature_vectors
+    
+    Returns:
+        dict: {nivel: matriz (n_trials, n_channels × 2^nivel)}, igual a llamar
+              get_twp_feature_vectors(data, wavelet, nivel) para cada nivel
+    """
+    if levels is None:
+        levels = range(1, max_level + 1)
+    if any(l < 0 or l > max_level for l in levels):
+        raise ValueError(f"levels debe estar entre 0 y max_level={max_level}")
+    
+    energies = twp_multilevel_node_energies(data_per_subject, wavelet, max_level)
+    return {l: _energies_to_feature_vectors(energies[l], normalize, log_transform) 
+            for l in levels}
+
+
+def node_path_to_index(path):
+    """Ruta de nodo ('', 'a', 'ad', ...) -> (nivel, índice en orden natural)."""
+    if any(c not in 'ad' for c in path):
+        raise ValueError(f"Ruta de nodo wavelet packet inválida: '{path}'")
+    index = int(path.replace('a', '0').replace('d', '1'), 2) if path else 0
+    return len(path), index
+
+
+def node_index_to_path(index, level):
+    """(índice en orden natural, nivel) -> ruta de nodo; inversa de node_path_to_index."""
+    if not 0 <= index < 2 ** level:
+        raise ValueError(f"Índice de nodo {index} fuera de rango para el nivel {level}")
+    return ''.join('ad'[(index >> (level - 1 - l)) & 1] for l in range(level))
+
+
+def feature_index_to_node(feature_index, level):
+    """
+    Índice de característica de get_twp_feature_vectors -> (canal, nodo).
+    
+    Las características están ordenadas por canal y, dentro de cada canal, por
+    nodo en orden natural: índice = canal × 2^level + nodo.
+    """
+    return divmod(int(feature_index), 2 ** level)
+
+
+def selected_node_paths(selected_indices, level):
+    """
+    Nodos del árbol que hace falta calcular para un conjunto de características.
+    
+    Args:
+        selected_indices (array): Índices de características seleccionadas
+        level (int): Nivel de descomposición
+    
+    Returns:
+        dict: {canal: [rutas de los nodos seleccionados en orden natural]}
+    """
+    nodes = {}
+    for feature_index in np.unique(selected_indices):
+        channel, node = feature_index_to_node(feature_index, level)
+        nodes.setdefault(channel, []).append(node_index_to_path(node, level))
+    return nodes
+
+
+def selected_feature_indices(n_features, indices=None, mask=None):
+    """
+    Índices de las características seleccionadas, dados como índices o como máscara.
+    
+    No se adivina la forma a partir de los valores: un individuo del AG (lista de
+    0/1) y una lista de índices como [0, 1] serían indistinguibles.
+    
+    Args:
+        n_features (int): Número total de características
+        indices (array): Índices de características
+        mask (array): Máscara binaria (0/1 o booleana) de longitud n_features
+    
+    Returns:
+        array: Índices (np.intp)
+    """
+    if (indices is None) == (mask is None):
+        raise ValueError("Indicar exactamente uno de indices o mask")
+    if indices is not None:
+        return np.asarray(indices).astype(np.intp).reshape(-1)
+    mask = np.asarray(mask)
+    if mask.shape != (n_features,) or not np.isin(mask, (0, 1)).all():
+        raise ValueError(f"mask debe ser un vector 0/1 de longitud {n_features}, "
+                         f"no de forma {mask.shape}")
+    return np.flatnonzero(mask)
+
+
+def pruned_packet_tree(selected_indices, n_channels, level, normalize=False):
+    """
+    Filas (canal, nodo) que hay que calcular en cada nivel para llegar a los
+    nodos seleccionados; se omiten los canales sin características seleccionadas.
+    
+    Args:
+        selected_indices (array): Índices de características (canal × 2^level + nodo)
+        n_channels (int): Número de canales
+        level (int): Nivel de descomposición
+        normalize (bool): Si True se incluyen todos los nodos de los canales usados
+                          (la normalización necesita la energía total del canal)
+    
+    Returns:
+        tuple: (canales del nivel 0, [(fila padre, rama 0=a/1=d)] por nivel 1..level,
+                fila final de cada característica seleccionada)
+    """
+    n_nodes = 2 ** level
+    channels, nodes = np.divmod(np.asarray(selected_indices, dtype=np.int64), n_nodes)
+    if channels.size and (channels.max() >= n_channels or channels.min() < 0):
+        raise ValueError(f"Índices seleccionados fuera de rango para "
+                         f"{n_channels * n_nodes} características")
+    if normalize:
+        used = np.unique(channels)
+        final = np.stack(np.meshgrid(used, np.arange(n_nodes), indexing='ij'), -1).reshape(-1, 2)
+    else:
+        final = np.unique(np.stack((channels, nodes), axis=1), axis=0)
+    
+    # rows[l]: (canal, índice del nodo en el nivel l), ordenadas
+    rows = [final]
+    for _ in range(level):
+        rows.append(np.unique(np.stack((rows[-1][:, 0], rows[-1][:, 1] >> 1), axis=1), axis=0))
+    rows = rows[::-1]
+    
+    steps = []
+    for l in range(1, level + 1):
+        parent_keys = rows[l - 1][:, 0] * n_nodes + rows[l - 1][:, 1]
+        keys = rows[l][:, 0] * n_nodes + (rows[l][:, 1] >> 1)
+        steps.append((np.searchsorted(parent_keys, keys), rows[l][:, 1] & 1))
+    final_keys = rows[level][:, 0] * n_nodes + rows[level][:, 1]
+    feature_rows = np.searchsorted(final_keys, channels * n_nodes + nodes)
+    return rows[0][:, 0], steps, feature_rows
+
+
+@lru_cache(maxsize=128)
+def _pruned_extraction_plan(indices, n_channels, level, normalize):
+    """pruned_packet_tree memorizado, con los padres distintos de cada nivel precalculados."""
+    channels, steps, feature_rows = pruned_packet_tree(indices, n_channels, level, normalize)
+    plan_steps = [np.unique(parents, return_inverse=True) + (branches,) 
+                  for parents, branches in steps]
+    return channels, plan_steps, feature_rows
+
+
+@timed('twp.extract_selected', items=_n_trials)
+def get_twp_selected_feature_vectors(data_per_subject, *, indices=None, mask=None,
+                                     wavelet='coif3', level=3, normalize=False,
+                                     log_transform=False):
+    """
+    Solo las características TWP seleccionadas, podando el árbol wavelet packet.
+    
+    Se descomponen únicamente las ramas que llevan a los nodos seleccionados y
+    los canales sin ningún nodo seleccionado no se transforman. El resultado es
+    bit a bit igual a get_twp_feature_vectors(...)[:, indices].
+    
+    Args:
+        data_per_subject (array): Matriz con forma (n_samples, n_channels, n_trials)
+        indices (array): Índices de características (exclusivo con mask)
+        mask (array): Máscara binaria de longitud n_channels × 2^level, ej: el mejor
+                      individuo del AG (exclusivo con indices)
+        wavelet, level, normalize, log_transform: ver get_twp_feature_vectors
+    
+    Returns:
+        array: Matriz (n_trials, n_selected) con las columnas en el orden de los índices
+    """
+    n_channels, n_trials = data_per_subject.shape[1], data_per_subject.shape[2]
+    indices = selected_feature_indices(n_channels * 2 ** level, indices, mask)
+    if indices.size == 0:
+        return np.zeros((n_trials, 0))
+    channels, steps, feature_rows = _pruned_extraction_plan(tuple(indices.tolist()), n_channels,
+                                                            level, bool(normalize))
+    
+    # (filas, n_trials, n_samples): eje temporal contiguo, como en _wavelet_packet_levels
+    coeffs = np.ascontiguousarray(np.transpose(data_per_subject, (1, 2, 0))[channels])
+    for needed, position, branches in steps:
+        approx, detail = pywt.dwt(coeffs[needed], wavelet, mode='symmetric', axis=-1)
+        coeffs = np.stack((approx, detail), axis=1)[position, branches]
+    energies = np.sum(np.square(coeffs), axis=-1)
+    
+    if normalize:
+        # todos los nodos de cada canal usado: (n_trials, n_canales_usados, n_nodos)
+        energies = energies.reshape(len(channels), 2 ** level, n_trials).transpose(2, 0, 1)
+    else:
+        energies = energies.T[:, np.newaxis, :]
+    features = _energies_to_feature_vectors(np.ascontiguousarray(energies), 
+                                            normalize, log_transform)
+    return features[:, feature_rows]
+
+
+def validate_basis(basis):
+    """
+    Verifica que un conjunto de nodos sea un corte admisible del árbol.
+    
+    Un corte es admisible si ningún nodo es ancestro de otro y entre todos
+    cubren la banda completa (suma de 2^-nivel = 1).
+    
+    Args:
+        basis (list): Rutas de nodos, ej: ['aa', 'ad', 'd']
+    """
+    paths = sorted(basis)
+    for path in paths:
+        node_path_to_index(path)
+    for parent, child in zip(paths, paths[1:]):
+        if child.startswith(parent):
+            raise ValueError(f"El nodo '{parent}' es ancestro de '{child}'")
+    coverage = sum(2.0 ** -len(path) for path in paths)
+    if coverage != 1.0:
+        raise ValueError(f"La base {basis} no cubre el árbol completo")
+
+
+def get_twp_basis_feature_vectors(data_per_subject, basis, wavelet='coif3', 
+                                  normalize=False, log_transform=False):
+    """
+    Energías TWP para un corte arbitrario del árbol (ej: una best basis).
+    
+    Args:
+        data_per_subject (array): Matriz con forma (n_samples, n_channels, n_trials)
+        basis (list): Rutas de nodos que forman un corte admisible, ej: ['aa', 'ad', 'd']
+        wavelet (str): Tipo de wavelet
+        normalize (bool): Normaliza por la energía total de los nodos del corte
+        log_transform (bool): Aplica log(1+energy)
+    
+    Returns:
+        array: Matriz (n_trials, n_channels × len(basis)); por canal, los nodos en el
+              orden dado en basis
+    """
+    validate_basis(basis)
+    nodes = [node_path_to_index(path) for path in basis]
+    max_level = max(l for l, _ in nodes)
+    
+    energies = twp_multilevel_node_energies(data_per_subject, wavelet, max_level)
+    basis_energies = np.stack([energies[l][:, :, i] for l, i in nodes], axis=-1)
+    return _energies_to_feature_vectors(basis_energies, normalize, log_transform)
+
+
+def twp_feature_grid(data_per_subject, wavelets=['db4', 'coif3', 'sym4', 'bior3.3'], 
+                     levels=[1, 2, 3, 4], normalize=False, log_transform=False):
+    """
+    Matrices TWP para una grilla wavelet × nivel con una descomposición por wavelet.
+    
+    Returns:
+        dict: {(wavelet, nivel): matriz (n_trials, n_channels × 2^nivel)}
+    """
+    grid = {}
+    for wavelet in wavelets:
+        per_level = get_twp_multilevel_feature_vectors(data_per_subject, wavelet, 
+                                                       max_level=max(levels), 
+                                                       levels=levels,
+                                                       normalize=normalize, 
+                                                       log_transform=log_transform)
+        for l, features in per_level.items():
+            grid[(wavelet, l)] = features
+    return grid
+
+
+def _energies_to_feature_vectors(energies, normalize=False, log_transform=False):
+    """Aplica normalización/log por canal y aplana a (n_trials, n_channels × n_nodes)."""
+    if normalize:
+        total_energy = np.sum(energies, axis=-1, keepdims=True) + 1e-10  # Evitar división por cero
+        energies = energies / total_energy
+    
+    if log_transform:
+        energies = np.log1p(energies)  # log(1+x)
+    
+    n_trials = energies.shape[0]
+    return energies.reshape(n_trials, -1)
+
+
+def _get_twp_feature_vectors_loop(data_per_subject, wavelet='coif3', level=3, 
+                                  normalize=False, log_transform=False):
+    """Implementación original (un WaveletPacket por trial y canal), usada como referencia."""
     n_samples, n_channels, n_trials = data_per_subject.shape
     twp_feature_list = []
 
@@ -125,7 +481,7 @@ def analyze_selected_features(selected_indices, n_channels=5, level=3,
 # FUNCIÓN AUXILIAR: COMPARAR WAVELETS
 # ============================================================================
 def compare_wavelets(data_sample, wavelets=['db4', 'coif3', 'sym4', 'bior3.3'], 
-                    level=3):
+                    level=3, cache=None, source_file=None, preprocessing=None):
     """
     Comparar diferentes familias de wavelets en los datos.
     
@@ -133,10 +489,16 @@ def compare_wavelets(data_sample, wavelets=['db4', 'coif3', 'sym4', 'bior3.3'],
         data_sample: Muestra de datos (n_samples, n_channels, n_trials)
         wavelets: Lista de wavelets a comparar
         level: Nivel de descomposición
+        cache: TWPFeatureCache opcional (requiere source_file y preprocessing)
+        source_file: Archivo .mat del que proviene data_sample
+        preprocessing: Opciones de create_mat_files usadas para generar data_sample
     
     Returns:
         dict: Resultados de cada wavelet
     """
+    # Validar antes del bucle: dentro se reportaría como un error de cada wavelet
+    if cache is not None and source_file is None:
+        raise ValueError("cache requiere source_file (archivo .mat de data_sample)")
     
     results = {}
     
@@ -146,9 +508,14 @@ def compare_wavelets(data_sample, wavelets=['db4', 'coif3', 'sym4', 'bior3.3'],
     
     for wavelet in wavelets:
         try:
-            features = get_twp_feature_vectors(data_sample, 
-                                              wavelet=wavelet, 
-                                              level=level)
+            if cache is not None:
+                features = cache.feature_vectors(data_sample, source_file, 
+                                                 preprocessing or {},
+                                                 wavelet=wavelet, level=level)
+            else:
+                features = get_twp_feature_vectors(data_sample, 
+                                                  wavelet=wavelet, 
+                                                  level=level)
             
             # Calcular estadísticas básicas
             mean_energy = np.mean(features)
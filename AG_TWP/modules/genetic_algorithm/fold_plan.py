@@ -0,0 +1,90 @@
+import numpy as np
+from collections import OrderedDict
+from sklearn.model_selection import StratifiedKFold
+
+# ============================================================================
+# PLAN DE FOLDS COMPARTIDO (VALIDACIÓN CRUZADA)
+# ============================================================================
+# cross_val_score(cv=k_folds) recalcula los splits estratificados y copia
+# X_data[:, selected] en cada llamada. Un FoldPlan hace los splits una sola vez
+# (los mismos: StratifiedKFold sin shuffle) y guarda los bloques de train/test
+# de cada fold en arrays contiguos por columna (orden Fortran), así que tomar
+# un subconjunto de características es copiar columnas contiguas.
+#
+# get_fold_plan memoriza los planes por huella del dataset: las corridas de
+# optimize_lambda / run_grid_search y las repeticiones de LOSO sobre los mismos
+# datos (en el mismo proceso) comparten el plan.
+
+FOLD_PLAN_CACHE_SIZE = 8  # Planes memorizados por proceso
+
+
+class FoldPlan:
+    """
+    Splits estratificados y bloques de train/test precalculados.
+
+    Args:
+        X_data: Matriz de características (n_samples, n_features)
+        Y_targets: Vector de etiquetas (n_samples,)
+        k_folds: Número de folds (mismos splits que cross_val_score)
+    """
+
+    def __init__(self, X_data, Y_targets, k_folds=5):
+        X_data = np.asarray(X_data)
+        Y_targets = np.asarray(Y_targets)
+        self.k_folds = k_folds
+        self.n_features = X_data.shape[1]
+        self.splits = list(StratifiedKFold(n_splits=k_folds).split(X_data, Y_targets))
+        self.folds = [(np.asfortranarray(X_data[train_idx]), Y_targets[train_idx],
+                       np.asfortranarray(X_data[test_idx]), Y_targets[test_idx])
+                      for train_idx, test_idx in self.splits]
+
+    def __len__(self):
+        return self.k_folds
+
+    def __iter__(self):
+        return iter(self.folds)
+
+    def select(self, columns):
+        """
+        Bloques de cada fold restringidos a un subconjunto de características.
+
+        Args:
+            columns: Índices de las características (lista o array de enteros)
+
+        Yields:
+            tuple: (X_train, y_train, X_test, y_test) con len(columns) columnas
+        """
+        columns = np.asarray(columns, dtype=np.intp)
+        for X_train, y_train, X_test, y_test in self.folds:
+            yield X_train[:, columns], y_train, X_test[:, columns], y_test
+
+
+_PLANS = OrderedDict()
+
+
+def get_fold_plan(X_data, Y_targets, k_folds=5, fingerprint=None):
+    """
+    FoldPlan de los datos, reutilizando uno memorizado si ya se construyó.
+
+    Args:
+        X_data, Y_targets, k_folds: ver FoldPlan
+        fingerprint: Huella de (X_data, Y_targets) si ya se calculó
+                     (ver dataset_fingerprint)
+
+    Returns:
+        FoldPlan
+    """
+    if fingerprint is None:
+        # Import local: genetic_algorithm importa este módulo
+        from modules.genetic_algorithm.genetic_algorithm import dataset_fingerprint
+        fingerprint = dataset_fingerprint(X_data, Y_targets)
+    key = (fingerprint, k_folds)
+    plan = _PLANS.get(key)
+    if plan is None:
+        plan = FoldPlan(X_data, Y_targets, k_folds)
+        _PLANS[key] = plan
+        while len(_PLANS) > FOLD_PLAN_CACHE_SIZE:
+            _PLANS.popitem(last=False)
+    else:
+        _PLANS.move_to_end(key)
+    return plan
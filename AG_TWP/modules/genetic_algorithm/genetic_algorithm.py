@@ -1,14 +1,39 @@
 import numpy as np
+import os
+import csv
+import json
+import time
 import random
+import hashlib
+import math
+import itertools
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from functools import partial
 from deap import base, creator, tools, algorithms
-from sklearn.model_selection import cross_val_score
+from sklearn.model_selection import cross_val_score, StratifiedKFold
 from sklearn.discriminant_analysis import LinearDiscriminantAnalysis
+from modules.genetic_algorithm.lda_engine import BatchedLDAEvaluator
+from modules.genetic_algorithm.packed_population import PackedPopulation
+from modules.genetic_algorithm.fold_plan import get_fold_plan
+from modules.genetic_algorithm.surrogate import (
+    SurrogateModel,
+    screen_offspring,
+    rank_correlation
+)
+from modules.feature_extraction.feature_extraction import twp_feature_grid
+from modules.profiling.profiling import timer, timed, count
 
 # ============================================================================
 # CONFIGURACIÓN GLOBAL
 # ============================================================================
 K_FOLDS = 5  # Número de folds para validación cruzada
 LAMBDA_PENALTY = 0.5  # Reducido de 2.65 a 1.0 (menos penalización)
+FITNESS_CACHE_SIZE = 10000  # Máximo de cromosomas memorizados (LRU)
+# Fallos de un fold que puntúan fitness 0.0: covarianza singular (LinAlgError) o
+# fold degenerado que sklearn rechaza (ValueError) o con una sola clase en
+# entrenamiento, que falla al predecir (IndexError)
+FIT_ERRORS = (np.linalg.LinAlgError, ValueError, IndexError)
 
 # ============================================================================
 # DEFINICIÓN DE ESTRUCTURAS (DEAP) - SE EJECUTA UNA SOLA VEZ
@@ -17,6 +42,11 @@ if not hasattr(creator, "FitnessMax"):
     creator.create("FitnessMax", base.Fitness, weights=(1.0,))
 if not hasattr(creator, "Individual"):
     creator.create("Individual", list, fitness=creator.FitnessMax)
+# Multiobjetivo (run_nsga2): maximizar accuracy CV, minimizar nº de características
+if not hasattr(creator, "FitnessAccSparsity"):
+    creator.create("FitnessAccSparsity", base.Fitness, weights=(1.0, -1.0))
+if not hasattr(creator, "IndividualMulti"):
+    creator.create("IndividualMulti", list, fitness=creator.FitnessAccSparsity)
 
 # ============================================================================
 # TOOLBOX GLOBAL
@@ -30,7 +60,9 @@ toolbox.register("select", tools.selTournament, tournsize=3)
 # ============================================================================
 # FUNCIÓN DE FITNESS MEJORADA
 # ============================================================================
-def evaluate_features(individual, X_data, Y_targets, total_features, lambda_penalty, k_folds):
+@timed('ga.evaluate_features')
+def evaluate_features(individual, X_data, Y_targets, total_features, lambda_penalty, k_folds,
+                      plan=None):
     """
     Calcula el fitness de un individuo usando validación cruzada con penalización por complejidad.
     
@@ -41,6 +73,8 @@ def evaluate_features(individual, X_data, Y_targets, total_features, lambda_pena
         total_features: Número total de características disponibles
         lambda_penalty: Peso de la penalización por complejidad
         k_folds: Número de folds para validación cruzada
+        plan: FoldPlan de (X_data, Y_targets, k_folds) (None = cross_val_score).
+              Mismos splits y resultado, sin repartir los datos en cada llamada
         
     Returns:
         tuple: (fitness_score,) - Mayor es mejor
@@ -54,18 +88,22 @@ def evaluate_features(individual, X_data, Y_targets, total_features, lambda_pena
         return (0.0,)
     
     n_selected = len(selected_indices)
-    X_reduced = X_data[:, selected_indices]
     
     # 2. Configurar clasificador LDA
     clf = LinearDiscriminantAnalysis(shrinkage='auto', solver='eigen')
     
     # 3. Calcular accuracy con validación cruzada
     try:
-        scores = cross_val_score(clf, X_reduced, Y_targets, 
-                                cv=k_folds, scoring='accuracy')
+        if plan is None:
+            scores = cross_val_score(clf, X_data[:, selected_indices], Y_targets, 
+                                    cv=k_folds, scoring='accuracy', error_score='raise')
+        else:
+            scores = [clf.fit(X_train, y_train).score(X_test, y_test)
+                      for X_train, y_train, X_test, y_test in plan.select(selected_indices)]
         accuracy_cv = np.mean(scores) * 100  # Convertir a porcentaje
-    except Exception as e:
-        # Si falla la validación cruzada (ej: muy pocas características)
+    except FIT_ERRORS:
+        # Si falla el ajuste de algún fold (ver FIT_ERRORS).
+        # Mismo criterio que BatchedLDAEvaluator y evaluate_features_pruned
         return (0.0,)
     
     # 4. Calcular penalización por complejidad (sparsity)
@@ -77,11 +115,556 @@ def evaluate_features(individual, X_data, Y_targets, total_features, lambda_pena
     
     return (fitness_score,)
 
+# ============================================================================
+# FITNESS CON PODA POR FOLD (TERMINACIÓN TEMPRANA)
+# ============================================================================
+# Tras cada fold, la mejor accuracy posible es la de los folds ya evaluados con
+# acierto total en los restantes. Si esa cota menos la penalización no supera el
+# umbral (el peor fitness del Hall of Fame), el individuo no puede entrar en él y
+# los folds restantes se omiten; su fitness pasa a ser la cota superior.
+#
+# Las cotas se devuelven como UpperBound y nunca se guardan en la caché. El AG
+# marca a esos individuos (ind.pruned) y, si una cota alcanza el máximo de la
+# generación, la reemplaza por el fitness exacto (FoldPruning.resolve_max).
+@timed('ga.evaluate_features_pruned')
+def evaluate_features_pruned(individual, X_data, Y_targets, total_features, lambda_penalty,
+                             k_folds, threshold, plan=None):
+    """
+    Igual que evaluate_features, pero abandona la validación cruzada cuando el
+    individuo ya no puede superar threshold.
+    
+    Args:
+        individual, X_data, Y_targets, total_features, lambda_penalty, k_folds, plan:
+            ver evaluate_features
+        threshold: Fitness a superar (-inf = evaluar todos los folds)
+        
+    Returns:
+        tuple: ((fitness_score,), folds_omitidos). fitness_score es exacto si no
+               se omitió ningún fold y una cota superior (< threshold) si no
+    """
+    selected_indices = [i for i, bit in enumerate(individual) if bit == 1]
+    if not selected_indices:
+        return (0.0,), 0
+    
+    penalty = lambda_penalty * len(selected_indices) / total_features * 100
+    if plan is None:
+        # Mismos splits que cross_val_score(cv=k_folds) con un clasificador
+        X_reduced = X_data[:, selected_indices]
+        folds = ((X_reduced[train_idx], Y_targets[train_idx], 
+                  X_reduced[test_idx], Y_targets[test_idx])
+                 for train_idx, test_idx in StratifiedKFold(n_splits=k_folds).split(
+                     X_reduced, Y_targets))
+    else:
+        folds = plan.select(selected_indices)
+    
+    total = 0.0
+    try:
+        for fold, (X_train, y_train, X_test, y_test) in enumerate(folds, start=1):
+            clf = LinearDiscriminantAnalysis(shrinkage='auto', solver='eigen')
+            clf.fit(X_train, y_train)
+            total += clf.score(X_test, y_test)
+            
+            remaining = k_folds - fold
+            upper_bound = (total + remaining) / k_folds * 100 - penalty
+            if remaining and upper_bound < threshold:
+                return (upper_bound,), remaining
+    except FIT_ERRORS:
+        return (0.0,), 0
+    
+    return (total / k_folds * 100 - penalty,), 0
+
+
+class UpperBound(tuple):
+    """Fitness (cota,) de un individuo podado: no es exacto y no se memoriza."""
+
+
+def _bounds_reaching_max(fitness, bound):
+    """Posiciones con cota que alcanzan el máximo exacto (hay que evaluarlas sin poda)."""
+    fitness = np.asarray(fitness, dtype=np.float64)
+    bound = np.asarray(bound, dtype=bool)
+    exact_max = fitness[~bound].max() if (~bound).any() else -np.inf
+    return np.flatnonzero(bound & (fitness >= exact_max))
+
+
+class FoldPruning:
+    """
+    Estado de la poda por fold durante una corrida del AG.
+    
+    El umbral es el peor fitness del Hall of Fame una vez lleno (antes, -inf). Una
+    cota está por debajo del umbral vigente al calcularla y el umbral sólo sube,
+    así que un individuo podado nunca entra en el Hall of Fame. El máximo de cada
+    generación se mantiene exacto con resolve_max; media y desvío incluyen cotas.
+    """
+    
+    def __init__(self):
+        self.threshold = -np.inf
+        self.folds_skipped = 0
+    
+    def update(self, hof):
+        if len(hof) == hof.maxsize:
+            self.threshold = hof[-1].fitness.values[0]
+    
+    def collect(self, results):
+        """Separa los resultados (fitness, folds_omitidos) y acumula el contador."""
+        fitnesses = []
+        for fit, skipped in results:
+            fitnesses.append(UpperBound(fit) if skipped else fit)
+            self.folds_skipped += int(skipped)
+        return fitnesses
+    
+    def evaluate_exact(self, individuals, evaluate, cache, context, map_fn):
+        """evaluate_with_cache sin poda (umbral -inf durante la llamada)."""
+        threshold, self.threshold = self.threshold, -np.inf
+        try:
+            return evaluate_with_cache(individuals, evaluate, cache, context, map_fn)
+        finally:
+            self.threshold = threshold
+    
+    def resolve_max(self, individuals, evaluate, cache, context, map_fn):
+        """
+        Re-evalúa sin poda los individuos podados cuya cota alcanza el máximo
+        exacto, hasta que el máximo de individuals sea un fitness exacto.
+        """
+        while True:
+            pending = [individuals[i] for i in _bounds_reaching_max(
+                [ind.fitness.values[0] for ind in individuals],
+                [getattr(ind, 'pruned', False) for ind in individuals])]
+            if not pending:
+                return
+            for ind, fit in zip(pending, self.evaluate_exact(pending, evaluate, cache,
+                                                             context, map_fn)):
+                ind.fitness.values = fit
+                ind.pruned = False
+
+# ============================================================================
+# CACHÉ DE FITNESS (LRU)
+# ============================================================================
+def dataset_fingerprint(X_data, Y_targets):
+    """
+    Calcula una huella (hash) de los datos para usarla como parte de la clave de caché.
+    
+    Args:
+        X_data: Matriz de características (n_samples, n_features)
+        Y_targets: Vector de etiquetas (n_samples,)
+        
+    Returns:
+        str: Hash hexadecimal de X_data e Y_targets (forma, tipo y contenido)
+    """
+    hasher = hashlib.sha1()
+    for array in (np.ascontiguousarray(X_data), np.ascontiguousarray(Y_targets)):
+        hasher.update(str(array.shape).encode())
+        hasher.update(str(array.dtype).encode())
+        hasher.update(array.tobytes())
+    return hasher.hexdigest()
+
+
+def pack_individual(individual):
+    """Empaqueta un cromosoma binario en bytes (8 bits por byte)."""
+    return np.packbits(np.asarray(individual, dtype=np.uint8)).tobytes()
+
+
+class FitnessCache:
+    """
+    Memoria acotada de fitness con desalojo LRU.
+    
+    La clave combina el cromosoma empaquetado con el contexto de evaluación
+    (lambda, k_folds, huella del dataset), por lo que una misma instancia puede
+    compartirse entre corridas con distintos lambda o datos sin mezclar resultados.
+    
+    Args:
+        max_size: Número máximo de entradas antes de desalojar la menos usada
+    """
+    
+    def __init__(self, max_size=FITNESS_CACHE_SIZE):
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+    
+    def __len__(self):
+        return len(self._entries)
+    
+    def __contains__(self, key):
+        """Consulta sin actualizar hits/misses ni el orden LRU."""
+        return key in self._entries
+    
+    @staticmethod
+    def make_key(individual, context):
+        return (pack_individual(individual), len(individual)) + tuple(context)
+    
+    def get(self, key):
+        """Devuelve el fitness memorizado o None (y actualiza hits/misses)."""
+        fitness = self._entries.get(key)
+        if fitness is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return fitness
+    
+    def put(self, key, fitness):
+        self._entries[key] = fitness
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+    
+    def clear(self):
+        self._entries.clear()
+        self.hits = 0
+        self.misses = 0
+
+
+def evaluate_with_cache(individuals, evaluate, cache, context, map_fn=map):
+    """
+    Evalúa una lista de individuos consultando primero la caché.
+    
+    Los cromosomas repetidos dentro de la misma lista se evalúan una sola vez.
+    
+    Args:
+        individuals: Individuos a evaluar
+        evaluate: Función individuo -> (fitness,)
+        cache: Instancia de FitnessCache (None = sin caché)
+        context: Tupla (lambda, k_folds, huella) que completa la clave
+        map_fn: Función map usada para evaluar los faltantes (ej: executor.map)
+        
+    Returns:
+        list: Fitness de cada individuo, en el mismo orden
+    """
+    if cache is None:
+        count('ga.fitness_evaluations', len(individuals))
+        return list(map_fn(evaluate, individuals))
+    
+    keys = [cache.make_key(ind, context) for ind in individuals]
+    fitnesses = [None] * len(individuals)
+    
+    # Consultar caché; los cromosomas repetidos en esta tanda cuentan como hit
+    pending = {}
+    for i, key in enumerate(keys):
+        if key in pending:
+            cache.hits += 1
+            continue
+        fitnesses[i] = cache.get(key)
+        if fitnesses[i] is None:
+            pending[key] = i
+    
+    count('ga.fitness_evaluations', len(pending))
+    count('ga.cache_hits', len(individuals) - len(pending))
+    
+    # Evaluar cada cromosoma faltante una sola vez (las cotas de la poda no se memorizan)
+    pending_fits = list(map_fn(evaluate, [individuals[i] for i in pending.values()]))
+    computed = dict(zip(pending.keys(), pending_fits))
+    for key, fit in computed.items():
+        if not isinstance(fit, UpperBound):
+            cache.put(key, fit)
+    
+    return [fit if fit is not None else computed[key] 
+            for key, fit in zip(keys, fitnesses)]
+
+# ============================================================================
+# EVALUACIÓN PARALELA (POOL DE PROCESOS)
+# ============================================================================
+# Datos compartidos por proceso: se envían una sola vez en el inicializador
+_WORKER_DATA = {}
+
+def _limit_blas_threads(blas_threads):
+    """Limita los hilos BLAS/OpenMP del proceso (inicializador de pools de procesos)."""
+    for var in ("OMP_NUM_THREADS", "OPENBLAS_NUM_THREADS", "MKL_NUM_THREADS"):
+        os.environ[var] = str(blas_threads)
+    try:
+        from threadpoolctl import threadpool_limits
+        # Mantener la referencia: el límite se aplica mientras el objeto exista
+        _WORKER_DATA['thread_limits'] = threadpool_limits(limits=blas_threads)
+    except ImportError:
+        pass
+
+
+def _init_evaluation_worker(X_data, Y_targets, blas_threads):
+    """Inicializador de cada proceso: guarda los datos y limita hilos BLAS."""
+    _limit_blas_threads(blas_threads)
+    _WORKER_DATA['X'] = X_data
+    _WORKER_DATA['Y'] = Y_targets
+
+
+def _worker_plan(k_folds):
+    """FoldPlan de los datos del worker, construido en la primera evaluación."""
+    plans = _WORKER_DATA.setdefault('plans', {})
+    if k_folds not in plans:
+        plans[k_folds] = get_fold_plan(_WORKER_DATA['X'], _WORKER_DATA['Y'], k_folds)
+    return plans[k_folds]
+
+
+def _evaluate_in_worker(individual, total_features, lambda_penalty, k_folds):
+    """Evalúa un individuo usando los datos cargados por el inicializador."""
+    return evaluate_features(individual, _WORKER_DATA['X'], _WORKER_DATA['Y'],
+                             total_features, lambda_penalty, k_folds, _worker_plan(k_folds))
+
+
+def _evaluate_pruned_in_worker(individual, total_features, lambda_penalty, k_folds, threshold):
+    """Versión con poda por fold de _evaluate_in_worker."""
+    return evaluate_features_pruned(individual, _WORKER_DATA['X'], _WORKER_DATA['Y'],
+                                    total_features, lambda_penalty, k_folds, threshold,
+                                    _worker_plan(k_folds))
+
+
+def create_evaluation_pool(X_twp, Y_targets, n_jobs=-1, blas_threads=1):
+    """
+    Crea un pool de procesos con X_twp e Y_targets precargados en cada worker.
+    
+    El pool puede reutilizarse en varias llamadas a run_genetic_algorithm
+    (parámetro executor) siempre que sean sobre los mismos datos.
+    
+    Args:
+        X_twp: Matriz de características (n_samples, n_features)
+        Y_targets: Vector de etiquetas (n_samples,)
+        n_jobs: Número de procesos (-1 = todos los núcleos)
+        blas_threads: Hilos BLAS por proceso (1 evita sobresuscripción)
+        
+    Returns:
+        ProcessPoolExecutor: Pool listo para evaluar individuos
+    """
+    if n_jobs is None or n_jobs < 1:
+        n_jobs = os.cpu_count() or 1
+    return ProcessPoolExecutor(max_workers=n_jobs,
+                               initializer=_init_evaluation_worker,
+                               initargs=(X_twp, Y_targets, blas_threads))
+
+# ============================================================================
+# OPERADORES DE VARIACIÓN (UNA GENERACIÓN)
+# ============================================================================
+def vary_population(pop, cxpb=0.7, mutpb=0.3, select=None):
+    """
+    Genera la descendencia de una generación: torneo, cruce de dos puntos y bit-flip.
+    
+    Los hijos modificados quedan con el fitness invalidado; los clones intactos
+    conservan el de sus padres.
+    
+    Args:
+        pop: Población actual (con fitness válido)
+        cxpb: Probabilidad de cruce por pareja
+        mutpb: Probabilidad de mutación por individuo
+        select: Operador de selección (None = toolbox.select, torneo de 3)
+        
+    Returns:
+        list: Nueva población del mismo tamaño
+    """
+    # Selección
+    offspring = (select or toolbox.select)(pop, len(pop))
+    offspring = list(map(toolbox.clone, offspring))
+    
+    # Cruce
+    for child1, child2 in zip(offspring[::2], offspring[1::2]):
+        if random.random() < cxpb:
+            toolbox.mate(child1, child2)
+            del child1.fitness.values
+            del child2.fitness.values
+    
+    # Mutación
+    for mutant in offspring:
+        if random.random() < mutpb:
+            toolbox.mutate(mutant)
+            del mutant.fitness.values
+    
+    return offspring
+
+# ============================================================================
+# EVALUACIÓN ASISTIDA POR MODELO SUSTITUTO
+# ============================================================================
+def evaluate_with_surrogate(individuals, evaluate, cache, context, map_fn, model,
+                            fraction, exploration, gen):
+    """
+    Asigna fitness a individuos, evaluando de verdad sólo una parte.
+    
+    Los que ya están en la caché y, mientras el modelo no tenga datos, todos los
+    demás se evalúan con el fitness real. Si no, el modelo predice el fitness del
+    resto (un candidato por cromosoma distinto) y sólo los mejores predichos
+    (fraction) más una cuota al azar (exploration) se evalúan; los demás reciben
+    la predicción con ind.surrogate = True. Los fitness reales exactos alimentan
+    el modelo (las cotas de la poda por fold no).
+    
+    Args:
+        individuals: Individuos sin fitness (o con fitness sustituto)
+        evaluate, cache, context, map_fn: ver evaluate_with_cache
+        model: SurrogateModel de la corrida
+        fraction: Fracción de candidatos evaluada por ranking predicho
+        exploration: Fracción adicional elegida al azar
+        gen: Generación (para el registro)
+        
+    Returns:
+        dict: gen, evaluated, saved (evaluaciones reales evitadas: cromosomas
+              distintos que no estaban en la caché y recibieron la predicción),
+              mae y rank_corr (predicción vs real en los candidatos evaluados con
+              fitness exacto; NaN si el modelo no predijo)
+    """
+    # Candidatos: cromosomas fuera de la caché; con caché, los repetidos en esta
+    # tanda se agrupan porque evaluate_with_cache los evalúa una sola vez
+    to_evaluate, groups = [], {}
+    for i, ind in enumerate(individuals):
+        if cache is None:
+            groups[i] = [ind]
+            continue
+        key = cache.make_key(ind, context)
+        if key in cache:
+            to_evaluate.append(ind)
+        else:
+            groups.setdefault(key, []).append(ind)
+    candidates = list(groups.values())
+    screened, predicted, saved = [], None, 0
+    
+    if len(model) == 0 or not candidates:
+        to_evaluate = individuals
+    else:
+        predicted = model.predict([group[0] for group in candidates])
+        chosen = screen_offspring(predicted, math.ceil(fraction * len(candidates)),
+                                  math.ceil(exploration * len(candidates)), random)
+        chosen_set = set(chosen)
+        for i, group in enumerate(candidates):
+            if i not in chosen_set:
+                for ind in group:
+                    ind.fitness.values = (float(predicted[i]),)
+                    ind.surrogate = True
+        saved = len(candidates) - len(chosen)
+        screened = [candidates[i][0] for i in chosen]
+        to_evaluate = to_evaluate + [ind for i in chosen for ind in candidates[i]]
+        predicted = predicted[chosen]
+    
+    fitnesses = evaluate_with_cache(to_evaluate, evaluate, cache, context, map_fn)
+    for ind, fit in zip(to_evaluate, fitnesses):
+        ind.fitness.values = fit
+        ind.surrogate = False
+        ind.pruned = isinstance(fit, UpperBound)
+    exact = [(ind, fit) for ind, fit in zip(to_evaluate, fitnesses) 
+             if not isinstance(fit, UpperBound)]
+    model.add([list(ind) for ind, _ in exact], [fit[0] for _, fit in exact])
+    count('ga.surrogate_saved', saved)
+    
+    record = {'gen': gen, 'evaluated': len(to_evaluate), 'saved': saved,
+              'mae': float('nan'), 'rank_corr': float('nan')}
+    scored = [i for i, ind in enumerate(screened) if not ind.pruned]
+    if predicted is not None and scored:
+        actual = np.array([screened[i].fitness.values[0] for i in scored])
+        record['mae'] = float(np.mean(np.abs(predicted[scored] - actual)))
+        record['rank_corr'] = rank_correlation(predicted[scored], actual)
+    return record
+
+
+def _is_exact(ind):
+    return not getattr(ind, 'surrogate', False)
+
+# ============================================================================
+# CHECKPOINTS DEL AG (FORMATO BINARIO .npz)
+# ============================================================================
+def _pack_population(individuals):
+    """Bits empaquetados, fitness (NaN si no es válido), máscara de validez y de cotas."""
+    bits = np.packbits(np.array([list(ind) for ind in individuals], dtype=np.uint8), axis=1)
+    valid = np.array([ind.fitness.valid for ind in individuals], dtype=bool)
+    fitness = np.array([ind.fitness.values[0] if ind.fitness.valid else np.nan 
+                        for ind in individuals], dtype=np.float64)
+    pruned = np.array([getattr(ind, 'pruned', False) for ind in individuals], dtype=bool)
+    return bits, fitness, valid, pruned
+
+
+def _unpack_population(bits, fitness, valid, n_features, pruned=None):
+    if pruned is None:
+        pruned = np.zeros(len(fitness), dtype=bool)
+    individuals = []
+    for row, fit, is_valid, is_pruned in zip(np.unpackbits(bits, axis=1, count=n_features),
+                                             fitness, valid, pruned):
+        ind = creator.Individual(int(bit) for bit in row)
+        if is_valid:
+            ind.fitness.values = (float(fit),)
+        if is_pruned:
+            ind.pruned = True
+        individuals.append(ind)
+    return individuals
+
+
+def save_ga_checkpoint(path, state):
+    """
+    Guarda el estado del AG en un .npz comprimido (escritura atómica).
+    
+    Args:
+        path: Ruta del archivo de checkpoint
+        state: Diccionario con next_gen, pop, hof, best_fitness_history,
+               generations_without_improvement, lambda_penalty, fingerprint
+               y (opcional) folds_skipped
+    """
+    pop_bits, pop_fitness, pop_valid, pop_pruned = _pack_population(state['pop'])
+    hof_bits, hof_fitness, _, _ = _pack_population(state['hof'].items)
+    py_version, py_state, py_gauss = random.getstate()
+    np_state = np.random.get_state()
+    
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        np.savez_compressed(
+            f,
+            next_gen=state['next_gen'],
+            n_features=len(state['pop'][0]),
+            pop_bits=pop_bits, pop_fitness=pop_fitness, pop_valid=pop_valid,
+            pop_pruned=pop_pruned,
+            hof_bits=hof_bits, hof_fitness=hof_fitness, 
+            hof_maxsize=state['hof'].maxsize,
+            best_fitness_history=np.asarray(state['best_fitness_history'], dtype=np.float64),
+            generations_without_improvement=state['generations_without_improvement'],
+            lambda_penalty=state['lambda_penalty'],
+            fingerprint=state['fingerprint'],
+            folds_skipped=state.get('folds_skipped', 0),
+            py_version=py_version,
+            py_state=np.array(py_state, dtype=np.uint32),
+            py_gauss=np.nan if py_gauss is None else py_gauss,
+            np_keys=np_state[1], np_pos=np_state[2], 
+            np_has_gauss=np_state[3], np_cached_gaussian=np_state[4],
+        )
+    os.replace(tmp_path, path)
+
+
+def load_ga_checkpoint(path):
+    """
+    Carga un checkpoint guardado con save_ga_checkpoint y restaura los RNG.
+    
+    Returns:
+        dict: Estado con las mismas claves que recibe save_ga_checkpoint
+    """
+    with np.load(path) as data:
+        n_features = int(data['n_features'])
+        pop = _unpack_population(data['pop_bits'], data['pop_fitness'], 
+                                 data['pop_valid'], n_features,
+                                 data['pop_pruned'] if 'pop_pruned' in data else None)
+        
+        # Restaurar el Hall of Fame tal cual (items descendente, keys ascendente)
+        hof = tools.HallOfFame(int(data['hof_maxsize']))
+        hof.items = _unpack_population(data['hof_bits'], data['hof_fitness'],
+                                       np.ones(len(data['hof_fitness']), dtype=bool), 
+                                       n_features)
+        hof.keys = [ind.fitness for ind in reversed(hof.items)]
+        
+        py_gauss = float(data['py_gauss'])
+        random.setstate((int(data['py_version']), 
+                         tuple(int(x) for x in data['py_state']),
+                         None if np.isnan(py_gauss) else py_gauss))
+        np.random.set_state(('MT19937', data['np_keys'], int(data['np_pos']),
+                             int(data['np_has_gauss']), float(data['np_cached_gaussian'])))
+        
+        return {
+            'next_gen': int(data['next_gen']),
+            'pop': pop,
+            'hof': hof,
+            'best_fitness_history': [float(x) for x in data['best_fitness_history']],
+            'generations_without_improvement': int(data['generations_without_improvement']),
+            'lambda_penalty': float(data['lambda_penalty']),
+            'fingerprint': str(data['fingerprint']),
+            'folds_skipped': int(data['folds_skipped']) if 'folds_skipped' in data else 0,
+        }
+
 # ============================================================================
 # FUNCIÓN PRINCIPAL CON EARLY STOPPING
 # ============================================================================
 def run_genetic_algorithm(X_twp, Y_targets, pop_size=100, num_generations=100, 
-                         lambda_penalty=None, early_stopping_patience=15):
+                         lambda_penalty=None, early_stopping_patience=15,
+                         cache=None, cache_size=FITNESS_CACHE_SIZE,
+                         seed=None, n_jobs=1, executor=None, engine='sklearn',
+                         verbose=True, checkpoint_path=None, checkpoint_every=10,
+                         resume_from=None, backend='deap', fold_pruning=False,
+                         surrogate=None, surrogate_fraction=0.25, surrogate_exploration=0.1):
     """
     Ejecuta el algoritmo genético para selección de características.
     
@@ -92,16 +675,58 @@ def run_genetic_algorithm(X_twp, Y_targets, pop_size=100, num_generations=100,
         num_generations: Número máximo de generaciones
         lambda_penalty: Peso de penalización (None = usar global)
         early_stopping_patience: Detener si no hay mejora en N generaciones
+        cache: FitnessCache a reutilizar (None = crear una nueva para esta corrida).
+               Con cache_size=0 se desactiva la memorización.
+        cache_size: Tamaño máximo de la caché creada si cache es None
+        seed: Semilla para random y numpy (None = no fijar)
+        n_jobs: Procesos para evaluar el fitness (1 = serie, -1 = todos los núcleos)
+        executor: Pool creado con create_evaluation_pool sobre los mismos datos
+                  (tiene prioridad sobre n_jobs y no se cierra al terminar)
+        engine: 'sklearn' (evaluate_features por individuo) o 'numpy'
+                (BatchedLDAEvaluator: toda la población en una llamada, en serie)
+        verbose: Si False, no imprime el progreso por generación
+        checkpoint_path: Archivo .npz donde guardar checkpoints (None = no guardar)
+        checkpoint_every: Guardar cada N generaciones
+        resume_from: Checkpoint desde el cual continuar la corrida. Con los mismos
+                     datos y parámetros el resultado es idéntico al de una corrida
+                     sin interrupciones (seed se ignora: se restauran los RNG)
+        backend: 'deap' (listas de Python) o 'packed' (PackedPopulation: población en
+                 un array uint8 empaquetado con operadores vectorizados; recomendado
+                 desde ~10k individuos). Con 'packed' la secuencia aleatoria es
+                 distinta a la de 'deap' y no hay checkpoints
+        fold_pruning: Si True, la validación cruzada de cada individuo se abandona
+                      cuando ya no puede superar al peor del Hall of Fame (ver
+                      evaluate_features_pruned) y recibe esa cota superior como
+                      fitness. El Hall of Fame y el máximo de cada generación son
+                      exactos (las cotas que lo alcanzan se re-evalúan sin poda);
+                      la selección, la media y el desvío sí ven las cotas
+        surrogate: None, 'linear' o 'knn' (ver SurrogateModel). Desde la segunda
+                   generación sólo se evalúa con LDA + CV la fracción
+                   surrogate_fraction de la descendencia con mejor fitness predicho,
+                   más surrogate_exploration al azar; el resto recibe la predicción,
+                   no entra en el Hall of Fame ni en las estadísticas y se vuelve
+                   a considerar en la generación siguiente. Sólo con backend='deap'
+                   y sin checkpoints; con fold_pruning el modelo sólo aprende de
+                   los fitness exactos
+        surrogate_fraction: Fracción evaluada por ranking predicho
+        surrogate_exploration: Fracción adicional evaluada al azar
         
     Returns:
         best_individual: Mejor solución encontrada
-        log: Registro de estadísticas por generación
+        log: Registro de estadísticas por generación (incluye cache_hits/cache_misses,
+             folds_skipped, los ajustes de fold evitados por la poda y, con
+             surrogate, evaluations_saved y surrogate_history: evaluated, saved,
+             mae y rank_corr por generación)
     """
     
     # Usar lambda global si no se especifica
     if lambda_penalty is None:
         lambda_penalty = LAMBDA_PENALTY
     
+    if seed is not None:
+        random.seed(seed)
+        np.random.seed(seed)
+    
     # Calcular número de características dinámicamente
     current_n_features = X_twp.shape[1]
     
@@ -110,16 +735,117 @@ def run_genetic_algorithm(X_twp, Y_targets, pop_size=100, num_generations=100,
                     toolbox.attr_bool, n=current_n_features)
     toolbox.register("population", tools.initRepeat, list, toolbox.individual)
     
+    # Caché de fitness: clave = cromosoma + (lambda, k_folds, huella del dataset)
+    if cache is None and cache_size > 0:
+        cache = FitnessCache(cache_size)
+    cache_context = (lambda_penalty, K_FOLDS, dataset_fingerprint(X_twp, Y_targets))
+    
+    # Splits y bloques por fold: uno por dataset, compartido entre corridas
+    plan = get_fold_plan(X_twp, Y_targets, K_FOLDS, cache_context[2])
+    
     # Registrar función de evaluación con parámetros específicos
     toolbox.register("evaluate", evaluate_features, 
                     X_data=X_twp, 
                     Y_targets=Y_targets, 
                     total_features=current_n_features, 
                     lambda_penalty=lambda_penalty,
-                    k_folds=K_FOLDS)
+                    k_folds=K_FOLDS,
+                    plan=plan)
+    hits_start = cache.hits if cache is not None else 0
+    misses_start = cache.misses if cache is not None else 0
+    
+    if engine not in ('sklearn', 'numpy'):
+        raise ValueError(f"engine debe ser 'sklearn' o 'numpy', no '{engine}'")
+    if engine == 'numpy' and (executor is not None or n_jobs != 1):
+        raise ValueError("engine='numpy' evalúa en el proceso principal; "
+                         "no combinar con n_jobs/executor")
+    
+    if backend not in ('deap', 'packed'):
+        raise ValueError(f"backend debe ser 'deap' o 'packed', no '{backend}'")
+    if backend == 'packed' and (checkpoint_path is not None or resume_from is not None):
+        raise ValueError("backend='packed' no soporta checkpoints")
+    if surrogate is not None and (backend != 'deap' or checkpoint_path is not None 
+                                  or resume_from is not None):
+        raise ValueError("surrogate requiere backend='deap' y no soporta checkpoints")
+    surrogate_model = SurrogateModel(surrogate) if surrogate is not None else None
+    surrogate_history = []
+    
+    # Evaluación paralela: los workers ya tienen X/Y, sólo viaja el cromosoma
+    own_executor = executor is None and n_jobs != 1 and engine == 'sklearn'
+    if own_executor:
+        executor = create_evaluation_pool(X_twp, Y_targets, n_jobs=n_jobs)
+    
+    pruning = FoldPruning() if fold_pruning else None
+    if engine == 'numpy':
+        # Motor vectorizado: los faltantes de cada generación en un único lote
+        lda_engine = BatchedLDAEvaluator(X_twp, Y_targets, k_folds=K_FOLDS, plan=plan)
+        evaluate = toolbox.evaluate
+        if pruning is None:
+            map_fn = lambda func, inds: lda_engine.evaluate_population(
+                inds, current_n_features, lambda_penalty)
+        else:
+            def map_fn(func, inds):
+                fitnesses = lda_engine.evaluate_population(
+                    inds, current_n_features, lambda_penalty, pruning.threshold)
+                skipped = lda_engine.last_folds_skipped if len(inds) else []
+                return pruning.collect(zip(fitnesses, skipped))
+    elif pruning is not None:
+        # La función se arma en cada llamada porque el umbral cambia por generación
+        evaluate = None
+        if executor is not None:
+            map_fn = lambda func, inds: pruning.collect(executor.map(
+                partial(_evaluate_pruned_in_worker, total_features=current_n_features,
+                        lambda_penalty=lambda_penalty, k_folds=K_FOLDS,
+                        threshold=pruning.threshold),
+                [list(ind) for ind in inds]))
+        else:
+            map_fn = lambda func, inds: pruning.collect(map(
+                partial(evaluate_features_pruned, X_data=X_twp, Y_targets=Y_targets,
+                        total_features=current_n_features, lambda_penalty=lambda_penalty,
+                        k_folds=K_FOLDS, threshold=pruning.threshold, plan=plan),
+                inds))
+    elif executor is not None:
+        evaluate = partial(_evaluate_in_worker,
+                           total_features=current_n_features,
+                           lambda_penalty=lambda_penalty,
+                           k_folds=K_FOLDS)
+        map_fn = lambda func, inds: executor.map(func, [list(ind) for ind in inds])
+    else:
+        evaluate = toolbox.evaluate
+        map_fn = map
+    
+    if backend == 'packed':
+        try:
+            return _run_packed_backend(current_n_features, pop_size, num_generations,
+                                       early_stopping_patience, seed, evaluate, map_fn,
+                                       cache, cache_context, verbose, pruning)
+        finally:
+            if own_executor:
+                executor.shutdown()
     
-    # Crear población inicial
-    pop = toolbox.population(n=pop_size)
+    # Hall of Fame (guardar mejores individuos)
+    hof = tools.HallOfFame(5)  # Guardar top 5
+    
+    best_fitness_history = []
+    generations_without_improvement = 0
+    start_gen = 0
+    
+    if resume_from is not None:
+        # Continuar exactamente donde se guardó el checkpoint
+        state = load_ga_checkpoint(resume_from)
+        if state['fingerprint'] != cache_context[2] or state['lambda_penalty'] != lambda_penalty:
+            raise ValueError("El checkpoint se creó con otros datos u otro lambda_penalty")
+        pop = state['pop']
+        hof = state['hof']
+        if pruning is not None:
+            pruning.folds_skipped = state['folds_skipped']
+            pruning.update(hof)
+        best_fitness_history = state['best_fitness_history']
+        generations_without_improvement = state['generations_without_improvement']
+        start_gen = state['next_gen']
+    else:
+        # Crear población inicial
+        pop = toolbox.population(n=pop_size)
     
     # Configurar estadísticas
     stats = tools.Statistics(lambda ind: ind.fitness.values)
@@ -127,29 +853,153 @@ def run_genetic_algorithm(X_twp, Y_targets, pop_size=100, num_generations=100,
     stats.register("avg", np.mean)
     stats.register("std", np.std)
     
-    # Hall of Fame (guardar mejores individuos)
-    hof = tools.HallOfFame(5)  # Guardar top 5
-    
     # ALGORITMO CON EARLY STOPPING
+    
+    try:
+        for gen in range(start_gen, num_generations):
+            # Evaluar sólo individuos sin fitness válido (élites y clones intactos se conservan)
+            invalid_ind = [ind for ind in pop if not ind.fitness.valid or not _is_exact(ind)]
+            with timer('ga.evaluate', items=len(invalid_ind), gen=gen):
+                if surrogate_model is not None:
+                    surrogate_history.append(evaluate_with_surrogate(
+                        invalid_ind, evaluate, cache, cache_context, map_fn, surrogate_model,
+                        surrogate_fraction, surrogate_exploration, gen))
+                else:
+                    fitnesses = evaluate_with_cache(invalid_ind, evaluate, 
+                                                    cache, cache_context, map_fn)
+                    for ind, fit in zip(invalid_ind, fitnesses):
+                        ind.fitness.values = fit
+                        ind.pruned = isinstance(fit, UpperBound)
+        
+            # Actualizar Hall of Fame (sólo con fitness reales)
+            exact = pop if surrogate_model is None else [ind for ind in pop if _is_exact(ind)]
+            if pruning is not None:
+                with timer('ga.evaluate', gen=gen, resolve_max=True):
+                    pruning.resolve_max(exact, evaluate, cache, cache_context, map_fn)
+            hof.update(exact)
+            if pruning is not None:
+                pruning.update(hof)
+        
+            # Registrar estadísticas
+            record = stats.compile(exact)
+            best_fitness_history.append(record['max'])
+        
+            # Imprimir progreso cada 10 generaciones
+            if verbose and (gen % 10 == 0 or gen == num_generations - 1):
+                surrogate_text = ''
+                if surrogate_history:
+                    last = surrogate_history[-1]
+                    surrogate_text = (f" | Eval: {last['evaluated']:3d} "
+                                      f"(sustituto: {last['saved']}, ρ={last['rank_corr']:.2f})")
+                print(f"Gen {gen:3d} | Max: {record['max']:7.3f} | "
+                      f"Avg: {record['avg']:7.3f} | Std: {record['std']:6.3f}{surrogate_text}")
+        
+            # Early stopping
+            if gen > 0:
+                if best_fitness_history[-1] <= best_fitness_history[-2]:
+                    generations_without_improvement += 1
+                else:
+                    generations_without_improvement = 0
+        
+            if generations_without_improvement >= early_stopping_patience:
+                if verbose:
+                    print(f"⚠️  Early stopping en generación {gen} "
+                          f"(sin mejora por {early_stopping_patience} generaciones)")
+                break
+        
+            # Última generación
+            if gen == num_generations - 1:
+                break
+        
+            # Selección, cruce, mutación y reemplazo de la población
+            with timer('ga.variation', gen=gen):
+                pop[:] = vary_population(pop)
+            
+            # Checkpoint: población lista para la generación siguiente
+            if checkpoint_path is not None and (gen + 1) % checkpoint_every == 0:
+                save_ga_checkpoint(checkpoint_path, {
+                    'next_gen': gen + 1,
+                    'pop': pop,
+                    'hof': hof,
+                    'best_fitness_history': best_fitness_history,
+                    'generations_without_improvement': generations_without_improvement,
+                    'lambda_penalty': lambda_penalty,
+                    'fingerprint': cache_context[2],
+                    'folds_skipped': pruning.folds_skipped if pruning is not None else 0,
+                })
+    finally:
+        if own_executor:
+            executor.shutdown()
+    
+    # ========================================================================
+    # RESULTADOS FINALES
+    # ========================================================================
+    best_individual = hof[0]
+    
+    # Crear log compatible con DEAP
+    log = tools.Logbook()
+    log.record(gen=len(best_fitness_history), 
+              max=best_fitness_history[-1],
+              best_individual=best_individual,
+              cache_hits=(cache.hits - hits_start) if cache is not None else 0,
+              cache_misses=(cache.misses - misses_start) if cache is not None else 0,
+              folds_skipped=pruning.folds_skipped if pruning is not None else 0)
+    if surrogate_model is not None:
+        log[0]['evaluations_saved'] = sum(r['saved'] for r in surrogate_history)
+        log[0]['surrogate_history'] = surrogate_history
+    
+    return best_individual, log
 
+# ============================================================================
+# BACKEND EMPAQUETADO (POBLACIÓN COMO ARRAY NUMPY)
+# ============================================================================
+def _run_packed_backend(n_features, pop_size, num_generations, early_stopping_patience,
+                        seed, evaluate, map_fn, cache, cache_context, verbose, pruning=None):
+    """Bucle de run_genetic_algorithm sobre una PackedPopulation (backend='packed')."""
+    rng = np.random.default_rng(seed)
+    pop = PackedPopulation.random(pop_size, n_features, rng)
+    hof = tools.HallOfFame(5)
+    hits_start = cache.hits if cache is not None else 0
+    misses_start = cache.misses if cache is not None else 0
+    
     best_fitness_history = []
     generations_without_improvement = 0
     
     for gen in range(num_generations):
-        # Evaluar población
-        fitnesses = list(map(toolbox.evaluate, pop))
-        for ind, fit in zip(pop, fitnesses):
-            ind.fitness.values = fit
+        # Evaluar sólo las filas sin fitness
+        invalid_rows = pop.invalid_rows()
+        with timer('ga.evaluate', items=len(invalid_rows), gen=gen):
+            fitnesses = evaluate_with_cache(pop.unpack(invalid_rows), evaluate, 
+                                            cache, cache_context, map_fn)
+        pop.fitness[invalid_rows] = [fit[0] for fit in fitnesses]
+        
+        if pruning is not None:
+            # Cotas de la poda: el máximo de la generación debe ser exacto
+            pop.bound[invalid_rows] = [isinstance(fit, UpperBound) for fit in fitnesses]
+            with timer('ga.evaluate', gen=gen, resolve_max=True):
+                rows = _bounds_reaching_max(pop.fitness, pop.bound)
+                while len(rows):
+                    exact = pruning.evaluate_exact(pop.unpack(rows), evaluate, cache,
+                                                   cache_context, map_fn)
+                    pop.fitness[rows] = [fit[0] for fit in exact]
+                    pop.bound[rows] = False
+                    rows = _bounds_reaching_max(pop.fitness, pop.bound)
         
-        # Actualizar Hall of Fame
-        hof.update(pop)
+        # Hall of Fame: sólo los mejores cromosomas distintos se convierten a Individual
+        candidates = []
+        for row in pop.top_unique(hof.maxsize):
+            ind = creator.Individual(int(bit) for bit in pop.unpack([row])[0])
+            ind.fitness.values = (float(pop.fitness[row]),)
+            candidates.append(ind)
+        hof.update(candidates)
+        if pruning is not None:
+            pruning.update(hof)
         
-        # Registrar estadísticas
-        record = stats.compile(pop)
+        record = {'max': np.max(pop.fitness), 'avg': np.mean(pop.fitness), 
+                  'std': np.std(pop.fitness)}
         best_fitness_history.append(record['max'])
         
-        # Imprimir progreso cada 10 generaciones
-        if gen % 10 == 0 or gen == num_generations - 1:
+        if verbose and (gen % 10 == 0 or gen == num_generations - 1):
             print(f"Gen {gen:3d} | Max: {record['max']:7.3f} | "
                   f"Avg: {record['avg']:7.3f} | Std: {record['std']:6.3f}")
         
@@ -161,52 +1011,342 @@ def run_genetic_algorithm(X_twp, Y_targets, pop_size=100, num_generations=100,
                 generations_without_improvement = 0
         
         if generations_without_improvement >= early_stopping_patience:
-            print(f"⚠️  Early stopping en generación {gen} "
-                  f"(sin mejora por {early_stopping_patience} generaciones)")
+            if verbose:
+                print(f"⚠️  Early stopping en generación {gen} "
+                      f"(sin mejora por {early_stopping_patience} generaciones)")
             break
         
-        # Última generación
         if gen == num_generations - 1:
             break
         
-        # Selección
-        offspring = toolbox.select(pop, len(pop))
-        offspring = list(map(toolbox.clone, offspring))
-        
-        # Cruce
-        for child1, child2 in zip(offspring[::2], offspring[1::2]):
-            if random.random() < 0.7:  # Probabilidad de cruce
-                toolbox.mate(child1, child2)
-                del child1.fitness.values
-                del child2.fitness.values
-        
-        # Mutación
-        for mutant in offspring:
-            if random.random() < 0.3:  # Probabilidad de mutación
-                toolbox.mutate(mutant)
-                del mutant.fitness.values
-        
-        # Reemplazar población
-        pop[:] = offspring
+        with timer('ga.variation', gen=gen):
+            pop = pop.vary(rng)
     
-    # ========================================================================
-    # RESULTADOS FINALES
-    # ========================================================================
     best_individual = hof[0]
-    
-    # Crear log compatible con DEAP
     log = tools.Logbook()
     log.record(gen=len(best_fitness_history), 
               max=best_fitness_history[-1],
-              best_individual=best_individual)
+              best_individual=best_individual,
+              cache_hits=(cache.hits - hits_start) if cache is not None else 0,
+              cache_misses=(cache.misses - misses_start) if cache is not None else 0,
+              folds_skipped=pruning.folds_skipped if pruning is not None else 0)
     
     return best_individual, log
 
+# ============================================================================
+# MODO MULTIOBJETIVO (NSGA-II): FRENTE DE PARETO ACCURACY VS. Nº DE CARACTERÍSTICAS
+# ============================================================================
+# En lugar de escalarizar con lambda, cada individuo tiene dos objetivos
+# (accuracy CV, nº de características seleccionadas) y la selección es NSGA-II.
+# Para cualquier lambda, el individuo que maximiza accuracy - lambda·n/total·100
+# entre los evaluados está en el frente de Pareto, así que una sola corrida
+# reemplaza el barrido de optimize_lambda (ver pareto_tradeoffs).
+def run_nsga2(X_twp, Y_targets, pop_size=100, num_generations=100, cxpb=0.7, mutpb=0.3,
+              cache=None, cache_size=FITNESS_CACHE_SIZE, seed=None, n_jobs=1,
+              executor=None, engine='sklearn', verbose=True):
+    """
+    Algoritmo genético multiobjetivo (NSGA-II) para selección de características.
+    
+    Args:
+        X_twp: Matriz de características TWP (n_samples, n_features)
+        Y_targets: Vector de etiquetas (n_samples,)
+        pop_size: Tamaño de la población (múltiplo de 4, lo exige selTournamentDCD)
+        num_generations: Número de generaciones
+        cxpb, mutpb: Probabilidades de cruce y mutación (ver vary_population)
+        cache, cache_size, seed, n_jobs, executor, engine, verbose:
+            ver run_genetic_algorithm. La caché guarda la accuracy sin penalizar,
+            compatible con una corrida escalar con lambda_penalty=0
+        
+    Returns:
+        front: Individuos no dominados entre todos los evaluados (fitness.values =
+               (accuracy_cv, n_features)), uno por punto del frente (de varios
+               cromosomas con el mismo fitness queda el primero encontrado),
+               ordenados por nº de características
+        log: Registro con gen, front_size, cache_hits y cache_misses
+    """
+    if pop_size % 4 != 0:
+        raise ValueError(f"pop_size debe ser múltiplo de 4 para NSGA-II, no {pop_size}")
+    if engine not in ('sklearn', 'numpy'):
+        raise ValueError(f"engine debe ser 'sklearn' o 'numpy', no '{engine}'")
+    if engine == 'numpy' and (executor is not None or n_jobs != 1):
+        raise ValueError("engine='numpy' evalúa en el proceso principal; "
+                         "no combinar con n_jobs/executor")
+    
+    if seed is not None:
+        random.seed(seed)
+        np.random.seed(seed)
+    
+    n_features = X_twp.shape[1]
+    if cache is None and cache_size > 0:
+        cache = FitnessCache(cache_size)
+    # Accuracy sin penalizar: misma clave que una corrida escalar con lambda = 0
+    cache_context = (0.0, K_FOLDS, dataset_fingerprint(X_twp, Y_targets))
+    plan = get_fold_plan(X_twp, Y_targets, K_FOLDS, cache_context[2])
+    hits_start = cache.hits if cache is not None else 0
+    misses_start = cache.misses if cache is not None else 0
+    
+    own_executor = executor is None and n_jobs != 1 and engine == 'sklearn'
+    if own_executor:
+        executor = create_evaluation_pool(X_twp, Y_targets, n_jobs=n_jobs)
+    
+    if engine == 'numpy':
+        lda_engine = BatchedLDAEvaluator(X_twp, Y_targets, k_folds=K_FOLDS, plan=plan)
+        evaluate = None
+        map_fn = lambda func, inds: lda_engine.evaluate_population(inds, n_features, 0.0)
+    elif executor is not None:
+        evaluate = partial(_evaluate_in_worker, total_features=n_features,
+                           lambda_penalty=0.0, k_folds=K_FOLDS)
+        map_fn = lambda func, inds: executor.map(func, [list(ind) for ind in inds])
+    else:
+        evaluate = partial(evaluate_features, X_data=X_twp, Y_targets=Y_targets,
+                           total_features=n_features, lambda_penalty=0.0, k_folds=K_FOLDS,
+                           plan=plan)
+        map_fn = map
+    
+    def assign_fitness(individuals):
+        accuracies = evaluate_with_cache(individuals, evaluate, cache, cache_context, map_fn)
+        for ind, (accuracy,) in zip(individuals, accuracies):
+            n_selected = sum(ind)
+            # Sin características: peor caso en ambos objetivos (no entra en el frente)
+            ind.fitness.values = (accuracy, n_selected) if n_selected else (0.0, n_features)
+    
+    front = tools.ParetoFront()
+    pop = [creator.IndividualMulti(random.randint(0, 1) for _ in range(n_features))
+           for _ in range(pop_size)]
+    
+    try:
+        with timer('ga.evaluate', items=len(pop), gen=0):
+            assign_fitness(pop)
+        # Asigna rango y distancia de crowding (los usa selTournamentDCD)
+        pop = tools.selNSGA2(pop, pop_size)
+        front.update(pop)
+        
+        for gen in range(1, num_generations):
+            with timer('ga.variation', gen=gen):
+                offspring = vary_population(pop, cxpb, mutpb, select=tools.selTournamentDCD)
+            invalid_ind = [ind for ind in offspring if not ind.fitness.valid]
+            with timer('ga.evaluate', items=len(invalid_ind), gen=gen):
+                assign_fitness(invalid_ind)
+            
+            # Elitismo NSGA-II: padres + hijos, se quedan los mejores frentes
+            pop = tools.selNSGA2(pop + offspring, pop_size)
+            front.update(offspring)
+            
+            if verbose and (gen % 10 == 0 or gen == num_generations - 1):
+                accuracies, sizes = zip(*(ind.fitness.values for ind in front))
+                print(f"Gen {gen:3d} | Frente: {len(front):3d} | Max acc: {max(accuracies):7.3f} | "
+                      f"Características: {int(min(sizes))}-{int(max(sizes))}")
+    finally:
+        if own_executor:
+            executor.shutdown()
+    
+    # ParetoFront sólo descarta cromosomas repetidos: un punto por fitness
+    points = {}
+    for ind in front:
+        points.setdefault(ind.fitness.values, ind)
+    front = sorted(points.values(), key=lambda ind: ind.fitness.values[1])
+    log = tools.Logbook()
+    log.record(gen=num_generations,
+               front_size=len(front),
+               cache_hits=(cache.hits - hits_start) if cache is not None else 0,
+               cache_misses=(cache.misses - misses_start) if cache is not None else 0)
+    return front, log
+
+
+def pareto_tradeoffs(front, lambda_values, total_features=None):
+    """
+    Lee del frente de Pareto la solución que elegiría el AG escalar para cada lambda.
+    
+    Args:
+        front: Frente devuelto por run_nsga2
+        lambda_values: Valores de lambda_penalty a consultar
+        total_features: Número total de características (None = largo del cromosoma)
+        
+    Returns:
+        dict: {lambda: {'fitness', 'accuracy', 'n_features', 'individual'}}, con el
+              mismo formato de fitness que evaluate_features (accuracy - penalización)
+              e individual como creator.Individual, igual que optimize_lambda
+    """
+    if total_features is None:
+        total_features = len(front[0])
+    results = {}
+    for lam in lambda_values:
+        scored = [(ind.fitness.values[0] - lam * ind.fitness.values[1] / total_features * 100,
+                   ind) for ind in front]
+        fitness, best = max(scored, key=lambda item: item[0])
+        individual = creator.Individual(best)
+        individual.fitness.values = (fitness,)
+        results[lam] = {
+            'fitness': fitness,
+            'accuracy': best.fitness.values[0],
+            'n_features': int(best.fitness.values[1]),
+            'individual': individual,
+        }
+    return results
+
+# ============================================================================
+# GRID SEARCH PARALELO Y REANUDABLE
+# ============================================================================
+GRID_PARAMS = ('lambda_penalty', 'pop_size', 'num_generations', 'wavelet', 'level')
+
+def expand_grid(lambda_values=[0.1, 0.5, 1.0, 2.0, 3.0], pop_sizes=[50], 
+                num_generations=[30], wavelets=[None], levels=[None]):
+    """
+    Producto cartesiano de parámetros para run_grid_search.
+    
+    Con wavelets/levels = [None] se asume que los datos ya son características TWP.
+    
+    Returns:
+        list: Combinaciones como diccionarios con las claves de GRID_PARAMS
+    """
+    return [dict(zip(GRID_PARAMS, values)) 
+            for values in itertools.product(lambda_values, pop_sizes, num_generations,
+                                            wavelets, levels)]
+
+
+def _combination_id(combination, fingerprint, seed):
+    payload = json.dumps({'params': combination, 'data': fingerprint, 'seed': seed},
+                         sort_keys=True, default=str)
+    return hashlib.sha1(payload.encode()).hexdigest()[:16]
+
+
+def _init_grid_worker(features, Y_targets, blas_threads):
+    """Inicializador: matrices TWP por (wavelet, level) compartidas una vez por proceso."""
+    _init_evaluation_worker(None, Y_targets, blas_threads)
+    _WORKER_DATA['features'] = features
+
+
+def _run_grid_combination(combination, seed, early_stopping_patience, engine, 
+                          features=None, Y_targets=None):
+    """Ejecuta el AG para una combinación y devuelve una fila de resultados."""
+    if features is None:
+        features, Y_targets = _WORKER_DATA['features'], _WORKER_DATA['Y']
+    X_twp = features[(combination['wavelet'], combination['level'])]
+    
+    start = time.perf_counter()
+    best_ind, log = run_genetic_algorithm(
+        X_twp, Y_targets,
+        pop_size=combination['pop_size'],
+        num_generations=combination['num_generations'],
+        lambda_penalty=combination['lambda_penalty'],
+        early_stopping_patience=early_stopping_patience,
+        seed=seed, engine=engine, verbose=False
+    )
+    selected = [i for i, bit in enumerate(best_ind) if bit == 1]
+    
+    row = dict(combination)
+    row.update({
+        'seed': seed,
+        'fitness': float(best_ind.fitness.values[0]),
+        'n_features': len(selected),
+        'n_features_totales': len(best_ind),
+        'generations': log[0]['gen'],
+        'selected_indices': ' '.join(map(str, selected)),
+        'elapsed_s': time.perf_counter() - start,
+    })
+    return row
+
+
+def run_grid_search(data, Y_targets, grid, n_jobs=None, checkpoint_dir=None, 
+                    seed=None, early_stopping_patience=10, engine='sklearn'):
+    """
+    Ejecuta el AG para cada combinación del grid, en paralelo y con checkpoints.
+    
+    Cada combinación terminada se guarda en checkpoint_dir/<id>.json; al volver a
+    llamar con la misma carpeta, datos y semilla, las combinaciones ya hechas se
+    leen del disco en lugar de recalcularse.
+    
+    Args:
+        data: Características (n_samples, n_features) o, si el grid incluye
+              wavelet/level, épocas crudas (n_samples, n_channels, n_trials)
+        Y_targets: Vector de etiquetas
+        grid: Lista de combinaciones (ver expand_grid)
+        n_jobs: Procesos (None = todos los núcleos, 1 = en serie)
+        checkpoint_dir: Carpeta de checkpoints (None = sin checkpoints). Requiere seed:
+                        sin semilla fija no se puede saber si un resultado guardado
+                        corresponde a esta corrida
+        seed: Semilla usada en TODAS las combinaciones (None = aleatoria)
+        early_stopping_patience: Paciencia del early stopping de cada corrida
+        engine: 'sklearn' o 'numpy' (ver run_genetic_algorithm)
+        
+    Returns:
+        list: Una fila (dict) por combinación, en el orden del grid; también se
+              escribe checkpoint_dir/resultados_grid.csv
+    """
+    if checkpoint_dir is not None and seed is None:
+        raise ValueError("checkpoint_dir requiere una semilla fija (seed): con seed=None "
+                         "se reutilizarían resultados de corridas con otra semilla")
+    grid = [{**dict.fromkeys(GRID_PARAMS), **combination} for combination in grid]
+    
+    # Características: una descomposición por wavelet para todos sus niveles
+    features = {}
+    if data.ndim == 3:
+        for wavelet in dict.fromkeys(c['wavelet'] for c in grid):
+            levels = sorted({c['level'] for c in grid if c['wavelet'] == wavelet},
+                            key=lambda l: -1 if l is None else l)
+            if wavelet is None or None in levels:
+                raise ValueError("Con épocas crudas cada combinación debe indicar "
+                                 "'wavelet' y 'level'")
+            features.update(twp_feature_grid(data, [wavelet], levels))
+    else:
+        if any(c['wavelet'] is not None or c['level'] is not None for c in grid):
+            raise ValueError("'wavelet'/'level' requieren épocas crudas "
+                             "(n_samples, n_channels, n_trials)")
+        features[(None, None)] = data
+    
+    fingerprints = {key: dataset_fingerprint(X, Y_targets) for key, X in features.items()}
+    ids = [_combination_id(c, fingerprints[(c['wavelet'], c['level'])], seed) for c in grid]
+    
+    # Reanudar: leer las combinaciones ya terminadas
+    rows = [None] * len(grid)
+    if checkpoint_dir is not None:
+        os.makedirs(checkpoint_dir, exist_ok=True)
+        for i, combination_id in enumerate(ids):
+            path = os.path.join(checkpoint_dir, combination_id + '.json')
+            if os.path.exists(path):
+                with open(path) as f:
+                    rows[i] = json.load(f)
+    pending = [i for i, row in enumerate(rows) if row is None]
+    print(f"🔍 Grid search: {len(grid)} combinaciones "
+          f"({len(grid) - len(pending)} recuperadas de checkpoints)")
+    
+    def save(i, row):
+        rows[i] = row
+        if checkpoint_dir is not None:
+            path = os.path.join(checkpoint_dir, ids[i] + '.json')
+            with open(path + '.tmp', 'w') as f:
+                json.dump(row, f)
+            os.replace(path + '.tmp', path)
+    
+    if n_jobs == 1 or len(pending) <= 1:
+        for i in pending:
+            save(i, _run_grid_combination(grid[i], seed, early_stopping_patience, engine,
+                                          features, Y_targets))
+    else:
+        if n_jobs is None or n_jobs < 1:
+            n_jobs = os.cpu_count() or 1
+        with ProcessPoolExecutor(max_workers=min(n_jobs, len(pending)),
+                                 initializer=_init_grid_worker,
+                                 initargs=(features, Y_targets, 1)) as pool:
+            futures = {pool.submit(_run_grid_combination, grid[i], seed, 
+                                   early_stopping_patience, engine): i for i in pending}
+            for future in as_completed(futures):
+                save(futures[future], future.result())
+    
+    if checkpoint_dir is not None:
+        with open(os.path.join(checkpoint_dir, 'resultados_grid.csv'), 'w', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=list(rows[0].keys()))
+            writer.writeheader()
+            writer.writerows(rows)
+    
+    return rows
+
 # ============================================================================
 # FUNCIÓN AUXILIAR: GRID SEARCH PARA LAMBDA
 # ============================================================================
 def optimize_lambda(X_twp, Y_targets, lambda_values=[0.1, 0.5, 1.0, 2.0, 3.0],
-                   pop_size=50, num_generations=30):
+                   pop_size=50, num_generations=30, n_jobs=1, 
+                   checkpoint_dir=None, seed=None):
     """
     Encuentra el mejor valor de lambda mediante grid search.
     
@@ -216,39 +1356,35 @@ def optimize_lambda(X_twp, Y_targets, lambda_values=[0.1, 0.5, 1.0, 2.0, 3.0],
         lambda_values: Lista de valores de lambda a probar
         pop_size: Tamaño de población (reducido para rapidez)
         num_generations: Generaciones (reducido para rapidez)
+        n_jobs: Procesos para correr los lambdas en paralelo (1 = en serie, None = todos)
+        checkpoint_dir: Carpeta para reanudar un barrido interrumpido (requiere seed)
+        seed: Semilla de cada corrida
         
     Returns:
         best_lambda: Mejor valor de lambda encontrado
         results: Diccionario con resultados de cada lambda
+                 (results[lam]['fila'] es la fila completa de run_grid_search)
     """
+    rows = run_grid_search(X_twp, Y_targets, 
+                           expand_grid(lambda_values, [pop_size], [num_generations]),
+                           n_jobs=n_jobs, checkpoint_dir=checkpoint_dir, seed=seed)
     
-    print("🔍 Optimizando valor de lambda...")
     results = {}
-    
-    for lam in lambda_values:
-        print(f"\n--- Probando λ = {lam} ---")
-        best_ind, _ = run_genetic_algorithm(
-            X_twp, Y_targets, 
-            pop_size=pop_size, 
-            num_generations=num_generations,
-            lambda_penalty=lam,
-            early_stopping_patience=10
-        )
-        
-        selected = [i for i, bit in enumerate(best_ind) if bit == 1]
-        fitness = best_ind.fitness.values[0]
-        
-        results[lam] = {
-            'fitness': fitness,
-            'n_features': len(selected),
-            'individual': best_ind
+    for row in rows:
+        selected = {int(i) for i in row['selected_indices'].split()}
+        individual = creator.Individual(int(i in selected) 
+                                        for i in range(row['n_features_totales']))
+        individual.fitness.values = (row['fitness'],)
+        results[row['lambda_penalty']] = {
+            'fitness': row['fitness'],
+            'n_features': row['n_features'],
+            'individual': individual,
+            'fila': row
         }
-        
-        print(f"Fitness: {fitness:.3f} | Features: {len(selected)}")
     
     # Encontrar mejor lambda
     best_lambda = max(results.keys(), key=lambda k: results[k]['fitness'])
     
-    print(f"\n✅ Mejor λ = {best_lambda} (Fitness: {results[best_lambda]['fitness']:.3f})")
+    print(f"✅ Mejor λ = {best_lambda} (Fitness: {results[best_lambda]['fitness']:.3f})")
     
-    return best_lambda, results
\ No newline at end of file
+    return best_lambda, results
@@ -0,0 +1,246 @@
+import random
+import numpy as np
+from functools import partial
+from deap import creator, tools
+
+from modules.genetic_algorithm import genetic_algorithm as ga
+from modules.genetic_algorithm.lda_engine import BatchedLDAEvaluator
+from modules.genetic_algorithm.fold_plan import get_fold_plan
+
+# ============================================================================
+# MODELO DE ISLAS: N SUB-POBLACIONES EN PARALELO CON MIGRACIÓN
+# ============================================================================
+# Cada época, cada isla evoluciona `migration_interval` generaciones en un
+# proceso del pool (con X/Y precargados por el inicializador). Al terminar la
+# época, el proceso principal copia los mejores individuos de cada isla a sus
+# vecinas según la topología, reemplazando a los peores. Toda la aleatoriedad
+# de una época se deriva de una semilla por (isla, época), por lo que el
+# resultado es reproducible para una semilla dada.
+
+TOPOLOGIES = ('ring', 'complete')
+
+
+def migration_targets(n_islands, topology='ring'):
+    """
+    Islas destino de los emigrantes de cada isla.
+
+    Args:
+        n_islands: Número de islas
+        topology: 'ring' (i -> i+1) o 'complete' (i -> todas las demás)
+
+    Returns:
+        dict: {isla_origen: [islas_destino]}
+    """
+    if topology == 'ring':
+        return {i: [(i + 1) % n_islands] for i in range(n_islands) if n_islands > 1}
+    if topology == 'complete':
+        return {i: [j for j in range(n_islands) if j != i] for i in range(n_islands)}
+    raise ValueError(f"topology debe ser uno de {TOPOLOGIES}, no '{topology}'")
+
+
+def _to_individual(bits, fitness=None):
+    ind = creator.Individual(bits)
+    if fitness is not None:
+        ind.fitness.values = fitness
+    return ind
+
+
+def _evolve_island(state, X_data=None, Y_targets=None):
+    """
+    Evoluciona una isla durante state['n_generations'] generaciones.
+
+    Se ejecuta en un worker del pool (datos en ga._WORKER_DATA) o en serie
+    (datos pasados explícitamente). Los operadores de DEAP usan el módulo random
+    global: se siembra con state['seed'] y al terminar se restaura el estado
+    previo de random y np.random, así en serie no se altera el del llamador.
+
+    Returns:
+        dict: población final (bits + fitness), mejores de la isla e historial de máximos
+    """
+    py_state, np_state = random.getstate(), np.random.get_state()
+    random.seed(state['seed'])
+    np.random.seed(state['seed'] % (2 ** 32))
+    try:
+        return _run_island_generations(state, X_data, Y_targets)
+    finally:
+        random.setstate(py_state)
+        np.random.set_state(np_state)
+
+
+def _run_island_generations(state, X_data, Y_targets):
+    """Cuerpo de _evolve_island, con los generadores globales ya sembrados."""
+    if X_data is None:
+        X_data, Y_targets = ga._WORKER_DATA['X'], ga._WORKER_DATA['Y']
+    total_features = X_data.shape[1]
+    lambda_penalty, k_folds = state['lambda_penalty'], state['k_folds']
+
+    # Caché y motor por proceso: se conservan entre épocas
+    context = (lambda_penalty, k_folds, ga.dataset_fingerprint(X_data, Y_targets))
+    cache = ga._WORKER_DATA.setdefault('island_cache', ga.FitnessCache())
+    plan = get_fold_plan(X_data, Y_targets, k_folds, context[2])
+    if state['engine'] == 'numpy':
+        engines = ga._WORKER_DATA.setdefault('island_engines', {})
+        if context[2] not in engines:
+            engines[context[2]] = BatchedLDAEvaluator(X_data, Y_targets, k_folds=k_folds,
+                                                      plan=plan)
+        lda_engine = engines[context[2]]
+        map_fn = lambda func, inds: lda_engine.evaluate_population(
+            inds, total_features, lambda_penalty)
+    else:
+        map_fn = map
+    evaluate = partial(ga.evaluate_features, X_data=X_data, Y_targets=Y_targets,
+                       total_features=total_features, lambda_penalty=lambda_penalty,
+                       k_folds=k_folds, plan=plan)
+
+    pop = [_to_individual(bits, fit) for bits, fit in zip(state['population'], state['fitness'])]
+    hof = tools.HallOfFame(state['hof_size'])
+    max_history = []
+
+    for gen in range(state['n_generations']):
+        # La población llega evaluada (salvo la inicial): primero se varía
+        if gen > 0 or not state['first_epoch']:
+            pop[:] = ga.vary_population(pop)
+
+        invalid_ind = [ind for ind in pop if not ind.fitness.valid]
+        fitnesses = ga.evaluate_with_cache(invalid_ind, evaluate, cache, context, map_fn)
+        for ind, fit in zip(invalid_ind, fitnesses):
+            ind.fitness.values = fit
+        hof.update(pop)
+        max_history.append(max(ind.fitness.values[0] for ind in pop))
+
+    return {
+        'population': [list(ind) for ind in pop],
+        'fitness': [ind.fitness.values for ind in pop],
+        'best': [(list(ind), ind.fitness.values) for ind in hof],
+        'max_history': max_history,
+    }
+
+
+def _migrate(populations, fitness, targets, migration_size):
+    """Copia los mejores de cada isla a sus destinos, reemplazando a los peores."""
+    emigrants = {}
+    for i in targets:
+        order = np.argsort([-fit[0] for fit in fitness[i]], kind='stable')
+        emigrants[i] = [(list(populations[i][j]), fitness[i][j]) for j in order[:migration_size]]
+
+    for source, destinations in targets.items():
+        for dest in destinations:
+            worst = np.argsort([fit[0] for fit in fitness[dest]], kind='stable')
+            for slot, (bits, fit) in zip(worst, emigrants[source]):
+                populations[dest][slot] = list(bits)
+                fitness[dest][slot] = fit
+
+
+def run_island_genetic_algorithm(X_twp, Y_targets, n_islands=4, pop_size=100,
+                                 num_generations=100, lambda_penalty=None,
+                                 migration_interval=10, migration_size=2,
+                                 topology='ring', early_stopping_patience=15,
+                                 seed=None, n_jobs=None, engine='sklearn', verbose=True):
+    """
+    Ejecuta el AG en modo islas (sub-poblaciones que migran sus mejores individuos).
+
+    Args:
+        X_twp: Matriz de características TWP (n_samples, n_features)
+        Y_targets: Vector de etiquetas (n_samples,)
+        n_islands: Número de islas
+        pop_size: Tamaño de la población de CADA isla
+        num_generations: Número máximo de generaciones
+        lambda_penalty: Peso de penalización (None = usar global)
+        migration_interval: Generaciones entre migraciones
+        migration_size: Individuos que emigra cada isla en cada migración
+        topology: 'ring' o 'complete'
+        early_stopping_patience: Detener (en una migración) si el máximo global
+                                 no mejora en N generaciones
+        seed: Semilla (None = aleatoria)
+        n_jobs: Procesos (None = uno por isla, 1 = en serie)
+        engine: 'sklearn' o 'numpy' (ver run_genetic_algorithm)
+        verbose: Si False, no imprime el progreso por época
+
+    Returns:
+        best_individual: Mejor solución encontrada entre todas las islas
+        log: Registro con el mismo formato que run_genetic_algorithm
+    """
+    if lambda_penalty is None:
+        lambda_penalty = ga.LAMBDA_PENALTY
+    if engine not in ('sklearn', 'numpy'):
+        raise ValueError(f"engine debe ser 'sklearn' o 'numpy', no '{engine}'")
+    targets = migration_targets(n_islands, topology)
+
+    current_n_features = X_twp.shape[1]
+    seeder = random.Random(seed)
+    init_rng = random.Random(seeder.getrandbits(64))
+    populations = [[[init_rng.randint(0, 1) for _ in range(current_n_features)]
+                    for _ in range(pop_size)] for _ in range(n_islands)]
+    fitness = [[None] * pop_size for _ in range(n_islands)]
+
+    if n_jobs is None:
+        n_jobs = n_islands
+    executor = ga.create_evaluation_pool(X_twp, Y_targets, n_jobs=n_jobs) if n_jobs != 1 else None
+    map_islands = executor.map if executor is not None else \
+        (lambda func, states: map(partial(func, X_data=X_twp, Y_targets=Y_targets), states))
+
+    hof = tools.HallOfFame(5)
+    best_fitness_history = []
+    generations_without_improvement = 0
+    n_migrations = 0
+    n_epochs = -(-num_generations // migration_interval)
+
+    try:
+        for epoch in range(n_epochs):
+            n_gens = min(migration_interval, num_generations - epoch * migration_interval)
+            states = [{
+                'population': populations[i],
+                'fitness': fitness[i],
+                'seed': seeder.getrandbits(64),
+                'n_generations': n_gens,
+                'first_epoch': epoch == 0,
+                'lambda_penalty': lambda_penalty,
+                'k_folds': ga.K_FOLDS,
+                'engine': engine,
+                'hof_size': hof.maxsize,
+            } for i in range(n_islands)]
+
+            results = list(map_islands(_evolve_island, states))
+
+            for i, result in enumerate(results):
+                populations[i] = result['population']
+                fitness[i] = result['fitness']
+                hof.update([_to_individual(bits, fit) for bits, fit in result['best']])
+
+            # Máximo global por generación (entre islas)
+            for gen_max in np.max([r['max_history'] for r in results], axis=0):
+                best_fitness_history.append(float(gen_max))
+                if len(best_fitness_history) > 1:
+                    if best_fitness_history[-1] <= best_fitness_history[-2]:
+                        generations_without_improvement += 1
+                    else:
+                        generations_without_improvement = 0
+            # Sólo se decide al final de la época: una mejora posterior reinicia el contador
+            stopped = generations_without_improvement >= early_stopping_patience
+
+            gen = len(best_fitness_history) - 1
+            if verbose:
+                print(f"Época {epoch:3d} | Gen {gen:3d} | Max global: {best_fitness_history[-1]:7.3f} | "
+                      f"Islas: " + " ".join(f"{max(f[0] for f in fit):6.2f}" for fit in fitness))
+
+            if stopped:
+                if verbose:
+                    print(f"⚠️  Early stopping en generación {gen} "
+                          f"(sin mejora por {early_stopping_patience} generaciones)")
+                break
+            if epoch < n_epochs - 1:
+                _migrate(populations, fitness, targets, migration_size)
+                n_migrations += 1
+    finally:
+        if executor is not None:
+            executor.shutdown()
+
+    best_individual = hof[0]
+    log = tools.Logbook()
+    log.record(gen=len(best_fitness_history),
+               max=best_fitness_history[-1],
+               best_individual=best_individual,
+               n_islands=n_islands,
+               migrations=n_migrations)
+
+    return best_individual, log
@@ -0,0 +1,235 @@
+import numpy as np
+from modules.genetic_algorithm.fold_plan import FoldPlan
+from modules.profiling.profiling import timed
+
+# ============================================================================
+# MOTOR DE FITNESS VECTORIZADO: LDA (shrinkage='auto', solver='eigen') + CV
+# ============================================================================
+# Reproduce LinearDiscriminantAnalysis(shrinkage='auto', solver='eigen') evaluado
+# con cross_val_score(cv=k_folds) sin pasar por sklearn en cada individuo:
+#
+#   - Los splits son los mismos de cross_val_score (StratifiedKFold sin shuffle),
+#     tomados de un FoldPlan.
+#   - Para cada fold y clase se precalculan, sobre TODAS las características, la
+#     media, la escala (StandardScaler), la matriz de covarianza estandarizada C
+#     y la matriz de cuartos momentos M = (Z²)ᵀ(Z²) que usa Ledoit-Wolf.
+#   - Para un subconjunto S, la estandarización es por columna, así que C[S,S] y
+#     M[S,S] son exactamente las matrices que sklearn calcularía sobre X[:, S].
+#   - coef = medias · Sw⁻¹ (equivalente a means·evecs·evecsᵀ del solver eigen).
+
+
+class BatchedLDAEvaluator:
+    """
+    Evalúa poblaciones completas con LDA + validación cruzada en NumPy.
+
+    Args:
+        X_data: Matriz de características (n_samples, n_features)
+        Y_targets: Vector de etiquetas (n_samples,)
+        k_folds: Número de folds (mismos splits que cross_val_score)
+        plan: FoldPlan ya construido sobre los mismos datos (None = crear uno)
+    """
+
+    def __init__(self, X_data, Y_targets, k_folds=5, plan=None):
+        X_data = np.asarray(X_data, dtype=np.float64)
+        Y_targets = np.asarray(Y_targets)
+        if plan is None:
+            plan = FoldPlan(X_data, Y_targets, k_folds)
+        self.n_features = X_data.shape[1]
+        self.k_folds = k_folds
+        self.folds = []
+        self.folds_skipped = 0  # Fits de fold evitados por la poda (cv_accuracy con floor)
+        self.last_folds_skipped = np.zeros(0, dtype=int)
+
+        for X_train, y_train, X_test, y_test in plan:
+            self.folds.append(self._fold_statistics(np.asarray(X_train, dtype=np.float64), y_train,
+                                                    np.asarray(X_test, dtype=np.float64), y_test))
+        # Un fold con una sola clase en entrenamiento hace fallar a sklearn en todos
+        # los individuos (FIT_ERRORS de genetic_algorithm): aquí, ajuste fallido
+        self.degenerate = any(len(fold['classes']) < 2 for fold in self.folds)
+
+    @staticmethod
+    def _fold_statistics(X_train, y_train, X_test, y_test):
+        """Precalcula las estadísticas por clase de un fold."""
+        classes = np.unique(y_train)
+        n_train = len(y_train)
+        eps = np.finfo(np.float64).eps
+
+        means, scales, corr, fourth, counts = [], [], [], [], []
+        for group in classes:
+            Xg = X_train[y_train == group]
+            n_g = Xg.shape[0]
+            mean = Xg.mean(axis=0)
+            var = Xg.var(axis=0)
+
+            # Igual que StandardScaler: características (casi) constantes -> escala 1
+            upper_bound = n_g * eps * var + (n_g * mean * eps) ** 2
+            var[var <= upper_bound] = 0.0
+            scale = np.sqrt(var)
+            scale[scale < 10 * eps] = 1.0
+
+            Z = (Xg - mean) / scale
+            Z = Z - Z.mean(axis=0)
+            Z2 = Z ** 2
+
+            means.append(mean)
+            scales.append(scale)
+            corr.append(Z.T @ Z / n_g)
+            fourth.append(Z2.T @ Z2)
+            counts.append(n_g)
+
+        counts = np.array(counts, dtype=np.float64)
+        return {
+            'classes': classes,
+            'priors': counts / n_train,
+            'counts': counts,
+            'means': np.array(means),
+            'scales': np.array(scales),
+            'corr': np.array(corr),
+            'fourth': np.array(fourth),
+            'X_test': X_test,
+            'y_test': y_test,
+        }
+
+    @staticmethod
+    def _shrunk_class_cov(fold, k, idx):
+        """Covarianza Ledoit-Wolf de la clase k para un grupo de subconjuntos (g, m)."""
+        g, m = idx.shape
+        rows, cols = idx[:, :, None], idx[:, None, :]
+        C = fold['corr'][k][rows, cols]
+        n = fold['counts'][k]
+
+        if m == 1:
+            # Con una sola característica sklearn no aplica shrinkage
+            shrunk = C
+        else:
+            M = fold['fourth'][k][rows, cols]
+            trace = np.trace(C, axis1=1, axis2=2)
+            mu = trace / m
+            delta_ = np.sum(C ** 2, axis=(1, 2))
+            beta_ = np.sum(M, axis=(1, 2))
+            beta = 1.0 / (m * n) * (beta_ / n - delta_)
+            delta = (delta_ - 2.0 * mu * trace + m * mu ** 2) / m
+            beta = np.minimum(beta, delta)
+            with np.errstate(divide='ignore', invalid='ignore'):
+                shrinkage = np.where(beta == 0, 0.0, beta / delta)
+
+            shrunk = (1.0 - shrinkage)[:, None, None] * C
+            diag = np.arange(m)
+            shrunk[:, diag, diag] += (shrinkage * mu)[:, None]
+
+        scale = fold['scales'][k][idx]
+        return scale[:, :, None] * shrunk * scale[:, None, :]
+
+    def _fold_accuracy(self, fold, idx):
+        """Accuracy de un fold para un grupo de subconjuntos del mismo tamaño."""
+        Sw = sum(prior * self._shrunk_class_cov(fold, k, idx)
+                 for k, prior in enumerate(fold['priors']))
+
+        means = fold['means'][:, idx].transpose(1, 0, 2)            # (g, C, m)
+        coef = np.linalg.solve(Sw, means.transpose(0, 2, 1))          # (g, m, C)
+        intercept = (-0.5 * np.einsum('gcm,gmc->gc', means, coef)
+                     + np.log(fold['priors']))                        # (g, C)
+
+        X_test = fold['X_test'][:, idx].transpose(1, 0, 2)            # (g, n_test, m)
+        scores = X_test @ coef + intercept[:, None, :]
+        y_pred = fold['classes'][np.argmax(scores, axis=2)]
+        return np.mean(y_pred == fold['y_test'], axis=1)
+
+    def _group_accuracy(self, idx, floor=None):
+        """Accuracy (%) y folds omitidos por la poda de cada subconjunto del grupo."""
+        if floor is None:
+            accuracy = np.mean([self._fold_accuracy(fold, idx) for fold in self.folds], axis=0)
+            return accuracy * 100, np.zeros(len(idx), dtype=int)
+
+        # Poda por fold: tras cada fold, la cota superior supone acierto total en
+        # los folds restantes; las filas cuya cota cae bajo floor no siguen
+        total = np.zeros(len(idx))
+        remaining = np.full(len(idx), self.k_folds)
+        active = np.arange(len(idx))
+        for fold in self.folds:
+            total[active] += self._fold_accuracy(fold, idx[active])
+            remaining[active] -= 1
+            bound = (total[active] + remaining[active]) / self.k_folds * 100
+            active = active[bound >= floor[active]]
+            if len(active) == 0:
+                break
+        return (total + remaining) / self.k_folds * 100, remaining
+
+    def cv_accuracy(self, masks, floor=None):
+        """
+        Accuracy de validación cruzada (%) para un lote de máscaras binarias.
+
+        Args:
+            masks: Array/lista (n_individuals, n_features) de 0/1
+            floor: Accuracy mínima (%) por individuo para seguir evaluando folds
+                   (None = todos los folds). Si la cota superior cae por debajo,
+                   se devuelve esa cota y los folds restantes se cuentan en
+                   folds_skipped; last_folds_skipped indica, por individuo de
+                   esta llamada, cuántos se omitieron (> 0 = cota, no exacto)
+
+        Returns:
+            array: Accuracy media de los folds (en %) por individuo; 0.0 si no
+                   hay características seleccionadas y NaN si el ajuste falla
+                   (LinAlgError o un fold con una sola clase en entrenamiento)
+        """
+        masks = np.asarray(masks, dtype=bool).reshape(-1, self.n_features)
+        accuracy = np.zeros(masks.shape[0])
+        skipped = np.zeros(masks.shape[0], dtype=int)
+        n_selected = masks.sum(axis=1)
+        if self.degenerate:
+            accuracy[n_selected > 0] = np.nan
+            self.last_folds_skipped = skipped
+            return accuracy
+        if floor is not None:
+            floor = np.broadcast_to(np.asarray(floor, dtype=np.float64), accuracy.shape)
+
+        # Agrupar por número de características para resolver en bloque
+        for m in np.unique(n_selected):
+            if m == 0:
+                continue
+            members = np.flatnonzero(n_selected == m)
+            idx = np.nonzero(masks[members])[1].reshape(len(members), m)
+            member_floor = None if floor is None else floor[members]
+            try:
+                accuracy[members], skipped[members] = self._group_accuracy(idx, member_floor)
+            except np.linalg.LinAlgError:
+                # Resolver uno a uno para aislar las matrices singulares
+                for i, (member, row) in enumerate(zip(members, idx)):
+                    try:
+                        row_accuracy, row_skipped = self._group_accuracy(
+                            row[None, :], None if floor is None else member_floor[i:i + 1])
+                        accuracy[member], skipped[member] = row_accuracy[0], row_skipped[0]
+                    except np.linalg.LinAlgError:
+                        accuracy[member] = np.nan
+        self.last_folds_skipped = skipped
+        self.folds_skipped += int(skipped.sum())
+        return accuracy
+
+    @timed('lda_engine.evaluate_population',
+           items=lambda self, individuals, *args, **kwargs: len(individuals))
+    def evaluate_population(self, individuals, total_features, lambda_penalty, threshold=None):
+        """
+        Fitness (accuracy - penalización) de una población en una sola llamada.
+
+        Equivalente a aplicar evaluate_features a cada individuo (o
+        evaluate_features_pruned si se indica threshold).
+
+        Args:
+            individuals: Lista de vectores binarios
+            total_features: Número total de características disponibles
+            lambda_penalty: Peso de la penalización por complejidad
+            threshold: Fitness a superar; los individuos cuya cota superior queda
+                       por debajo dejan de evaluarse y reciben la cota (None = sin poda)
+
+        Returns:
+            list: Tuplas (fitness_score,) en el mismo orden
+        """
+        if len(individuals) == 0:
+            return []
+        masks = np.asarray(individuals, dtype=bool)
+        n_selected = masks.sum(axis=1)
+        penalty = lambda_penalty * n_selected / total_features * 100
+        accuracy = self.cv_accuracy(masks, None if threshold is None else threshold + penalty)
+        # Sin características o con el ajuste fallido: (0.0,), como evaluate_features
+        return [(0.0,) if n == 0 or np.isnan(acc) else (float(acc - pen),)
+                for acc, pen, n in zip(accuracy, penalty, n_selected)]
@@ -0,0 +1,124 @@
+import numpy as np
+
+# ============================================================================
+# POBLACIÓN EMPAQUETADA EN BITS (BACKEND NUMPY DEL AG)
+# ============================================================================
+# Toda la población vive en un único array uint8 (pop_size, ceil(n_features/8))
+# creado con np.packbits, y el fitness en un array float64 (NaN = no evaluado).
+# Selección por torneo, cruce de dos puntos y mutación bit-flip se aplican a
+# toda la población con operaciones vectorizadas, con la misma semántica que
+# tools.selTournament, tools.cxTwoPoint y tools.mutFlipBit de DEAP.
+
+
+class PackedPopulation:
+    """
+    Población de cromosomas binarios empaquetados.
+
+    Args:
+        bits: Array uint8 (pop_size, n_bytes) con los cromosomas empaquetados
+        n_features: Longitud real de los cromosomas (en bits)
+        fitness: Array (pop_size,) de fitness; NaN = no evaluado (default: todos NaN)
+        bound: Array (pop_size,) bool; True = el fitness es una cota de la poda por
+               fold, no un valor exacto (default: todos False)
+    """
+
+    def __init__(self, bits, n_features, fitness=None, bound=None):
+        self.bits = np.ascontiguousarray(bits, dtype=np.uint8)
+        self.n_features = n_features
+        self.fitness = np.full(len(self.bits), np.nan) if fitness is None \
+            else np.asarray(fitness, dtype=np.float64)
+        self.bound = np.zeros(len(self.bits), dtype=bool) if bound is None \
+            else np.asarray(bound, dtype=bool)
+        # Máscaras de prefijo empaquetadas: _prefix[c] tiene a 1 los bits [0, c)
+        positions = np.arange(n_features)
+        self._prefix = np.packbits(positions[None, :] < np.arange(n_features + 1)[:, None],
+                                   axis=1)
+
+    @classmethod
+    def random(cls, pop_size, n_features, rng):
+        """Población inicial con bits uniformes (como attr_bool = randint(0, 1))."""
+        return cls(np.packbits(rng.integers(0, 2, (pop_size, n_features), dtype=np.uint8),
+                               axis=1), n_features)
+
+    def __len__(self):
+        return len(self.bits)
+
+    @property
+    def nbytes(self):
+        return self.bits.nbytes + self.fitness.nbytes
+
+    def unpack(self, rows=None):
+        """Cromosomas desempaquetados (uint8 0/1) de las filas indicadas (todas si None)."""
+        bits = self.bits if rows is None else self.bits[rows]
+        return np.unpackbits(bits, axis=1, count=self.n_features)
+
+    def invalid_rows(self):
+        return np.flatnonzero(np.isnan(self.fitness))
+
+    def n_selected(self):
+        """Número de bits a 1 de cada cromosoma."""
+        return np.unpackbits(self.bits, axis=1, count=self.n_features).sum(axis=1)
+
+    def select_tournament(self, rng, k=None, tournsize=3):
+        """
+        Selección por torneo (como tools.selTournament): devuelve una población nueva.
+
+        Entre los aspirantes gana el de mayor fitness (el primero en caso de empate).
+        """
+        k = len(self) if k is None else k
+        aspirants = rng.integers(0, len(self), (k, tournsize))
+        winners = aspirants[np.arange(k), np.argmax(self.fitness[aspirants], axis=1)]
+        return PackedPopulation(self.bits[winners], self.n_features, self.fitness[winners],
+                                self.bound[winners])
+
+    def crossover_two_point(self, rng, cxpb=0.7):
+        """
+        Cruce de dos puntos (como tools.cxTwoPoint) sobre las parejas (0,1), (2,3), ...
+
+        Cada pareja se cruza con probabilidad cxpb; los hijos cruzados quedan sin fitness.
+        """
+        n_pairs = len(self) // 2
+        pairs = np.flatnonzero(rng.random(n_pairs) < cxpb)
+        if len(pairs) == 0 or self.n_features < 2:
+            return
+
+        # Mismos puntos que cxTwoPoint: p1 en [1, size], p2 en [1, size-1]
+        size = self.n_features
+        point1 = rng.integers(1, size + 1, len(pairs))
+        point2 = rng.integers(1, size, len(pairs))
+        point2 = np.where(point2 >= point1, point2 + 1, point2)
+        low, high = np.minimum(point1, point2), np.maximum(point1, point2)
+        mask = self._prefix[high] & ~self._prefix[low]
+
+        first, second = 2 * pairs, 2 * pairs + 1
+        diff = (self.bits[first] ^ self.bits[second]) & mask
+        self.bits[first] ^= diff
+        self.bits[second] ^= diff
+        self.fitness[first] = np.nan
+        self.fitness[second] = np.nan
+
+    def mutate_flip_bit(self, rng, mutpb=0.3, indpb=0.05):
+        """
+        Mutación bit-flip (como tools.mutFlipBit): cada individuo muta con
+        probabilidad mutpb y cada uno de sus bits se invierte con probabilidad indpb.
+        """
+        mutants = np.flatnonzero(rng.random(len(self)) < mutpb)
+        if len(mutants) == 0:
+            return
+        flips = np.packbits(rng.random((len(mutants), self.n_features)) < indpb, axis=1)
+        self.bits[mutants] ^= flips
+        self.fitness[mutants] = np.nan
+
+    def vary(self, rng, cxpb=0.7, mutpb=0.3, indpb=0.05, tournsize=3):
+        """Una generación completa: torneo, cruce y mutación. Devuelve la nueva población."""
+        offspring = self.select_tournament(rng, tournsize=tournsize)
+        offspring.crossover_two_point(rng, cxpb)
+        offspring.mutate_flip_bit(rng, mutpb, indpb)
+        return offspring
+
+    def top_unique(self, k):
+        """Índices de los k cromosomas distintos con mayor fitness (candidatos al HOF)."""
+        valid = np.flatnonzero(~np.isnan(self.fitness))
+        order = valid[np.argsort(-self.fitness[valid], kind='stable')]
+        _, first = np.unique(self.bits[order], axis=0, return_index=True)
+        return order[np.sort(first)[:k]]
@@ -0,0 +1,106 @@
+import numpy as np
+
+# ============================================================================
+# MODELO SUSTITUTO DEL FITNESS (PRE-SELECCIÓN DE DESCENDENCIA)
+# ============================================================================
+# Aprende cromosoma -> fitness a partir de los individuos ya evaluados con LDA +
+# CV en la corrida. En cada generación predice el fitness de la descendencia y
+# sólo los mejores predichos (más una cuota de exploración al azar) pasan por la
+# evaluación real; el resto conserva la predicción y queda marcado para que no
+# entre en el Hall of Fame.
+#
+#   - 'linear': regresión ridge sobre los bits (solución cerrada, n_features²).
+#   - 'knn': media del fitness de los k vecinos más cercanos en distancia Hamming.
+
+SURROGATE_KINDS = ('linear', 'knn')
+
+
+class SurrogateModel:
+    """
+    Predictor barato de fitness sobre máscaras binarias.
+
+    Args:
+        kind: 'linear' (ridge sobre bits) o 'knn' (Hamming)
+        alpha: Regularización del modelo lineal
+        k: Vecinos del modelo kNN
+        max_samples: Muestras guardadas (se descartan las más antiguas)
+    """
+
+    def __init__(self, kind='linear', alpha=1.0, k=5, max_samples=5000):
+        if kind not in SURROGATE_KINDS:
+            raise ValueError(f"kind debe ser uno de {SURROGATE_KINDS}, no '{kind}'")
+        self.kind = kind
+        self.alpha = alpha
+        self.k = k
+        self.max_samples = max_samples
+        self._masks = None
+        self._fitness = None
+        self._weights = None
+        self._bias = 0.0
+
+    def __len__(self):
+        return 0 if self._fitness is None else len(self._fitness)
+
+    def add(self, masks, fitness):
+        """Agrega pares (máscara, fitness real) y reajusta el modelo."""
+        masks = np.asarray(masks, dtype=np.float64).reshape(len(fitness), -1)
+        fitness = np.asarray(fitness, dtype=np.float64)
+        if len(fitness) == 0:
+            return
+        if self._fitness is None:
+            self._masks, self._fitness = masks, fitness
+        else:
+            self._masks = np.vstack((self._masks, masks))[-self.max_samples:]
+            self._fitness = np.concatenate((self._fitness, fitness))[-self.max_samples:]
+        if self.kind == 'linear':
+            self._fit_linear()
+
+    def _fit_linear(self):
+        mean_x = self._masks.mean(axis=0)
+        self._bias = self._fitness.mean()
+        Xc = self._masks - mean_x
+        gram = Xc.T @ Xc
+        gram[np.diag_indices_from(gram)] += self.alpha
+        self._weights = np.linalg.solve(gram, Xc.T @ (self._fitness - self._bias))
+        self._bias -= mean_x @ self._weights
+
+    def predict(self, masks):
+        """Fitness predicho para un lote de máscaras (n_individuals, n_features)."""
+        masks = np.asarray(masks, dtype=np.float64).reshape(-1, self._masks.shape[1])
+        if self.kind == 'linear':
+            return masks @ self._weights + self._bias
+        # Hamming = bits a 1 en una sola de las dos máscaras
+        distance = masks @ (1 - self._masks).T + (1 - masks) @ self._masks.T
+        k = min(self.k, len(self))
+        nearest = np.argpartition(distance, k - 1, axis=1)[:, :k]
+        return self._fitness[nearest].mean(axis=1)
+
+
+def screen_offspring(predicted, n_evaluate, n_explore, rng):
+    """
+    Elige qué individuos pasan por la evaluación real.
+
+    Args:
+        predicted: Fitness predicho de cada candidato
+        n_evaluate: Cuántos de los mejores predichos se evalúan
+        n_explore: Cuántos más se eligen al azar entre el resto
+        rng: random.Random (o el módulo random) usado para la exploración
+
+    Returns:
+        list: Posiciones (en predicted) a evaluar con el fitness real
+    """
+    order = np.argsort(-np.asarray(predicted), kind='stable')
+    chosen = [int(i) for i in order[:n_evaluate]]
+    rest = [int(i) for i in order[n_evaluate:]]
+    return chosen + rng.sample(rest, min(n_explore, len(rest)))
+
+
+def rank_correlation(predicted, actual):
+    """Correlación de Spearman (sin corrección de empates); NaN con menos de 2 puntos."""
+    if len(actual) < 2:
+        return float('nan')
+    ranks_p = np.argsort(np.argsort(predicted))
+    ranks_a = np.argsort(np.argsort(actual))
+    if ranks_p.std() == 0 or ranks_a.std() == 0:
+        return float('nan')
+    return float(np.corrcoef(ranks_p, ranks_a)[0, 1])
@@ -0,0 +1,151 @@
+##################################################
+#  Minimal exported predictor (numpy only)
+#
+#  export_predictor stores, in a single .npz, the
+#  wavelet filters, the pruned packet tree that reaches
+#  the GA-selected nodes and the LDA weights. The loader
+#  only needs numpy: no pywt, sklearn or deap at runtime.
+##################################################
+import json
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+FORMAT_VERSION = 1
+
+
+def export_predictor(path, clf, selected_indices, n_channels, wavelet='coif3', level=3,
+                     normalize=False, log_transform=False):
+    """
+    Export the selected TWP features + trained LDA as a standalone predictor.
+    Args:
+        path (str): output .npz file
+        clf (object): linear classifier trained on X[:, selected_indices]
+                      (coef_, intercept_, classes_), e.g. LinearDiscriminantAnalysis
+        selected_indices (array): GA-selected feature indices (columns of get_twp_feature_vectors)
+        n_channels (int): number of EEG channels of the trials
+        wavelet, level, normalize, log_transform: same as get_twp_feature_vectors in training
+    Returns:
+        dict: summary of the exported tree (nodes computed vs full tree)
+    """
+    import pywt
+    from modules.feature_extraction.feature_extraction import (pruned_packet_tree,
+                                                               selected_node_paths)
+
+    selected_indices = np.asarray(selected_indices, dtype=np.int64)
+    coef = np.asarray(clf.coef_, dtype=np.float64)
+    if coef.shape[1] != len(selected_indices):
+        raise ValueError("clf must be trained on the selected features only")
+
+    channels, steps, feature_rows = pruned_packet_tree(selected_indices, n_channels,
+                                                       level, normalize)
+    filters = pywt.Wavelet(wavelet)
+    arrays = {
+        'dec_lo': np.asarray(filters.dec_lo, dtype=np.float64),
+        'dec_hi': np.asarray(filters.dec_hi, dtype=np.float64),
+        'channels': channels,
+        'feature_rows': feature_rows,
+        'selected_indices': selected_indices,
+        'coef': coef,
+        'intercept': np.asarray(clf.intercept_, dtype=np.float64),
+        'classes': np.asarray(clf.classes_),
+    }
+    for l, (parents, branches) in enumerate(steps, start=1):
+        arrays[f'parents_{l}'] = parents
+        arrays[f'branches_{l}'] = branches.astype(np.uint8)
+
+    meta = dict(format_version=FORMAT_VERSION, wavelet=wavelet, level=level,
+                n_channels=n_channels, normalize=bool(normalize),
+                log_transform=bool(log_transform),
+                nodes={str(c): paths for c, paths in
+                       selected_node_paths(selected_indices, level).items()})
+    np.savez(path, meta=np.array(json.dumps(meta)), **arrays)
+
+    computed = sum(len(parents) for parents, _ in steps)
+    full = n_channels * sum(2 ** l for l in range(1, level + 1))
+    return {'nodes_computed': computed, 'nodes_full_tree': full,
+            'channels_used': len(channels), 'n_features': len(selected_indices)}
+
+
+class TWPPredictor:
+    """
+    Classifier loaded by load_predictor: pruned TWP energies + linear decision function.
+    Trials use the create_mat_files layout: [Ns x Nc] or [Ns x Nc x Nt].
+    """
+
+    def __init__(self, arrays):
+        self.meta = json.loads(str(arrays['meta']))
+        if self.meta['format_version'] != FORMAT_VERSION:
+            raise ValueError(f"Unsupported predictor format {self.meta['format_version']}")
+        self.level = self.meta['level']
+        self.n_channels = self.meta['n_channels']
+        # reversed filters: the DWT becomes a dot product with each sliding window
+        self.filters = np.stack((arrays['dec_lo'][::-1], arrays['dec_hi'][::-1]))
+        self.channels = arrays['channels']
+        self.steps = [(arrays[f'parents_{l}'], arrays[f'branches_{l}'])
+                      for l in range(1, self.level + 1)]
+        self.feature_rows = arrays['feature_rows']
+        self.selected_indices = arrays['selected_indices']
+        self.coef = arrays['coef']
+        self.intercept = arrays['intercept']
+        self.classes = arrays['classes']
+
+    def _dwt_rows(self, coeffs, branches):
+        """One DWT step ('symmetric' mode, as pywt) of each row with its own filter."""
+        n_taps = self.filters.shape[1]
+        n_out = (coeffs.shape[-1] + n_taps - 1) // 2
+        pad = [(0, 0)] * (coeffs.ndim - 1) + [(n_taps - 1, n_taps - 1)]
+        extended = np.pad(coeffs, pad, mode='symmetric')
+        windows = sliding_window_view(extended, n_taps, axis=-1)[..., 1:1 + 2 * n_out:2, :]
+        return np.einsum('rtof,rf->rto', windows, self.filters[branches])
+
+    def features(self, trials):
+        """
+        Selected TWP features of a batch of trials.
+        Args:
+            trials (array): [Ns x Nc] or [Ns x Nc x Nt]
+        Returns:
+            array: (n_trials, n_selected), same as get_twp_feature_vectors(...)[:, selected_indices]
+        """
+        trials = np.asarray(trials, dtype=np.float64)
+        if trials.ndim == 2:
+            trials = trials[:, :, np.newaxis]
+        if trials.shape[1] != self.n_channels:
+            raise ValueError(f"Expected {self.n_channels} channels, got {trials.shape[1]}")
+
+        # (rows, n_trials, n_samples): one row per (channel, node) still needed
+        coeffs = np.transpose(trials, (1, 2, 0))[self.channels]
+        for parents, branches in self.steps:
+            coeffs = self._dwt_rows(coeffs[parents], branches)
+        energies = np.sum(np.square(coeffs), axis=-1)
+
+        if self.meta['normalize']:
+            # every node of the used channels is computed, grouped by channel
+            per_channel = energies.reshape(-1, 2 ** self.level, energies.shape[1])
+            energies = (per_channel / (per_channel.sum(axis=1, keepdims=True) + 1e-10)
+                        ).reshape(energies.shape)
+        if self.meta['log_transform']:
+            energies = np.log1p(energies)
+        return energies[self.feature_rows].T
+
+    def decision_function(self, trials):
+        scores = self.features(trials) @ self.coef.T + self.intercept
+        return scores[:, 0] if scores.shape[1] == 1 else scores
+
+    def predict(self, trials):
+        scores = self.decision_function(trials)
+        if scores.ndim == 1:
+            return self.classes[(scores > 0).astype(int)]
+        return self.classes[np.argmax(scores, axis=1)]
+
+
+def load_predictor(path):
+    """
+    Load a predictor written by export_predictor (numpy only).
+    Args:
+        path (str): .npz file
+    Returns:
+        TWPPredictor
+    """
+    with np.load(path, allow_pickle=False) as arrays:
+        return TWPPredictor({key: arrays[key] for key in arrays.files})
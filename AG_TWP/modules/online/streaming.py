@@ -0,0 +1,217 @@
+##################################################
+#  Online (streaming) inference for IM-tention therapy
+#
+#  Incoming EEG chunks are filtered with a stateful
+#  SOS cascade, kept in a ring buffer and, every `step`
+#  samples, the last window is turned into the selected TWP energies
+#  and classified with the trained LDA on the GA-selected
+#  features.
+##################################################
+import time
+
+import numpy as np
+from scipy import signal
+
+from modules.preprocessing.filtering import get_filter_bank
+from modules.feature_extraction.feature_extraction import get_twp_selected_feature_vectors
+
+
+class StreamingFilter:
+    """
+    Causal notch + bandpass filter that keeps its state (zi) between chunks.
+    Filtering a recording chunk by chunk gives the same output as
+    preprocess_signal_im_tention(recording, fs, filtfilt=False) on the whole recording.
+    Args:
+        fs (float): sampling rate in Hz
+        n_channels (int): number of channels
+        band (list): bandpass cut-off frequencies in Hz
+    """
+
+    def __init__(self, fs, n_channels, band=[1, 40]):
+        self.sos = get_filter_bank(fs, band, order=4, kind='im_tention').sos
+        self.n_channels = n_channels
+        self.reset()
+
+    def reset(self):
+        # zero initial conditions, as lfilter/sosfilt on a complete recording
+        self.zi = np.zeros((self.sos.shape[0], self.n_channels, 2))
+
+    def process(self, chunk):
+        """
+        Args:
+            chunk (array): new samples [Nc x n]
+        Returns:
+            array: filtered samples [Nc x n]
+        """
+        filtered, self.zi = signal.sosfilt(self.sos, np.asarray(chunk, dtype=np.float64),
+                                           axis=-1, zi=self.zi)
+        return filtered
+
+
+class RingBuffer:
+    """
+    Fixed-size multichannel buffer with the last `capacity` samples.
+    Every sample is written twice (slots i and i + capacity), so the window
+    returned by latest() is always a contiguous view without copies.
+    Args:
+        n_channels (int): number of channels
+        capacity (int): number of samples kept
+    """
+
+    def __init__(self, n_channels, capacity):
+        self.capacity = capacity
+        self._data = np.zeros((n_channels, 2 * capacity))
+        self._pos = 0
+        self.n_written = 0
+
+    def write(self, chunk):
+        chunk = np.asarray(chunk)[:, -self.capacity:]
+        slots = (self._pos + np.arange(chunk.shape[1])) % self.capacity
+        self._data[:, slots] = chunk
+        self._data[:, slots + self.capacity] = chunk
+        self._pos = (self._pos + chunk.shape[1]) % self.capacity
+        self.n_written += chunk.shape[1]
+
+    def latest(self):
+        """Last `capacity` samples [Nc x capacity], oldest first (read-only view)."""
+        window = self._data[:, self._pos:self._pos + self.capacity]
+        window.flags.writeable = False
+        return window
+
+
+class OnlinePipeline:
+    """
+    Streaming filter -> sliding windows -> TWP energies -> LDA on the selected features.
+    Args:
+        clf (object): linear classifier trained on X[:, selected_indices]
+                      (e.g. the LDA returned by train_clf_and_get_metrics)
+        selected_indices (array): GA-selected feature indices
+        fs (float): sampling rate in Hz
+        n_channels (int): number of channels
+        window_s (float): window length in seconds (the epoch length used in training)
+        step_s (float): seconds between consecutive windows
+        wavelet, level, normalize, log_transform: same as get_twp_feature_vectors in training
+        band (list): bandpass cut-off frequencies in Hz
+        filter (bool): if the incoming samples are filtered (False for already filtered streams)
+    """
+
+    def __init__(self, clf, selected_indices, fs, n_channels, window_s=2.0, step_s=0.25,
+                 wavelet='coif3', level=3, normalize=False, log_transform=False,
+                 band=[1, 40], filter=True):
+        self.fs = fs
+        self.window = int(window_s * fs)
+        self.step = max(1, int(step_s * fs))
+        self.twp = dict(wavelet=wavelet, level=level, normalize=normalize,
+                        log_transform=log_transform)
+        self.selected_indices = np.asarray(selected_indices, dtype=np.intp)
+        n_features = n_channels * 2 ** level
+        if self.selected_indices.size and self.selected_indices.max() >= n_features:
+            raise ValueError(f"selected_indices out of range for {n_features} features")
+
+        # linear decision function of the trained classifier (no sklearn call per window)
+        self.coef = np.asarray(clf.coef_, dtype=np.float64)
+        self.intercept = np.asarray(clf.intercept_, dtype=np.float64)
+        self.classes = np.asarray(clf.classes_)
+        if self.coef.shape[1] != len(self.selected_indices):
+            raise ValueError("clf must be trained on the selected features only")
+
+        self.filter = StreamingFilter(fs, n_channels, band) if filter else None
+        self.buffer = RingBuffer(n_channels, self.window)
+        self.latencies = []
+        self.chunk_sizes = []
+        self._next_end = self.window
+
+    def reset(self):
+        """Forget the stream (filter state, buffer and latency records)."""
+        if self.filter is not None:
+            self.filter.reset()
+        self.buffer = RingBuffer(self.buffer._data.shape[0], self.window)
+        self.latencies = []
+        self.chunk_sizes = []
+        self._next_end = self.window
+
+    def _classify(self, features):
+        scores = features @ self.coef.T + self.intercept
+        if scores.shape[1] == 1:
+            scores = scores[:, 0]
+            return self.classes[(scores > 0).astype(int)], scores
+        return self.classes[np.argmax(scores, axis=1)], scores
+
+    def push(self, chunk):
+        """
+        Process a new chunk of samples.
+        Args:
+            chunk (array): raw samples [Nc x n]
+        Returns:
+            list: (end_sample, label, score) for every window completed by this chunk,
+                  end_sample being the (exclusive) index of the window's last sample
+        """
+        start = time.perf_counter()
+        chunk = np.asarray(chunk, dtype=np.float64)
+        if self.filter is not None:
+            chunk = self.filter.process(chunk)
+
+        # split the chunk at window boundaries so the buffer only needs one window
+        windows, ends = [], []
+        offset = 0
+        while offset < chunk.shape[1]:
+            take = min(chunk.shape[1] - offset, self._next_end - self.buffer.n_written)
+            self.buffer.write(chunk[:, offset:offset + take])
+            offset += take
+            if self.buffer.n_written == self._next_end:
+                # copy: the buffer is overwritten by the rest of the chunk
+                windows.append(self.buffer.latest().T.copy())
+                ends.append(self._next_end)
+                self._next_end += self.step
+
+        results = []
+        if windows:
+            # all windows of the chunk in one TWP call: [Ns x Nc x Nw], only the
+            # tree branches that lead to the selected features are decomposed
+            features = get_twp_selected_feature_vectors(np.stack(windows, axis=-1),
+                                                        indices=self.selected_indices,
+                                                        **self.twp)
+            labels, scores = self._classify(features)
+            results = list(zip(ends, labels, scores))
+
+        self.latencies.append(time.perf_counter() - start)
+        self.chunk_sizes.append(chunk.shape[1])
+        return results
+
+    def latency_report(self):
+        """
+        Per-chunk processing time compared with the chunk period (real-time budget).
+        Returns:
+            dict: n_chunks, mean/p50/p99/max latency and chunk period in ms,
+                  and realtime (p99 below the chunk period)
+        """
+        if not self.latencies:
+            return {'n_chunks': 0}
+        latencies = np.array(self.latencies) * 1e3
+        period = np.median(self.chunk_sizes) / self.fs * 1e3
+        p99 = float(np.percentile(latencies, 99))
+        return {
+            'n_chunks': len(latencies),
+            'mean_ms': float(latencies.mean()),
+            'p50_ms': float(np.percentile(latencies, 50)),
+            'p99_ms': p99,
+            'max_ms': float(latencies.max()),
+            'chunk_period_ms': float(period),
+            'realtime': bool(p99 < period),
+        }
+
+
+def simulate_stream(pipeline, recording, chunk_size):
+    """
+    Replay a continuous recording through an OnlinePipeline in fixed-size chunks.
+    Args:
+        pipeline (OnlinePipeline): pipeline to feed
+        recording (array): continuous raw signal [Nc x N] (e.g. calib_signals.T)
+        chunk_size (int): samples per chunk
+    Returns:
+        tuple: list of (end_sample, label, score) and the latency report
+    """
+    predictions = []
+    for start in range(0, recording.shape[1], chunk_size):
+        predictions.extend(pipeline.push(recording[:, start:start + chunk_size]))
+    return predictions, pipeline.latency_report()
@@ -0,0 +1,325 @@
+"""
+Pipeline por sujeto (TWP + AG + LDA + evaluación en terapia) para varios sujetos en paralelo.
+
+Uso (desde AG_TWP/):
+    python -m modules.pipeline.runner --wavelet db4 --level 3 --lambda 0.3 --n-jobs 4
+"""
+import argparse
+import csv
+import os
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+
+import numpy as np
+from sklearn.discriminant_analysis import LinearDiscriminantAnalysis
+
+from modules.preprocessing.file_creation import create_mat_files
+from modules.feature_extraction.feature_extraction import get_twp_feature_vectors
+from modules.genetic_algorithm.genetic_algorithm import run_genetic_algorithm, _limit_blas_threads
+from modules.training.training import train_clf_and_get_metrics
+from modules.evaluation.evaluation import evaluate_clf_and_get_metrics
+from modules.evaluation.loso import calibration_labels
+
+# ============================================================================
+# RUNNER MULTI-SUJETO
+# ============================================================================
+# Reemplaza el bucle `for i in range(1, 9)` del notebook (celda 5):
+#   - un sujeto por tarea, con a lo sumo n_jobs sujetos en vuelo (solo se
+#     envían a los procesos los datos de los sujetos en ejecución)
+#   - tiempos por etapa (TWP, AG, LDA, terapia)
+#   - un error en un sujeto queda registrado en su fila y no detiene al resto
+#   - cada sujeto terminado se agrega al CSV (y opcionalmente a un Parquet)
+
+RESULT_FIELDS = (
+    'sujeto', 'estado', 'n_features_totales', 'n_features_seleccionadas',
+    'porcentaje_seleccion', 'fitness_ag', 'acc_calibracion', 'tpr_calibracion',
+    'acc_terapia', 'tpr_terapia', 'selected_indices', 'seed',
+    't_twp_s', 't_ag_s', 't_lda_s', 't_terapia_s', 't_total_s', 'error'
+)
+RESULTS_FILE = 'resultados_ag_twp_lda'
+
+
+def run_subject_pipeline(subject, data_cal, data_ter, targets_ter, wavelet='db4', level=1,
+                         pop_size=100, num_generations=100, lambda_penalty=0.3,
+                         early_stopping_patience=15, seed=None, engine='sklearn'):
+    """
+    Pipeline completo de un sujeto (mismos pasos que el notebook).
+
+    Args:
+        subject: Identificador del sujeto (para la fila de resultados)
+        data_cal: Épocas de calibración 'mi_rest' (n_samples, n_channels, n_trials)
+        data_ter: Épocas de terapia 'mi' (n_samples, n_channels, n_trials)
+        targets_ter: Etiquetas de terapia
+        wavelet, level: Parámetros TWP
+        pop_size, num_generations, lambda_penalty, early_stopping_patience, seed, engine:
+            ver run_genetic_algorithm
+
+    Returns:
+        dict: Fila con las claves de RESULT_FIELDS
+    """
+    row = dict.fromkeys(RESULT_FIELDS, '')
+    row.update(sujeto=subject, seed='' if seed is None else seed)
+    start = time.perf_counter()
+
+    # 1. TWP CALIBRACIÓN
+    t = time.perf_counter()
+    X_cal_twp = get_twp_feature_vectors(np.asarray(data_cal), wavelet=wavelet, level=level)
+    targets_cal = calibration_labels(X_cal_twp.shape[0])
+    n_features_totales = X_cal_twp.shape[1]
+    row['t_twp_s'] = time.perf_counter() - t
+
+    # 2. ALGORITMO GENÉTICO
+    t = time.perf_counter()
+    best_individual, _ = run_genetic_algorithm(
+        X_cal_twp, targets_cal,
+        pop_size=pop_size,
+        num_generations=num_generations,
+        lambda_penalty=lambda_penalty,
+        early_stopping_patience=early_stopping_patience,
+        seed=seed, engine=engine, verbose=False
+    )
+    selected_indices = [idx for idx, bit in enumerate(best_individual) if bit == 1]
+    if not selected_indices:
+        # Fallback del notebook: primeras 5 características
+        selected_indices = list(range(min(5, n_features_totales)))
+    row['t_ag_s'] = time.perf_counter() - t
+
+    # 3. ENTRENAMIENTO
+    t = time.perf_counter()
+    clf = LinearDiscriminantAnalysis(shrinkage='auto', solver='eigen')
+    clf_final, metrics_cal = train_clf_and_get_metrics(X_cal_twp[:, selected_indices],
+                                                       targets_cal, clf)
+    row['t_lda_s'] = time.perf_counter() - t
+
+    # 4. EVALUACIÓN EN TERAPIA
+    t = time.perf_counter()
+    X_ter_twp = get_twp_feature_vectors(np.asarray(data_ter), wavelet=wavelet, level=level)
+    metrics_ter = evaluate_clf_and_get_metrics(X_ter_twp[:, selected_indices], clf_final,
+                                               np.asarray(targets_ter))
+    row['t_terapia_s'] = time.perf_counter() - t
+
+    row.update({
+        'estado': 'ok',
+        'n_features_totales': n_features_totales,
+        'n_features_seleccionadas': len(selected_indices),
+        'porcentaje_seleccion': len(selected_indices) / n_features_totales * 100,
+        'fitness_ag': float(best_individual.fitness.values[0]),
+        'acc_calibracion': float(metrics_cal.acc),
+        'tpr_calibracion': float(metrics_cal.tpr),
+        'acc_terapia': float(metrics_ter.acc),
+        'tpr_terapia': float(metrics_ter.tpr),
+        'selected_indices': ' '.join(map(str, selected_indices)),
+        't_total_s': time.perf_counter() - start,
+    })
+    return row
+
+
+def _error_row(subject, seed, error):
+    row = dict.fromkeys(RESULT_FIELDS, '')
+    row.update(sujeto=subject, estado='error', seed='' if seed is None else seed, error=error)
+    return row
+
+
+def _run_subject_safe(subject, *args, **kwargs):
+    """run_subject_pipeline que devuelve una fila de error en lugar de propagar la excepción."""
+    try:
+        return run_subject_pipeline(subject, *args, **kwargs)
+    except Exception as e:
+        traceback.print_exc()
+        return _error_row(subject, kwargs.get('seed'), f"{type(e).__name__}: {e}")
+
+
+class _ResultWriter:
+    """
+    Escribe las filas a medida que terminan: CSV incremental y, opcional, Parquet.
+
+    No pisa archivos de resultados existentes (p. ej. los ya versionados en
+    resultados_/) salvo con overwrite=True.
+    """
+
+    def __init__(self, output_dir, formats, overwrite=False):
+        self.paths = {}
+        self.rows = []
+        if output_dir is None:
+            return
+        unknown = set(formats) - {'csv', 'parquet'}
+        if unknown:
+            raise ValueError(f"Formatos de salida desconocidos: {sorted(unknown)}")
+        for fmt in formats:
+            self.paths[fmt] = os.path.join(output_dir, f"{RESULTS_FILE}.{fmt}")
+        existing = [path for path in self.paths.values() if os.path.exists(path)]
+        if existing and not overwrite:
+            raise FileExistsError(f"Ya existen resultados en {existing}; usar otra carpeta "
+                                  f"de salida u overwrite=True (--overwrite) para reemplazarlos")
+        os.makedirs(output_dir, exist_ok=True)
+        if 'csv' in self.paths:
+            with open(self.paths['csv'], 'w', newline='') as f:
+                csv.DictWriter(f, fieldnames=RESULT_FIELDS).writeheader()
+        if 'parquet' in self.paths:
+            import pandas  # noqa: F401 (falla antes de correr el pipeline si no está)
+
+    def add(self, row):
+        self.rows.append(row)
+        if 'csv' in self.paths:
+            with open(self.paths['csv'], 'a', newline='') as f:
+                csv.DictWriter(f, fieldnames=RESULT_FIELDS).writerow(row)
+        if 'parquet' in self.paths:
+            import pandas as pd
+            pd.DataFrame(self.rows, columns=RESULT_FIELDS).to_parquet(self.paths['parquet'],
+                                                                      index=False)
+
+
+def run_batch(dict_cal, dict_ter, subjects=None, wavelet='db4', level=1, pop_size=100,
+              num_generations=100, lambda_penalty=0.3, early_stopping_patience=15,
+              seed=None, engine='sklearn', n_jobs=None, output_dir=None, formats=('csv',),
+              overwrite=False):
+    """
+    Ejecuta run_subject_pipeline para varios sujetos, un sujeto por proceso.
+
+    Args:
+        dict_cal: Datos de calibración de create_mat_files (joined=True) o un TrialStore
+        dict_ter: Datos de terapia de create_mat_files (mi_only=True) o un TrialStore
+        subjects: Sujetos a procesar (default: todos los de dict_cal)
+        wavelet, level, pop_size, num_generations, lambda_penalty,
+        early_stopping_patience, engine: ver run_subject_pipeline
+        seed: Semilla base; el sujeto k (en el orden de subjects) usa seed + k
+        n_jobs: Máximo de sujetos en paralelo (None = todos los núcleos, 1 = en serie)
+        output_dir: Carpeta de resultados (None = solo en memoria)
+        formats: Formatos de salida, 'csv' y/o 'parquet' (requiere pandas + pyarrow)
+        overwrite: Reemplazar los archivos de resultados si ya existen en output_dir
+                   (si no, se lanza FileExistsError antes de procesar sujetos)
+
+    Returns:
+        list: Filas (RESULT_FIELDS) en el orden de subjects, incluidas las de error
+    """
+    subjects = list(dict_cal) if subjects is None else list(subjects)
+    params = dict(wavelet=wavelet, level=level, pop_size=pop_size,
+                  num_generations=num_generations, lambda_penalty=lambda_penalty,
+                  early_stopping_patience=early_stopping_patience, engine=engine)
+    seeds = {s: None if seed is None else seed + k for k, s in enumerate(subjects)}
+    writer = _ResultWriter(output_dir, formats, overwrite)
+    results = {}
+
+    def task(subject):
+        return (subject, np.asarray(dict_cal[subject]['mi_rest']),
+                np.asarray(dict_ter[subject]['mi']), np.asarray(dict_ter[subject]['target']))
+
+    def save(subject, row):
+        results[subject] = row
+        writer.add(row)
+        if row['estado'] == 'ok':
+            print(f"   ✅ {subject}: Acc terapia {row['acc_terapia']:.2f}% "
+                  f"({row['n_features_seleccionadas']}/{row['n_features_totales']} "
+                  f"características, {row['t_total_s']:.1f} s)")
+        else:
+            print(f"   ❌ {subject}: {row['error']}")
+
+    print(f"🚀 Pipeline: {len(subjects)} sujetos | TWP {wavelet} nivel {level} | "
+          f"AG pop={pop_size} gen={num_generations} λ={lambda_penalty}")
+
+    if n_jobs == 1 or len(subjects) <= 1:
+        for subject in subjects:
+            try:
+                args = task(subject)
+            except Exception as e:
+                save(subject, _error_row(subject, seeds[subject], f"{type(e).__name__}: {e}"))
+                continue
+            save(subject, _run_subject_safe(*args, seed=seeds[subject], **params))
+    else:
+        if n_jobs is None or n_jobs < 1:
+            n_jobs = os.cpu_count() or 1
+        n_jobs = min(n_jobs, len(subjects))
+        pending = iter(subjects)
+        in_flight = {}
+        # Un hilo BLAS por proceso: n_jobs procesos con BLAS de ancho completo
+        # sobresuscriben la CPU (~n_núcleos² hilos)
+        with ProcessPoolExecutor(max_workers=n_jobs, initializer=_limit_blas_threads,
+                                 initargs=(1,)) as pool:
+            while True:
+                # Concurrencia acotada: solo n_jobs sujetos enviados a la vez
+                for subject in pending:
+                    try:
+                        args = task(subject)
+                    except Exception as e:
+                        save(subject, _error_row(subject, seeds[subject],
+                                                 f"{type(e).__name__}: {e}"))
+                        continue
+                    in_flight[pool.submit(_run_subject_safe, *args, seed=seeds[subject],
+                                          **params)] = subject
+                    if len(in_flight) == n_jobs:
+                        break
+                if not in_flight:
+                    break
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    subject = in_flight.pop(future)
+                    try:
+                        row = future.result()
+                    except Exception as e:
+                        # p. ej. BrokenProcessPool si el proceso del sujeto murió
+                        row = _error_row(subject, seeds[subject], f"{type(e).__name__}: {e}")
+                    save(subject, row)
+
+    rows = [results[subject] for subject in subjects]
+    n_ok = sum(row['estado'] == 'ok' for row in rows)
+    print(f"✅ Sujetos procesados exitosamente: {n_ok}/{len(rows)}")
+    failed = [row['sujeto'] for row in rows if row['estado'] != 'ok']
+    if failed:
+        print(f"❌ Sujetos con error: {failed}")
+    return rows
+
+
+def default_output_dir(lambda_penalty, wavelet, level):
+    """
+    Carpeta con la convención de resultados_/ (ej: λ=0.3, db4, nivel 3 -> con_lmb03_db4_wp3;
+    λ=0 -> con_lmb0_..., λ=1 -> con_lmb1_...).
+    """
+    return os.path.join('resultados_', f"con_lmb{f'{lambda_penalty:g}'.replace('.', '')}"
+                                       f"_{wavelet}_wp{level}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--data-dir', default='./data/im_tention_signals')
+    parser.add_argument('--subjects', type=int, nargs='+',
+                        help='Números de sujeto (default: todos)')
+    parser.add_argument('--wavelet', default='db4')
+    parser.add_argument('--level', type=int, default=1)
+    parser.add_argument('--pop-size', type=int, default=100)
+    parser.add_argument('--generations', type=int, default=100)
+    parser.add_argument('--lambda', dest='lambda_penalty', type=float, default=0.3)
+    parser.add_argument('--early-stopping', type=int, default=15)
+    parser.add_argument('--engine', choices=['sklearn', 'numpy'], default='sklearn')
+    parser.add_argument('--ther-trials', type=int, default=60)
+    parser.add_argument('--no-filtfilt', action='store_true')
+    parser.add_argument('--seed', type=int)
+    parser.add_argument('--n-jobs', type=int, help='Sujetos en paralelo (default: todos los núcleos)')
+    parser.add_argument('--output-dir', help='Default: resultados_/con_lmb<λ>_<wavelet>_wp<nivel>')
+    parser.add_argument('--format', nargs='+', default=['csv'], choices=['csv', 'parquet'])
+    parser.add_argument('--overwrite', action='store_true',
+                        help='Reemplazar resultados existentes en la carpeta de salida')
+    args = parser.parse_args()
+
+    output_dir = args.output_dir or default_output_dir(args.lambda_penalty, args.wavelet,
+                                                       args.level)
+    # Comprobar la salida antes de cargar y filtrar todas las señales
+    if not args.overwrite:
+        existing = [fmt for fmt in args.format
+                    if os.path.exists(os.path.join(output_dir, f"{RESULTS_FILE}.{fmt}"))]
+        if existing:
+            parser.error(f"{output_dir} ya tiene {RESULTS_FILE} ({', '.join(existing)}); "
+                         f"usar --output-dir o --overwrite")
+
+    dict_cal = create_mat_files(args.data_dir, file_type='calibration',
+                                filtfilt=not args.no_filtfilt, n_jobs=args.n_jobs)
+    dict_ter = create_mat_files(args.data_dir, file_type='therapy',
+                                ther_number_of_trials=args.ther_trials,
+                                filtfilt=not args.no_filtfilt, n_jobs=args.n_jobs)
+    subjects = None if args.subjects is None else [f'subject_{i}' for i in args.subjects]
+    run_batch(dict_cal, dict_ter, subjects, wavelet=args.wavelet, level=args.level,
+              pop_size=args.pop_size, num_generations=args.generations,
+              lambda_penalty=args.lambda_penalty, early_stopping_patience=args.early_stopping,
+              seed=args.seed, engine=args.engine, n_jobs=args.n_jobs,
+              output_dir=output_dir, formats=args.format, overwrite=args.overwrite)
+    print(f"💾 Resultados en: {output_dir}")
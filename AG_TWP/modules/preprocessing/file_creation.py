@@ -7,7 +7,10 @@ import numpy as np
 from scipy import signal
 from scipy.io import loadmat, savemat
 from modules.preprocessing.filtering import preprocess_signal_im_tention
+from modules.profiling.profiling import timer, timed
 import glob
+import os
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
 
 def getSubjectFiles(folder, file_type='mat'):
     """get all the mat files names in a folder
@@ -22,9 +25,168 @@ def getSubjectFiles(folder, file_type='mat'):
         data_list.append(name)
     return data_list
 
+def _pad_trials(epochs, n_trials):
+    """Return epochs [Ns x Nc x Nt'] as float64 with n_trials trials (missing trials are zeros).
+    No copy is made when epochs is already float64 and complete.
+    """
+    epochs = np.asarray(epochs, dtype=np.float64)
+    if epochs.shape[2] < n_trials:
+        padded = np.zeros(epochs.shape[:2] + (n_trials,))
+        padded[:, :, :epochs.shape[2]] = epochs
+        epochs = padded
+    return epochs
+
+def _check_windows(starts, length, n_samples):
+    """Raise ValueError if a trial window [start, start + length) does not fit in the signal.
+    Negative starts would otherwise wrap around to the end of the signal and windows past
+    the end would come out shorter than the others.
+    Args:
+        starts (array): first sample of each trial window
+        length (int): window length in samples
+        n_samples (int): number of samples of the continuous signal
+    """
+    starts = np.asarray(starts)
+    if length <= 0:
+        raise ValueError(f"Invalid window length {length} samples (check skip_samples)")
+    invalid = np.nonzero((starts < 0) | (starts + length > n_samples))[0]
+    if len(invalid):
+        trial = invalid[0]
+        raise ValueError(f"Window [{starts[trial]}, {starts[trial] + length}) of trial {trial + 1} "
+                         f"is out of the signal range [0, {n_samples})")
+
+@timed('preprocessing.epoching', items=lambda data, starts, length, n_trials: n_trials)
+def _gather_epochs(data, starts, length, n_trials):
+    """Cut the windows [start, start + length) of every channel with a single gather.
+    Args:
+        data (array): continuous signal [Nc x N]
+        starts (array): first sample of each trial window
+        length (int): window length in samples
+        n_trials (int): number of trials of the output (missing trials are zeros)
+    Returns:
+        array: epochs [Ns x Nc x Nt]
+    Raises:
+        ValueError: if a trial window does not fit in the signal
+    """
+    starts = np.asarray(starts, dtype=np.intp)
+    _check_windows(starts, length, data.shape[-1])
+    windows = np.lib.stride_tricks.sliding_window_view(data, length, axis=-1)
+    #[Nc * Nt * Ns] -> [Ns * Nc * Nt]
+    return _pad_trials(windows[:, starts].transpose(2, 0, 1), n_trials)
+
+def _create_subject_entry(mat_contents, n, file_type, rehabilitation_limb, skip_samples, 
+                          mi_samples, rest_samples, calib_number_of_trials, 
+                          ther_number_of_trials, joined, scaled, mi_only, filter, filtfilt):
+    """Build the entry of one subject (see create_mat_files) from its loaded mat contents.
+    Args:
+        mat_contents (dict): IM-tention mat file loaded with loadmat(..., squeeze_me=True)
+        n (int): subject position (0-based), used in messages
+        remaining args: same as create_mat_files
+    Returns:
+        dict: {'mi_rest': ...} / {'rest': ..., 'mi': ...} / ... (+ 'target' for therapy)
+    """
+    mv_value = 22369.61866666667 
+    fs = mat_contents['sample_rate']
+    #rest trial interval samples
+    r_samples = int(rest_samples * fs)
+    #motor imagery samples
+    m_samples  = int(mi_samples * fs)
+    #samples to skip
+    s_samples = int(skip_samples * fs)
+
+    #load calibration signals and marks
+    calib_signal = mat_contents['calib_signals'].T
+    # print("calib_signal:", calib_signal.shape)
+    calib_marks = mat_contents['calib_task_marks']
+    # print("calib_marks:", len(calib_marks))
+    #the rehabilitated limb is marked with 1
+    calib_limbs = mat_contents['calib_task_limbs']
+
+    #load therapy signals and marks
+    therapy_signal = mat_contents['attempt_signals'].T
+    therapy_marks  = mat_contents['attempt_marks']
+    # print("therapy_marks:", len(therapy_marks))
+        
+    max_calib_trials = len(calib_marks)//2
+    max_ther_trials = len(therapy_marks)
+
+    if calib_number_of_trials is None:
+        calib_trials = max_calib_trials
+    else:
+        calib_trials = calib_number_of_trials  
+
+    if ther_number_of_trials is None:        
+        therapy_trials = max_ther_trials
+    else:
+        therapy_trials = ther_number_of_trials      
+        
+    # print("max_calib_trials:", max_calib_trials)
+    # print("calib_trials:", calib_trials)
+
+    if calib_trials > max_calib_trials:
+        raise ValueError(f"The number of trials to extract is greater than the number of trials in the subject {n+1}")
+    if therapy_trials > max_ther_trials:
+        raise ValueError(f"The number of trials to extract is greater than the number of trials in the subject {n+1}")
+
+    therapy_result = mat_contents['attempt_results'][:therapy_trials]
+    #mark is the same for all trials in therapy
+    mark = therapy_marks[0]
+
+    #only the requested stage is filtered
+    if filter and file_type == 'calibration':
+        calib_signal = preprocess_signal_im_tention(calib_signal, fs, filtfilt)
+    if filter and file_type == 'therapy':
+        therapy_signal = preprocess_signal_im_tention(therapy_signal, fs, filtfilt)
+
+    if file_type == 'calibration':    
+        print(f"Number of MI calibration trials for subject{n+1}: {calib_trials}")
+        if rehabilitation_limb == 1:
+            indexes = np.where(calib_limbs == 1)[0]
+        else:
+            indexes = np.where(calib_limbs == 0)[0]
+        midp = calib_marks[indexes[:calib_trials]]
+        #[Ns * Nc * Nt]
+        rest_matrix = _gather_epochs(calib_signal, midp - r_samples, r_samples - s_samples, calib_trials)
+        mi_matrix = _gather_epochs(calib_signal, midp + s_samples, m_samples - s_samples, calib_trials)
+
+    if file_type == 'therapy':  
+        print(f"Number of therapy trials for subject{n+1}: {therapy_trials}")              
+        #[Ns * Nc * Nt], the mark is the same for all trials so the windows are plain slices
+        with timer('preprocessing.epoching', items=therapy_trials):
+            intentions = therapy_signal[:therapy_trials]
+            _check_windows(np.full(len(intentions), mark - r_samples), r_samples - s_samples,
+                           intentions.shape[-1])
+            _check_windows(np.full(len(intentions), mark + s_samples), m_samples - s_samples,
+                           intentions.shape[-1])
+            rest_matrix = _pad_trials(intentions[:, :, mark-r_samples:mark-s_samples].T, therapy_trials)
+            mi_matrix = _pad_trials(intentions[:, :, mark+s_samples:mark+m_samples].T, therapy_trials)
+    if scaled:
+        rest_matrix = rest_matrix/mv_value
+        mi_matrix = mi_matrix/mv_value
+        
+    if not joined:
+        subject_entry = {'rest': rest_matrix, 'mi': mi_matrix}
+    else:
+        subject_entry = {'mi_rest': np.concatenate((mi_matrix, rest_matrix), axis=2)}
+       
+    if mi_only and file_type == 'therapy':
+        subject_entry = {'mi': mi_matrix}
+
+    if file_type == 'therapy':
+        subject_entry['target'] = therapy_result
+
+    return subject_entry
+
+def _load_subject_entry(task):
+    """Worker: load one subject's mat file and build its entry. task = (name, n, *options)"""
+    name, n = task[:2]
+    with timer('preprocessing.loadmat'):
+        mat_contents = loadmat(name, squeeze_me=True)
+    return _create_subject_entry(mat_contents, n, *task[2:])
+
 def create_mat_files(file_path, file_type='calibration', rehabilitation_limb=1, \
                     skip_samples=0.5, mi_samples=2.5, rest_samples=2.5, calib_number_of_trials=None,\
-                    ther_number_of_trials = None, joined=True, scaled=False, mi_only=True, filter=True, filtfilt=False):
+                    ther_number_of_trials = None, joined=True, scaled=False, mi_only=True, filter=True, filtfilt=False,\
+                    n_jobs=1, executor='thread'):
     """
     Function to create mat files from IM-tention's mat files of a group of subjects inside a folder
     Args:
@@ -43,6 +205,11 @@ def create_mat_files(file_path, file_type='calibration', rehabilitation_limb=1,
                        valid for calibration stage and therapy stage. See the possible structures below         
         scaled (bool): if the signals are scaled with IM-tention's factor (22369.61866666667)
         mi_only (bool): if only MI signals are extracted (valid only for therapy stage). See the possible structures below
+        filter (bool): if the requested stage is filtered (notch + bandpass) before epoching
+        filtfilt (bool): if zero-phase filtering (filtfilt) is used instead of lfilter
+        n_jobs (int): number of subject files processed concurrently (one file per worker).
+                      1 is serial, None or -1 uses all the cores. Subject order is always preserved
+        executor (str): 'thread' or 'process' pool used when n_jobs != 1
     Returns:
         subject_data: dict of dicts with the posible structures:
             For calibration stage:
@@ -53,114 +220,29 @@ def create_mat_files(file_path, file_type='calibration', rehabilitation_limb=1,
             {'subject_1': {'mi': mi_matrix, 'target': target_matrix}} ---> file_type='therapy', mi_only = True
             {'subject_1': {'mi_rest': matrix, 'target': target_matrix}} ---> file_type='therapy', joined = True, mi_only = False
     """
-    mv_value = 22369.61866666667 
     name_lists = getSubjectFiles(file_path)
     print(f"Number of subjects found: {len(name_lists)}")
     subject_data = {}
-    
-    calib_trials = 0
-    max_calib_trials = 0
-    max_ther_trials = 0
-    therapy_trials = 0
-
-    for n, name in enumerate(name_lists):
-        mat_contents = loadmat(name, squeeze_me=True)
-        fs = mat_contents['sample_rate']
-        #rest trial interval samples
-        r_samples = int(rest_samples * fs)
-        #motor imagery samples
-        m_samples  = int(mi_samples * fs)
-        #samples to skip
-        s_samples = int(skip_samples * fs)
-
-        #load calibration signals and marks
-        calib_signal = mat_contents['calib_signals'].T
-        # print("calib_signal:", calib_signal.shape)
-        calib_marks = mat_contents['calib_task_marks']
-        # print("calib_marks:", len(calib_marks))
-        #the rehabilitated limb is marked with 1
-        calib_limbs = mat_contents['calib_task_limbs']
-
-        #load therapy signals and marks
-        therapy_signal = mat_contents['attempt_signals'].T
-        therapy_marks  = mat_contents['attempt_marks']
-        # print("therapy_marks:", len(therapy_marks))
-        
-        max_calib_trials = len(calib_marks)//2
-        max_ther_trials = len(therapy_marks)
-
-        if calib_number_of_trials is None:
-            calib_trials = max_calib_trials
-        else:
-            calib_trials = calib_number_of_trials  
-
-        if ther_number_of_trials is None:        
-            therapy_trials = max_ther_trials
-        else:
-            therapy_trials = ther_number_of_trials      
-        
-        # print("max_calib_trials:", max_calib_trials)
-        # print("calib_trials:", calib_trials)
-
-        if calib_trials > max_calib_trials:
-            raise ValueError(f"The number of trials to extract is greater than the number of trials in the subject {n+1}")
-        if therapy_trials > max_ther_trials:
-            raise ValueError(f"The number of trials to extract is greater than the number of trials in the subject {n+1}")
-
-        therapy_result = mat_contents['attempt_results'][:therapy_trials]
-        #mark is the same for all trials in therapy
-        mark = therapy_marks[0]
-
-        if filter:
-            calib_signal = preprocess_signal_im_tention(calib_signal, fs, filtfilt)
-            therapy_signal = preprocess_signal_im_tention(therapy_signal, fs, filtfilt)
-
-        if file_type == 'calibration':    
-            print(f"Number of MI calibration trials for subject{n+1}: {calib_trials}")
-            #[Ns * Nc * Nt]
-            rest_matrix = np.zeros((r_samples-s_samples, calib_signal.shape[0], calib_trials))
-            mi_matrix = np.zeros((m_samples-s_samples, calib_signal.shape[0], calib_trials))  
-
-            if rehabilitation_limb == 1:
-                indexes = np.where(calib_limbs == 1)[0]
-            else:
-                indexes = np.where(calib_limbs == 0)[0]
-            for i, indx in enumerate(indexes):
-                if i == calib_trials:
-                    break
-                for j,channel in enumerate(calib_signal):
-                    midp = calib_marks[indx]
-                    rest_matrix[:,j,i] = channel[midp-r_samples:midp-s_samples]
-                    mi_matrix[:,j,i] = channel[midp+s_samples:midp+m_samples]
-
-        if file_type == 'therapy':  
-            print(f"Number of therapy trials for subject{n+1}: {therapy_trials}")              
-            #[Ns * Nc * Nt]
-            rest_matrix = np.zeros((r_samples-s_samples, therapy_signal.shape[1], therapy_trials))
-            mi_matrix = np.zeros((m_samples-s_samples, therapy_signal.shape[1], therapy_trials))  
-
-            for i, intention in enumerate(therapy_signal):
-                # print(intention.shape)
-                if i == therapy_trials:
-                    break
-                for j,channel in enumerate(intention):        
-                    rest_matrix[:,j,i] = channel[mark-r_samples:mark-s_samples]
-                    mi_matrix[:,j,i] = channel[mark+s_samples:mark+m_samples]  
-        if scaled:
-            rest_matrix = rest_matrix/mv_value
-            mi_matrix = mi_matrix/mv_value
-        
-        if not joined:
-            subject_data['subject_' + str(n+1)] = {'rest': rest_matrix, 'mi': mi_matrix}
-        else:
-            subject_data['subject_' + str(n+1)] = {'mi_rest': np.concatenate((mi_matrix, rest_matrix), axis=2)}
-       
-        if mi_only and file_type == 'therapy':
-            subject_data['subject_' + str(n+1)] = {'mi': mi_matrix}
-
-        if file_type == 'therapy':
-            subject_data['subject_' + str(n+1)]['target'] = therapy_result
 
+    options = (file_type, rehabilitation_limb, skip_samples, mi_samples, rest_samples,
+               calib_number_of_trials, ther_number_of_trials, joined, scaled, mi_only,
+               filter, filtfilt)
+    tasks = [(name, n) + options for n, name in enumerate(name_lists)]
+
+    if n_jobs == 1 or len(tasks) <= 1:
+        entries = map(_load_subject_entry, tasks)
+        for n, entry in enumerate(entries):
+            subject_data['subject_' + str(n+1)] = entry
+    else:
+        if executor not in ('thread', 'process'):
+            raise ValueError("executor must be 'thread' or 'process'")
+        if n_jobs is None or n_jobs < 1:
+            n_jobs = os.cpu_count() or 1
+        pool_class = ThreadPoolExecutor if executor == 'thread' else ProcessPoolExecutor
+        with pool_class(max_workers=min(n_jobs, len(tasks))) as pool:
+            #map keeps the subject order of getSubjectFiles
+            for n, entry in enumerate(pool.map(_load_subject_entry, tasks)):
+                subject_data['subject_' + str(n+1)] = entry
 
     return subject_data    
         
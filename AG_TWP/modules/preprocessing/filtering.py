@@ -1,12 +1,14 @@
 import numpy as np
+from functools import lru_cache
 from scipy import signal
+from modules.profiling.profiling import timed
 
-def get_notch_filter_coef(fs):
+def get_notch_filter_coef(fs, output='ba'):
     # Notch filter at 50 Hz
     w0 = [49.0/(fs/2), 51.0/(fs/2)]
-    return signal.butter(2, w0, btype='bandstop') # orden 8 -> N=4
+    return signal.butter(2, w0, btype='bandstop', output=output) # orden 8 -> N=4
 
-def get_bandpass_filter_coef(fs):
+def get_bandpass_filter_coef(fs, output='ba'):
     from math import pi
     Fpa = 1     # High pass cut-off frequency in Hz
     Fpb = 40    # Low pass cut-off frequency in Hz
@@ -16,34 +18,76 @@ def get_bandpass_filter_coef(fs):
     R2 = 1 / (2 * pi * C2 * Fpb)
     a = [1, (1 / (C1*R2)) + (1 / (C1*R1)) + (1 / (C2*R2)), (1 / (C1*C2*R1*R2))] # Denominator H(s)
     b = [1 / (C2*R2), 0] # Numerator H(s)
-    return signal.bilinear(b, a, fs)
+    b, a = signal.bilinear(b, a, fs)
+    if output == 'sos':
+        return signal.tf2sos(b, a)
+    return b, a
 
-def get_bandpass_coef(N, low, high, fs):
-    return signal.butter(N, [low, high], btype='band', fs=fs)
+def get_bandpass_coef(N, low, high, fs, output='ba'):
+    return signal.butter(N, [low, high], btype='band', fs=fs, output=output)
+
+class FilterBank:
+    """
+    Notch (50 Hz) + bandpass cascade designed once as second-order sections.
+    Use get_filter_bank to reuse the design across calls and subjects.
+    Args:
+        fs (float): sampling rate in Hz
+        band (tuple): bandpass cut-off frequencies (low, high) in Hz
+        order (int): Butterworth bandpass order (ignored by the IM-tention analog bandpass)
+        kind (str): 'im_tention' -> analog RC bandpass of the device when band == (1, 40),
+                                    Butterworth otherwise
+                    'butter'     -> Butterworth bandpass
+    """
+
+    def __init__(self, fs, band=(1, 40), order=4, kind='im_tention'):
+        if kind not in ('im_tention', 'butter'):
+            raise ValueError("kind must be 'im_tention' or 'butter'")
+        self.fs = fs
+        self.band = band
+        self.order = order
+        self.kind = kind
+        if kind == 'im_tention' and band == (1, 40):
+            bandpass = get_bandpass_filter_coef(fs, output='sos')
+        else:
+            bandpass = get_bandpass_coef(N=order, low=band[0], high=band[1], fs=fs, output='sos')
+        notch = get_notch_filter_coef(fs, output='sos')
+        self.sos = np.vstack((notch, bandpass))
+        # zero-phase filtering keeps one pass per filter with filtfilt's padding
+        # (3 * filter length), so edges match the (b, a) implementation
+        self.stages = [(sos, 3 * (2 * len(sos) + 1)) for sos in (notch, bandpass)]
+
+    @timed('preprocessing.filter', items=lambda self, senial, *args, **kwargs: np.size(senial))
+    def apply(self, senial, filtfilt=False, axis=-1):
+        """
+        Filter all the channels/trials of senial along axis in one call.
+        Args:
+            senial (array): signal with the samples along axis
+            filtfilt (bool): zero-phase filtering (sosfiltfilt) instead of sosfilt
+            axis (int): samples axis. default is the last one, as lfilter/filtfilt
+        Returns:
+            array: filtered signal (float64)
+        """
+        senial = np.asarray(senial, dtype=np.float64)
+        if filtfilt:
+            for sos, padlen in self.stages:
+                senial = signal.sosfiltfilt(sos, senial, axis=axis, padlen=padlen)
+            return senial
+        return signal.sosfilt(self.sos, senial, axis=axis)
+
+@lru_cache(maxsize=32)
+def _cached_filter_bank(fs, band, order, kind):
+    return FilterBank(fs, band, order, kind)
+
+def get_filter_bank(fs, band=(1, 40), order=4, kind='im_tention'):
+    """Cached FilterBank keyed by (fs, band, order, kind)."""
+    return _cached_filter_bank(float(fs), tuple(float(f) for f in band), int(order), kind)
 
 def preprocess_signal(senial, fs, filtfilt=False, band=[1, 40]):   
-    b_notch, a_notch = get_notch_filter_coef(fs)
-    b_bandpass, a_bandpass = get_bandpass_coef(N=1, low=band[0], high=band[1], fs=250)
-    if filtfilt:
-        senial = signal.filtfilt(b_notch, a_notch, senial)
-        senial = signal.filtfilt(b_bandpass, a_bandpass, senial)
-    else:
-        senial = signal.lfilter(b_notch, a_notch, senial) # 50 hz
-        senial = signal.lfilter(b_bandpass, a_bandpass, senial) # bandpass
-    return senial
+    # notch 50 hz + 1st order butterworth bandpass, designed with the signal's fs
+    bank = get_filter_bank(fs, band, order=1, kind='butter')
+    return bank.apply(senial, filtfilt)
 
 def preprocess_signal_im_tention(senial, fs, filtfilt=False, band=[1, 40]):   
     # IM-tention needs a Notch filter at 50 Hz
-    b_notch, a_notch = get_notch_filter_coef(fs)
-    
-    if band != [1, 40]:
-        b_bandpass, a_bandpass = get_bandpass_coef(N=4, low=band[0], high=band[1], fs=fs)
-    else:
-        b_bandpass, a_bandpass = get_bandpass_filter_coef(fs)
-    if filtfilt:
-        senial = signal.filtfilt(b_notch, a_notch, senial)
-        senial = signal.filtfilt(b_bandpass, a_bandpass, senial)
-    else:
-        senial = signal.lfilter(b_notch, a_notch, senial) # 50 hz
-        senial = signal.lfilter(b_bandpass, a_bandpass, senial) # bandpass
-    return senial
\ No newline at end of file
+    bank = get_filter_bank(fs, band, order=4, kind='im_tention')
+    return bank.apply(senial, filtfilt)
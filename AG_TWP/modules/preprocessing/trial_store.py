@@ -0,0 +1,144 @@
+##################################################
+#  Memory-mapped trial store for IM-tention subjects
+#
+#  Epoched, filtered trials are written once to disk
+#  (one .npy per subject/stage/matrix + a JSON index)
+#  and loaded back as lazy, read-only memory maps.
+##################################################
+import json
+import os
+from collections.abc import Mapping
+
+import numpy as np
+from scipy.io import loadmat
+
+from modules.preprocessing.file_creation import getSubjectFiles, _create_subject_entry
+from modules.preprocessing.filtering import preprocess_signal_im_tention
+
+STAGES = ('calibration', 'therapy')
+INDEX_FILE = 'index.json'
+
+
+def write_trial_store(file_path, store_dir, rehabilitation_limb=1, skip_samples=0.5,
+                      mi_samples=2.5, rest_samples=2.5, calib_number_of_trials=None,
+                      ther_number_of_trials=None, joined=True, scaled=False, mi_only=True,
+                      filter=True, filtfilt=False):
+    """
+    Convert every subject's IM-tention mat file into an on-disk trial store.
+    Each subject is loaded and filtered once, both stages are epoched and written,
+    and the subject is released before the next one is read, so peak memory does
+    not grow with the number of subjects.
+    Args:
+        file_path (str): path to the folder where the mat files are located
+        store_dir (str): output folder for the store
+        remaining args: same as create_mat_files (applied to both stages)
+    Returns:
+        dict: the store index (also written to store_dir/index.json)
+    """
+    options = dict(rehabilitation_limb=rehabilitation_limb, skip_samples=skip_samples,
+                   mi_samples=mi_samples, rest_samples=rest_samples,
+                   calib_number_of_trials=calib_number_of_trials,
+                   ther_number_of_trials=ther_number_of_trials, joined=joined,
+                   scaled=scaled, mi_only=mi_only, filter=filter, filtfilt=filtfilt)
+    name_lists = getSubjectFiles(file_path)
+    print(f"Number of subjects found: {len(name_lists)}")
+    os.makedirs(store_dir, exist_ok=True)
+    index = {'options': options, 'subjects': {}}
+
+    for n, name in enumerate(name_lists):
+        subject = 'subject_' + str(n+1)
+        mat_contents = loadmat(name, squeeze_me=True)
+        if filter:
+            # filter each continuous recording once, for both stages
+            fs = mat_contents['sample_rate']
+            mat_contents['calib_signals'] = preprocess_signal_im_tention(
+                mat_contents['calib_signals'].T, fs, filtfilt).T
+            mat_contents['attempt_signals'] = preprocess_signal_im_tention(
+                mat_contents['attempt_signals'].T, fs, filtfilt).T
+
+        index['subjects'][subject] = {'source': os.path.abspath(name)}
+        for stage in STAGES:
+            entry = _create_subject_entry(mat_contents, n, stage, rehabilitation_limb,
+                                          skip_samples, mi_samples, rest_samples,
+                                          calib_number_of_trials, ther_number_of_trials,
+                                          joined, scaled, mi_only, False, filtfilt)
+            stage_dir = os.path.join(store_dir, subject, stage)
+            os.makedirs(stage_dir, exist_ok=True)
+            stage_index = {}
+            for key, matrix in entry.items():
+                file_name = os.path.join(subject, stage, key + '.npy')
+                np.save(os.path.join(store_dir, file_name), matrix)
+                stage_index[key] = {'file': file_name, 'shape': list(np.shape(matrix)),
+                                    'dtype': str(np.asarray(matrix).dtype)}
+            index['subjects'][subject][stage] = stage_index
+        del mat_contents, entry
+
+    with open(os.path.join(store_dir, INDEX_FILE), 'w') as f:
+        json.dump(index, f, indent=2)
+    return index
+
+
+class SubjectView(Mapping):
+    """Lazy, read-only view of one subject/stage: matrices are memory-mapped on access."""
+
+    def __init__(self, store_dir, stage_index):
+        self._store_dir = store_dir
+        self._index = stage_index
+        self._arrays = {}
+
+    def __getitem__(self, key):
+        if key not in self._arrays:
+            path = os.path.join(self._store_dir, self._index[key]['file'])
+            self._arrays[key] = np.load(path, mmap_mode='r')
+        return self._arrays[key]
+
+    def __iter__(self):
+        return iter(self._index)
+
+    def __len__(self):
+        return len(self._index)
+
+    def shape(self, key):
+        """Shape of a matrix without touching its data."""
+        return tuple(self._index[key]['shape'])
+
+
+class TrialStore(Mapping):
+    """
+    Lazy replacement for the dict returned by create_mat_files.
+    store['subject_1']['mi_rest'] has the same layout ([Ns x Nc x Nt]) and keys as
+    create_mat_files(..., file_type=stage) but is only paged in when it is read.
+    """
+
+    def __init__(self, store_dir, file_type='calibration'):
+        if file_type not in STAGES:
+            raise ValueError(f"file_type must be one of {STAGES}")
+        self.store_dir = store_dir
+        self.file_type = file_type
+        with open(os.path.join(store_dir, INDEX_FILE)) as f:
+            self.index = json.load(f)
+
+    def __getitem__(self, subject):
+        return SubjectView(self.store_dir, self.index['subjects'][subject][self.file_type])
+
+    def __iter__(self):
+        return iter(self.index['subjects'])
+
+    def __len__(self):
+        return len(self.index['subjects'])
+
+    def source_file(self, subject):
+        """Original mat file of a subject (useful as a feature-cache key)."""
+        return self.index['subjects'][subject]['source']
+
+
+def load_trial_store(store_dir, file_type='calibration'):
+    """
+    Open a store written by write_trial_store.
+    Args:
+        store_dir (str): folder of the store
+        file_type (str): 'calibration' or 'therapy'
+    Returns:
+        TrialStore: mapping subject -> lazy {matrix name: memory-mapped array}
+    """
+    return TrialStore(store_dir, file_type)
@@ -0,0 +1,215 @@
+import os
+import json
+import time
+import threading
+import functools
+
+# ============================================================================
+# INSTRUMENTACIÓN: TIMERS Y CONTADORES
+# ============================================================================
+# Desactivada por defecto. Con la instrumentación desactivada, timer() devuelve
+# un context manager vacío compartido, @timed llama directamente a la función y
+# count() solo consulta una variable global, así que el costo es casi nulo.
+#
+# Uso:
+#     from modules.profiling import profiling
+#     with profiling.profile('perfil.json', trace_path='perfil.trace.json'):
+#         run_genetic_algorithm(X, Y)
+#     print(profiling.summary())
+#
+# Los eventos se registran en el proceso que los produce: lo que corre dentro de
+# un ProcessPoolExecutor no aparece en el perfil del proceso principal.
+
+_enabled = False
+_lock = threading.Lock()
+_events = []     # (nombre, inicio_s, duración_s, hilo, items, args)
+_counters = {}
+_counter_events = []   # (nombre, instante_s, valor acumulado)
+_origin = time.perf_counter()
+
+
+def enable():
+    """Activa la instrumentación (los datos previos se conservan)."""
+    global _enabled
+    _enabled = True
+
+
+def disable():
+    global _enabled
+    _enabled = False
+
+
+def is_enabled():
+    return _enabled
+
+
+def reset():
+    """Descarta todos los eventos y contadores registrados."""
+    with _lock:
+        _events.clear()
+        _counters.clear()
+        _counter_events.clear()
+
+
+class _NullTimer:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_TIMER = _NullTimer()
+
+
+class _Timer:
+    __slots__ = ('name', 'items', 'args', 'start')
+
+    def __init__(self, name, items, args):
+        self.name = name
+        self.items = items
+        self.args = args
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        duration = time.perf_counter() - self.start
+        with _lock:
+            _events.append((self.name, self.start - _origin, duration,
+                            threading.get_ident(), self.items, self.args))
+        return False
+
+
+def timer(name, items=None, **args):
+    """
+    Context manager que mide un bloque.
+
+    Args:
+        name: Nombre del evento (ej: 'ga.evaluate')
+        items: Elementos procesados en el bloque (trials, individuos...) para
+               calcular el throughput en summary()
+        **args: Datos extra que se guardan en la traza (ej: gen=3)
+    """
+    if not _enabled:
+        return _NULL_TIMER
+    return _Timer(name, items, args)
+
+
+def timed(name=None, items=None):
+    """
+    Decorador equivalente a envolver la función en timer().
+
+    Args:
+        name: Nombre del evento (default: módulo.función)
+        items: Función (*args, **kwargs) -> elementos procesados por la llamada
+    """
+    def decorator(func):
+        label = name or f"{func.__module__}.{func.__qualname__}"
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return func(*args, **kwargs)
+            n_items = items(*args, **kwargs) if items is not None else None
+            with _Timer(label, n_items, {}):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def count(name, n=1):
+    """Suma n al contador name (ej: evaluaciones de fitness, hits de caché)."""
+    if not _enabled:
+        return
+    with _lock:
+        _counters[name] = _counters.get(name, 0) + n
+        _counter_events.append((name, time.perf_counter() - _origin, _counters[name]))
+
+
+def summary():
+    """
+    Resumen por nombre de evento y contadores.
+
+    Returns:
+        dict: {'timers': {nombre: {calls, total_s, mean_s, max_s[, items, items_per_s]}},
+               'counters': {nombre: valor}}
+    """
+    with _lock:
+        events = list(_events)
+        counters = dict(_counters)
+    timers = {}
+    for name, _, duration, _, n_items, _ in events:
+        stats = timers.setdefault(name, {'calls': 0, 'total_s': 0.0, 'max_s': 0.0})
+        stats['calls'] += 1
+        stats['total_s'] += duration
+        stats['max_s'] = max(stats['max_s'], duration)
+        if n_items is not None:
+            stats['items'] = stats.get('items', 0) + n_items
+    for stats in timers.values():
+        stats['mean_s'] = stats['total_s'] / stats['calls']
+        if 'items' in stats and stats['total_s'] > 0:
+            stats['items_per_s'] = stats['items'] / stats['total_s']
+    return {'timers': timers, 'counters': counters}
+
+
+def export_json(path):
+    """Guarda summary() (más pid y fecha) en un archivo JSON para comparar corridas."""
+    report = summary()
+    report['pid'] = os.getpid()
+    report['created'] = time.strftime('%Y-%m-%dT%H:%M:%S')
+    with open(path, 'w') as f:
+        json.dump(report, f, indent=2)
+    return report
+
+
+def export_chrome_trace(path):
+    """Guarda los eventos en formato Chrome trace (chrome://tracing o Perfetto)."""
+    pid = os.getpid()
+    with _lock:
+        events = list(_events)
+        counter_events = list(_counter_events)
+    trace = []
+    for name, start, duration, tid, n_items, args in events:
+        event_args = dict(args)
+        if n_items is not None:
+            event_args['items'] = n_items
+        trace.append({'name': name, 'cat': name.split('.')[0], 'ph': 'X',
+                      'ts': start * 1e6, 'dur': duration * 1e6,
+                      'pid': pid, 'tid': tid, 'args': event_args})
+    for name, instant, value in counter_events:
+        trace.append({'name': name, 'ph': 'C', 'ts': instant * 1e6, 'pid': pid,
+                      'args': {name: value}})
+    with open(path, 'w') as f:
+        json.dump({'traceEvents': trace, 'displayTimeUnit': 'ms'}, f)
+
+
+class profile:
+    """
+    Context manager: activa la instrumentación desde cero y, al salir, la
+    desactiva y exporta el resumen/traza si se indicaron rutas.
+
+    Args:
+        json_path: Archivo para export_json (None = no guardar)
+        trace_path: Archivo para export_chrome_trace (None = no guardar)
+    """
+
+    def __init__(self, json_path=None, trace_path=None):
+        self.json_path = json_path
+        self.trace_path = trace_path
+
+    def __enter__(self):
+        reset()
+        enable()
+        return self
+
+    def __exit__(self, *exc):
+        disable()
+        if self.json_path is not None:
+            export_json(self.json_path)
+        if self.trace_path is not None:
+            export_chrome_trace(self.trace_path)
+        return False
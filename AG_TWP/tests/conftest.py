@@ -0,0 +1,34 @@
+"""
+Datos comunes de los tests (desde AG_TWP/: python -m pytest tests).
+"""
+import os
+import sys
+
+import numpy as np
+import pytest
+
+# Mismo esquema de imports que el resto del repo: modules.x.y desde AG_TWP/
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.synthetic import make_synthetic_epochs
+from modules.feature_extraction.feature_extraction import get_twp_feature_vectors
+
+
+@pytest.fixture(scope='session')
+def epochs():
+    """Épocas sintéticas (n_samples, n_channels, n_trials) con la forma de create_mat_files."""
+    return make_synthetic_epochs(n_samples=256, n_channels=3, n_trials=12, seed=0)
+
+
+@pytest.fixture(scope='session')
+def twp_dataset():
+    """
+    Características TWP (db4, nivel 3) de 40 trials de ruido y etiquetas MI/reposo.
+
+    Sin señal que separe las clases: el AG no llega al 100% en pocas
+    generaciones y las comparaciones entre corridas no son triviales.
+    """
+    data = make_synthetic_epochs(n_samples=256, n_channels=4, n_trials=40, seed=1)
+    X = get_twp_feature_vectors(data, wavelet='db4', level=3)
+    Y = np.hstack((np.ones(20, dtype=np.int8), np.zeros(20, dtype=np.int8)))
+    return X, Y
@@ -0,0 +1,111 @@
+"""
+Rutas de evaluate_features: plan de folds compartido, folds degenerados y poda por fold.
+"""
+import warnings
+
+import numpy as np
+import pytest
+
+from modules.genetic_algorithm.genetic_algorithm import (
+    evaluate_features,
+    evaluate_features_pruned,
+    run_genetic_algorithm,
+    FitnessCache,
+    K_FOLDS
+)
+from modules.genetic_algorithm.fold_plan import FoldPlan, get_fold_plan
+from modules.genetic_algorithm.lda_engine import BatchedLDAEvaluator
+
+
+@pytest.fixture(autouse=True)
+def _ignore_sklearn_warnings():
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        yield
+
+
+def test_fold_plan_equals_cross_val_score(twp_dataset):
+    X, Y = twp_dataset
+    plan = get_fold_plan(X, Y, K_FOLDS)
+    rng = np.random.RandomState(0)
+    for density in rng.rand(30):
+        ind = list((rng.rand(X.shape[1]) < density).astype(int))
+        assert evaluate_features(ind, X, Y, X.shape[1], 0.5, K_FOLDS, plan) == \
+            pytest.approx(evaluate_features(ind, X, Y, X.shape[1], 0.5, K_FOLDS), abs=1e-9)
+
+
+def test_fold_plan_is_shared(twp_dataset):
+    X, Y = twp_dataset
+    assert get_fold_plan(X, Y, K_FOLDS) is get_fold_plan(X.copy(), Y.copy(), K_FOLDS)
+
+
+def test_single_class_fold_scores_zero_on_every_path():
+    # Una clase con un solo trial: algún fold entrena con una sola clase
+    X = np.random.RandomState(0).rand(12, 6)
+    Y = np.r_[np.ones(11), np.zeros(1)]
+    ind = [1, 1, 0, 0, 1, 0]
+    assert evaluate_features(ind, X, Y, 6, 0.5, K_FOLDS) == (0.0,)
+    assert evaluate_features(ind, X, Y, 6, 0.5, K_FOLDS, FoldPlan(X, Y, K_FOLDS)) == (0.0,)
+    assert evaluate_features_pruned(ind, X, Y, 6, 0.5, K_FOLDS, -np.inf) == ((0.0,), 0)
+    assert BatchedLDAEvaluator(X, Y, K_FOLDS).evaluate_population([ind], 6, 0.5) == [(0.0,)]
+
+
+def _population_and_threshold(X, Y, pop_size=40):
+    """Individuos al azar y un umbral (la mediana de su fitness) que poda a la mitad."""
+    rng = np.random.RandomState(0)
+    population = (rng.rand(pop_size, X.shape[1]) < rng.rand(pop_size, 1)).astype(int)
+    exact = np.array([evaluate_features(list(ind), X, Y, X.shape[1], 0.5, K_FOLDS)[0]
+                      for ind in population])
+    return population, exact, float(np.median(exact))
+
+
+def test_pruned_without_threshold_is_exact(twp_dataset):
+    X, Y = twp_dataset
+    population, exact, _ = _population_and_threshold(X, Y)
+    for ind, fitness in zip(population, exact):
+        result, skipped = evaluate_features_pruned(list(ind), X, Y, X.shape[1], 0.5, K_FOLDS,
+                                                   -np.inf)
+        assert skipped == 0
+        assert result[0] == pytest.approx(fitness, abs=1e-9)
+
+
+def test_pruned_returns_upper_bound_below_threshold(twp_dataset):
+    X, Y = twp_dataset
+    population, exact, threshold = _population_and_threshold(X, Y)
+    engine = BatchedLDAEvaluator(X, Y, K_FOLDS)
+    batched = engine.evaluate_population(population, X.shape[1], 0.5, threshold=threshold)
+    n_skipped = 0
+    for ind, fitness, batched_fit, batched_skipped in zip(population, exact, batched,
+                                                          engine.last_folds_skipped):
+        (bound,), skipped = evaluate_features_pruned(list(ind), X, Y, X.shape[1], 0.5,
+                                                     K_FOLDS, threshold)
+        if skipped:
+            assert fitness - 1e-9 <= bound < threshold
+        else:
+            assert bound == pytest.approx(fitness, abs=1e-9)
+        # El motor vectorizado poda en el mismo fold y devuelve la misma cota
+        assert batched_skipped == skipped
+        assert batched_fit[0] == pytest.approx(bound, abs=1e-9)
+        n_skipped += skipped
+    assert n_skipped > 0
+
+
+@pytest.mark.parametrize('engine', ['sklearn', 'numpy'])
+@pytest.mark.parametrize('backend', ['deap', 'packed'])
+def test_ga_with_pruning_keeps_best_exact(twp_dataset, engine, backend):
+    X, Y = twp_dataset
+    cache = FitnessCache(100000)
+    best, log = run_genetic_algorithm(X, Y, pop_size=20, num_generations=6, seed=3,
+                                      engine=engine, backend=backend, verbose=False,
+                                      fold_pruning=True, cache=cache)
+    assert log[0]['folds_skipped'] > 0
+    assert best.fitness.values[0] == pytest.approx(
+        evaluate_features(list(best), X, Y, X.shape[1], 0.5, K_FOLDS)[0], abs=1e-9)
+    # Las cotas no se memorizan: la caché compartida sólo tiene fitness exactos
+    # (el motor vectorizado sin umbral es exacto, ver test_lda_engine)
+    keys = list(cache._entries)
+    population = [np.unpackbits(np.frombuffer(key[0], dtype=np.uint8), count=key[1])
+                  for key in keys]
+    exact = BatchedLDAEvaluator(X, Y, K_FOLDS).evaluate_population(population, X.shape[1], 0.5)
+    np.testing.assert_allclose([cache._entries[key][0] for key in keys],
+                               [fit[0] for fit in exact], rtol=0, atol=1e-9)
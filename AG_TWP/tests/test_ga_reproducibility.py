@@ -0,0 +1,73 @@
+"""
+Reproducibilidad del AG: misma semilla, mismo resultado con y sin caché de fitness
+con evaluación en serie o en un pool de procesos y al reanudar desde un checkpoint.
+"""
+import warnings
+
+import pytest
+
+from modules.genetic_algorithm.genetic_algorithm import (
+    run_genetic_algorithm,
+    create_evaluation_pool,
+    FitnessCache
+)
+
+GA_PARAMS = dict(pop_size=20, num_generations=8, early_stopping_patience=100, seed=7,
+                 verbose=False)
+
+
+@pytest.fixture(autouse=True)
+def _ignore_sklearn_warnings():
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        yield
+
+
+def summary(result):
+    """Mejor individuo, su fitness, generaciones y máximo final de una corrida."""
+    best, log = result
+    return list(best), best.fitness.values[0], log[0]['gen'], log[0]['max']
+
+
+@pytest.mark.parametrize('engine', ['sklearn', 'numpy'])
+def test_cache_does_not_change_result(twp_dataset, engine):
+    X, Y = twp_dataset
+    without_cache = run_genetic_algorithm(X, Y, cache_size=0, engine=engine, **GA_PARAMS)
+    with_cache = run_genetic_algorithm(X, Y, engine=engine, **GA_PARAMS)
+    assert with_cache[1][0]['cache_hits'] > 0
+    assert summary(with_cache) == summary(without_cache)
+
+
+def test_shared_cache_reused_across_runs(twp_dataset):
+    X, Y = twp_dataset
+    cache = FitnessCache()
+    first = run_genetic_algorithm(X, Y, cache=cache, engine='numpy', **GA_PARAMS)
+    second = run_genetic_algorithm(X, Y, cache=cache, engine='numpy', **GA_PARAMS)
+    assert second[1][0]['cache_misses'] == 0
+    assert summary(second) == summary(first)
+
+
+def test_process_pool_does_not_change_result(twp_dataset):
+    X, Y = twp_dataset
+    serial = run_genetic_algorithm(X, Y, n_jobs=1, **GA_PARAMS)
+    assert summary(run_genetic_algorithm(X, Y, n_jobs=2, **GA_PARAMS)) == summary(serial)
+    # Un pool externo reutilizado en dos corridas
+    with create_evaluation_pool(X, Y, n_jobs=2) as executor:
+        for _ in range(2):
+            result = run_genetic_algorithm(X, Y, executor=executor, **GA_PARAMS)
+            assert summary(result) == summary(serial)
+
+
+@pytest.mark.parametrize('fold_pruning', [False, True])
+def test_resume_equals_uninterrupted_run(twp_dataset, tmp_path, fold_pruning):
+    X, Y = twp_dataset
+    params = dict(GA_PARAMS, engine='numpy', fold_pruning=fold_pruning)
+    uninterrupted = run_genetic_algorithm(X, Y, **params)
+    
+    checkpoint = str(tmp_path / 'ga.npz')
+    run_genetic_algorithm(X, Y, **dict(params, num_generations=4), 
+                          checkpoint_path=checkpoint, checkpoint_every=2)
+    resumed = run_genetic_algorithm(X, Y, **params, resume_from=checkpoint)
+    assert summary(resumed) == summary(uninterrupted)
+    assert resumed[1][0]['folds_skipped'] == uninterrupted[1][0]['folds_skipped']
+    assert (uninterrupted[1][0]['folds_skipped'] > 0) == fold_pruning
@@ -0,0 +1,49 @@
+"""
+Motor LDA vectorizado (BatchedLDAEvaluator): mismo fitness que evaluate_features.
+"""
+import warnings
+
+import numpy as np
+import pytest
+
+from modules.genetic_algorithm.genetic_algorithm import evaluate_features, K_FOLDS
+from modules.genetic_algorithm.lda_engine import BatchedLDAEvaluator
+
+
+def random_population(n_features, pop_size=60, seed=0):
+    """Individuos 0/1 de densidad variada, más los casos borde: vacío, 1 característica y todas."""
+    rng = np.random.RandomState(seed)
+    population = (rng.rand(pop_size, n_features) < rng.rand(pop_size, 1)).astype(int)
+    population[0] = 0
+    population[1] = 0
+    population[1, 5] = 1
+    population[2] = 1
+    return population
+
+
+def sklearn_fitness(population, X, Y, lambda_penalty):
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        return np.array([evaluate_features(list(ind), X, Y, X.shape[1], lambda_penalty, 
+                                           K_FOLDS)[0] for ind in population])
+
+
+@pytest.mark.parametrize('lambda_penalty', [0.0, 0.5])
+def test_engine_equals_sklearn(twp_dataset, lambda_penalty):
+    X, Y = twp_dataset
+    population = random_population(X.shape[1])
+    engine = BatchedLDAEvaluator(X, Y, k_folds=K_FOLDS)
+    result = [fit[0] for fit in engine.evaluate_population(population, X.shape[1], 
+                                                           lambda_penalty)]
+    np.testing.assert_allclose(result, sklearn_fitness(population, X, Y, lambda_penalty),
+                               rtol=0, atol=1e-9)
+
+
+def test_engine_order_and_batches(twp_dataset):
+    X, Y = twp_dataset
+    population = random_population(X.shape[1])
+    engine = BatchedLDAEvaluator(X, Y, k_folds=K_FOLDS)
+    whole = engine.evaluate_population(population, X.shape[1], 0.5)
+    one_by_one = [engine.evaluate_population(ind[None, :], X.shape[1], 0.5)[0] 
+                  for ind in population]
+    assert whole == one_by_one
@@ -0,0 +1,99 @@
+"""
+Epoching of IM-tention recordings: vectorized windows vs plain per-trial slices.
+"""
+import numpy as np
+import pytest
+from scipy.io import savemat
+
+from modules.preprocessing.file_creation import create_mat_files, _gather_epochs
+from modules.preprocessing.trial_store import write_trial_store, load_trial_store
+
+FS = 250
+N_TRIALS = 6
+
+
+def write_im_tention_file(folder, name='subject.mat', seed=0, n_channels=3):
+    """Synthetic IM-tention mat file: 6 calibration trials per limb and 6 therapy trials."""
+    rng = np.random.RandomState(seed)
+    calib_marks = 1000 + 1500 * np.arange(2 * N_TRIALS)
+    contents = {
+        'sample_rate': FS,
+        'calib_signals': rng.randn(calib_marks[-1] + 1000, n_channels),
+        'calib_task_marks': calib_marks,
+        'calib_task_limbs': np.tile([1, 0], N_TRIALS),
+        'attempt_signals': rng.randn(1500, n_channels, N_TRIALS),
+        'attempt_marks': np.full(N_TRIALS, 700),
+        'attempt_results': rng.randint(0, 2, N_TRIALS),
+    }
+    savemat(str(folder / name), contents)
+    return contents
+
+
+def slice_epochs(signal, starts, length):
+    """Reference: one slice per trial, [Ns x Nc x Nt]."""
+    return np.stack([signal[:, start:start + length].T for start in starts], axis=-1)
+
+
+@pytest.fixture(scope='module')
+def im_tention_folder(tmp_path_factory):
+    folder = tmp_path_factory.mktemp('im_tention')
+    return folder, write_im_tention_file(folder)
+
+
+def test_calibration_epochs_equal_slices(im_tention_folder):
+    folder, contents = im_tention_folder
+    data = create_mat_files(str(folder), 'calibration', joined=False, filter=False)
+    signal = contents['calib_signals'].T
+    marks = contents['calib_task_marks'][contents['calib_task_limbs'] == 1]
+    skip, window = int(0.5 * FS), int(2.5 * FS)
+    np.testing.assert_array_equal(data['subject_1']['rest'],
+                                  slice_epochs(signal, marks - window, window - skip))
+    np.testing.assert_array_equal(data['subject_1']['mi'],
+                                  slice_epochs(signal, marks + skip, window - skip))
+
+
+def test_therapy_epochs_equal_slices(im_tention_folder):
+    folder, contents = im_tention_folder
+    data = create_mat_files(str(folder), 'therapy', mi_only=False, joined=False, filter=False)
+    trials = contents['attempt_signals'].T
+    mark, skip, window = 700, int(0.5 * FS), int(2.5 * FS)
+    expected_mi = np.stack([trial[:, mark + skip:mark + window].T for trial in trials], axis=-1)
+    np.testing.assert_array_equal(data['subject_1']['mi'], expected_mi)
+    np.testing.assert_array_equal(data['subject_1']['target'], contents['attempt_results'])
+
+
+def test_gather_epochs_pads_missing_trials():
+    signal = np.arange(40.0).reshape(2, 20)
+    epochs = _gather_epochs(signal, [0, 5], 4, 3)
+    assert epochs.shape == (4, 2, 3)
+    np.testing.assert_array_equal(epochs[:, :, :2], slice_epochs(signal, [0, 5], 4))
+    assert not epochs[:, :, 2].any()
+
+
+@pytest.mark.parametrize('starts', [[-1, 4], [4, 17]])
+def test_gather_epochs_rejects_windows_outside_the_signal(starts):
+    with pytest.raises(ValueError, match='trial'):
+        _gather_epochs(np.zeros((2, 20)), starts, 4, 2)
+
+
+def test_therapy_rejects_windows_outside_the_signal(tmp_path):
+    write_im_tention_file(tmp_path)
+    # the MI window after the therapy mark (700 + 2.5 s) is longer than the recording
+    with pytest.raises(ValueError, match='trial'):
+        create_mat_files(str(tmp_path), 'therapy', mi_samples=4.0, filter=False)
+
+
+@pytest.mark.parametrize('stage', ['calibration', 'therapy'])
+def test_trial_store_matches_create_mat_files(tmp_path, stage):
+    folder = tmp_path / 'mat'
+    folder.mkdir()
+    write_im_tention_file(folder, 'subject_a.mat', seed=1)
+    write_im_tention_file(folder, 'subject_b.mat', seed=2)
+    write_trial_store(str(folder), str(tmp_path / 'store'))
+    store = load_trial_store(str(tmp_path / 'store'), stage)
+    expected = create_mat_files(str(folder), stage)
+    assert list(store) == list(expected)
+    for subject, entry in expected.items():
+        assert sorted(store[subject]) == sorted(entry)
+        for key, matrix in entry.items():
+            np.testing.assert_array_equal(store[subject][key], matrix)
@@ -0,0 +1,55 @@
+"""
+Instrumentación: medir no cambia el resultado del AG y los eventos se registran y exportan.
+"""
+import json
+import warnings
+
+from modules.profiling import profiling
+from modules.genetic_algorithm.genetic_algorithm import run_genetic_algorithm
+from modules.feature_extraction.feature_extraction import get_twp_feature_vectors
+
+GA_PARAMS = dict(pop_size=20, num_generations=5, early_stopping_patience=100, seed=3,
+                 verbose=False)
+
+
+def test_disabled_profiling_records_nothing(epochs):
+    profiling.reset()
+    get_twp_feature_vectors(epochs, wavelet='db4', level=3)
+    assert not profiling.is_enabled()
+    assert profiling.summary() == {'timers': {}, 'counters': {}}
+
+
+def test_profile_records_and_exports(epochs, tmp_path):
+    json_path, trace_path = tmp_path / 'perfil.json', tmp_path / 'perfil.trace.json'
+    with profiling.profile(str(json_path), trace_path=str(trace_path)):
+        get_twp_feature_vectors(epochs, wavelet='db4', level=3)
+        with profiling.timer('test.bloque', items=4, paso=1):
+            profiling.count('test.contador', 2)
+    assert not profiling.is_enabled()
+
+    report = json.loads(json_path.read_text())
+    assert report['timers']['twp.extract']['items'] == epochs.shape[2]
+    assert report['timers']['test.bloque']['calls'] == 1
+    assert report['counters'] == {'test.contador': 2}
+
+    trace = json.loads(trace_path.read_text())['traceEvents']
+    names = {event['name'] for event in trace}
+    assert {'twp.extract', 'test.bloque', 'test.contador'} <= names
+    bloque = next(event for event in trace if event['name'] == 'test.bloque')
+    assert bloque['args'] == {'paso': 1, 'items': 4}
+
+
+def test_profiling_does_not_change_ga_result(twp_dataset):
+    X, Y = twp_dataset
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        best, log = run_genetic_algorithm(X, Y, **GA_PARAMS)
+        with profiling.profile():
+            profiled_best, profiled_log = run_genetic_algorithm(X, Y, **GA_PARAMS)
+    assert list(profiled_best) == list(best)
+    assert profiled_best.fitness.values == best.fitness.values
+    assert [entry['max'] for entry in profiled_log] == [entry['max'] for entry in log]
+
+    counters = profiling.summary()['counters']
+    assert counters['ga.fitness_evaluations'] > 0
+    assert profiling.summary()['timers']['ga.evaluate']['calls'] > 0
@@ -0,0 +1,65 @@
+"""
+Extracción TWP vectorizada: mismo resultado que el cálculo por trial y canal.
+"""
+import numpy as np
+import pytest
+
+from modules.feature_extraction.feature_extraction import (
+    get_twp_feature_vectors,
+    get_twp_multilevel_feature_vectors,
+    get_twp_selected_feature_vectors,
+    _get_twp_feature_vectors_loop
+)
+
+
+@pytest.mark.parametrize('wavelet', ['db4', 'coif3', 'sym4', 'bior3.3'])
+@pytest.mark.parametrize('level', [1, 3])
+def test_vectorized_equals_loop(epochs, wavelet, level):
+    expected = _get_twp_feature_vectors_loop(epochs, wavelet=wavelet, level=level)
+    result = get_twp_feature_vectors(epochs, wavelet=wavelet, level=level)
+    assert result.shape == (epochs.shape[2], epochs.shape[1] * 2 ** level)
+    np.testing.assert_array_equal(result, expected)
+
+
+@pytest.mark.parametrize('normalize, log_transform', [(True, False), (False, True), (True, True)])
+def test_vectorized_equals_loop_transforms(epochs, normalize, log_transform):
+    kwargs = dict(wavelet='db4', level=2, normalize=normalize, log_transform=log_transform)
+    np.testing.assert_array_equal(get_twp_feature_vectors(epochs, **kwargs),
+                                  _get_twp_feature_vectors_loop(epochs, **kwargs))
+
+
+@pytest.mark.parametrize('normalize', [False, True])
+def test_multilevel_equals_single_level(epochs, normalize):
+    per_level = get_twp_multilevel_feature_vectors(epochs, wavelet='db4', max_level=4,
+                                                   normalize=normalize)
+    assert sorted(per_level) == [1, 2, 3, 4]
+    for level, features in per_level.items():
+        np.testing.assert_array_equal(
+            features, get_twp_feature_vectors(epochs, 'db4', level, normalize=normalize))
+
+
+def test_multilevel_rejects_levels_out_of_range(epochs):
+    with pytest.raises(ValueError):
+        get_twp_multilevel_feature_vectors(epochs, 'db4', max_level=2, levels=[3])
+
+
+@pytest.mark.parametrize('normalize, log_transform', [(False, False), (True, True)])
+def test_selected_equals_full_columns(epochs, normalize, log_transform):
+    kwargs = dict(wavelet='coif3', level=3, normalize=normalize, log_transform=log_transform)
+    full = get_twp_feature_vectors(epochs, **kwargs)
+    indices = np.array([17, 2, 9, 16])  # desordenados; el canal 1 no se usa
+    np.testing.assert_array_equal(
+        get_twp_selected_feature_vectors(epochs, indices=indices, **kwargs), full[:, indices])
+
+    mask = [0] * full.shape[1]  # individuo del AG: lista de 0/1
+    for index in indices:
+        mask[index] = 1
+    np.testing.assert_array_equal(
+        get_twp_selected_feature_vectors(epochs, mask=mask, **kwargs), full[:, sorted(indices)])
+
+
+def test_selected_rejects_ambiguous_selection(epochs):
+    with pytest.raises(ValueError):
+        get_twp_selected_feature_vectors(epochs, mask=[0, 1, 1, 0], wavelet='db4', level=3)
+    with pytest.raises(ValueError):
+        get_twp_selected_feature_vectors(epochs, wavelet='db4', level=3)